@@ -0,0 +1,236 @@
+# coding: utf-8
+#
+# backup_daemon - long running backup/restore/verify job runner
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# Syntax
+#   python3 backup_daemon.py run [--db path] [--socket path]
+#   python3 backup_daemon.py submit backup -p port -d directory [--incremental]
+#   python3 backup_daemon.py list [--status queued]
+#   python3 backup_daemon.py cancel job_id
+#   python3 backup_daemon.py shutdown
+#
+"""
+Run PCR backup, restore and verify jobs from a persistent queue.
+Jobs run concurrently with one worker per MIDI port and failed jobs
+are retried with exponential backoff. The daemon is controlled over
+a local Unix socket with one JSON request per line. Where Unix sockets
+are not available (Windows) the daemon listens on localhost instead and
+the socket path holds the TCP port number.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+from configuration import Configuration
+from event_log import event_log
+from job_queue import JOB_KINDS, QUEUED, RUNNING, DONE, FAILED, CANCELED, JobStore, PortWorkerPool, run_job
+
+
+log = logging.getLogger("pcr-daemon")
+
+# Windows has no Unix domain sockets
+_HAVE_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+
+
+def default_path(file_name):
+    """
+    Daemon files live next to the configuration file
+    :param file_name: File name
+    :return: Full path
+    """
+    return os.path.join(os.path.dirname(Configuration.get_file_path()), file_name)
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """
+    One JSON request per line, one JSON response per line
+    """
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode("utf-8"))
+                response = self.server.daemon.handle_request(request)
+            except Exception as ex:
+                response = {"ok": False, "error": str(ex)}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+if _HAVE_UNIX_SOCKETS:
+    class _ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    class _ControlServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+        daemon_threads = True
+
+
+class BackupDaemon():
+    """
+    Owns the job store, the port workers and the control socket
+    """
+    def __init__(self, db_path, socket_path, runner=run_job):
+        self._store = JobStore(db_path)
+        self.pool = PortWorkerPool(self._store, runner)
+        self._socket_path = socket_path
+        self._server = None
+
+    @property
+    def store(self):
+        return self._store
+
+    def handle_request(self, request):
+        """
+        Carry out a control request
+        :param request: Dict with an "op" key
+        :return: Response dict
+        """
+        op = request.get("op")
+        if op == "submit":
+            kind = request.get("kind")
+            if kind not in JOB_KINDS:
+                return {"ok": False, "error": "Unknown job kind '{}'".format(kind)}
+            params = dict(request.get("params", {}))
+            job_id = self.pool.submit(kind, request.get("port", ""), params, request.get("max_attempts", 3))
+            return {"ok": True, "id": job_id}
+        if op == "list":
+            return {"ok": True, "jobs": self._store.list(request.get("status"), request.get("limit", 100))}
+        if op == "status":
+            job = self._store.get(request.get("id"))
+            return {"ok": job is not None, "job": job}
+        if op == "cancel":
+            return {"ok": self.pool.cancel(request.get("id"))}
+        if op == "shutdown":
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": "Unknown op '{}'".format(op)}
+
+    def serve_forever(self):
+        if os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+        if _HAVE_UNIX_SOCKETS:
+            self._server = _ControlServer(self._socket_path, _ControlHandler)
+            os.chmod(self._socket_path, 0o600)
+            log.info("Listening on %s", self._socket_path)
+        else:
+            self._server = _ControlServer(("127.0.0.1", 0), _ControlHandler)
+            with open(self._socket_path, "w") as f:
+                f.write(str(self._server.server_address[1]))
+            log.info("Listening on localhost port %d", self._server.server_address[1])
+        self._server.daemon = self
+        self.pool.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.pool.stop()
+            self._server.server_close()
+            os.remove(self._socket_path)
+            self._store.close()
+
+
+def send_request(socket_path, request, timeout=10.0):
+    """
+    Send one control request to a running daemon
+    :param socket_path: Path of the daemon's Unix socket, or of the file
+    with its TCP port number
+    :param request: Request dict
+    :return: Response dict
+    """
+    if _HAVE_UNIX_SOCKETS:
+        family, address = socket.AF_UNIX, socket_path
+    else:
+        with open(socket_path) as f:
+            family, address = socket.AF_INET, ("127.0.0.1", int(f.read()))
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        with sock.makefile("rwb") as f:
+            f.write((json.dumps(request) + "\n").encode("utf-8"))
+            f.flush()
+            return json.loads(f.readline().decode("utf-8"))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--socket', default=default_path("pcr_daemon.sock"), help="control socket path")
+    parser.add_argument('-v', '--verbose', action="store_true", help='verbose logging output (debug)')
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    p = subparsers.add_parser("run", help="run the daemon")
+    p.add_argument('--db', default=default_path("pcr_jobs.sqlite"), help="job database path")
+
+    p = subparsers.add_parser("submit", help="queue a job")
+    p.add_argument('kind', choices=JOB_KINDS)
+    p.add_argument('-p', '--port', default="", help="MIDI port number or name")
+    p.add_argument('-d', '--directory', required=True, help="bank directory")
+    p.add_argument('--single', action="store_true", help="backup the current control map only")
+    p.add_argument('--clean', action="store_true", help="backup: delete existing .syx files first")
+    p.add_argument('--incremental', action="store_true",
+                   help="backup: add a snapshot that only stores the maps changed since the last one")
+    p.add_argument('-m', '--maps', help='restore: send only these control maps, e.g. "3-5"')
+    p.add_argument('--max-attempts', type=int, default=3)
+
+    p = subparsers.add_parser("list", help="list jobs")
+    p.add_argument('--status', choices=(QUEUED, RUNNING, DONE, FAILED, CANCELED))
+
+    p = subparsers.add_parser("cancel", help="cancel a job")
+    p.add_argument('id', type=int)
+
+    subparsers.add_parser("shutdown", help="stop the daemon")
+
+    args = parser.parse_args(args)
+    logging.basicConfig(format="%(name)s: %(levelname)s - %(message)s",
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+
+    if args.command == "run":
+        daemon = BackupDaemon(args.db, args.socket)
+        event_log.start(sys.stderr)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            event_log.stop()
+        return 0
+
+    if args.command == "submit":
+        request = {"op": "submit", "kind": args.kind, "port": args.port, "max_attempts": args.max_attempts,
+                   "params": {"directory": args.directory, "single": args.single, "clean": args.clean,
+                              "incremental": args.incremental, "maps": args.maps}}
+    elif args.command == "list":
+        request = {"op": "list", "status": args.status}
+    elif args.command == "cancel":
+        request = {"op": "cancel", "id": args.id}
+    else:
+        request = {"op": args.command}
+
+    try:
+        response = send_request(args.socket, request)
+    except (OSError, ValueError) as ex:
+        log.error("Unable to reach the daemon at %s: %s", args.socket, ex)
+        return 1
+    print(json.dumps(response, indent=4))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,255 @@
+# coding: utf-8
+#
+# bank_archive - export and import banks as one compressed archive
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# A bank archive is a zip file with LZMA compressed members, one member
+# per control map holding the map's frames back to back:
+#
+#   manifest.json         {"format": 1, "banks": {"pcr1": {"pcr-0001.syx":
+#                          ["pcr1/map-01.syx", offset, length, "<sha256>"], ...}}}
+#   pcr1/map-01.syx
+#   pcr1/map-02.syx
+#   ...
+#
+# Zip keeps a central directory, so a single map can be read without
+# decompressing the rest of the archive. Files that are not named by
+# map and frame go to an "other.syx" member.
+#
+
+import hashlib
+import json
+import lzma
+import os
+import zipfile
+import zlib
+from os.path import basename, isdir, join
+from pcr_sysex import map_frame_from_path
+
+
+ARCHIVE_EXTENSION = ".pcrz"
+MANIFEST = "manifest.json"
+FORMAT = 1
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _is_plain_name(name):
+    """
+    True if a name from a manifest can be joined to a directory without
+    leaving it: no directory part, not "." or "..", not absolute
+    """
+    return isinstance(name, str) and name not in ("", ".", "..") and basename(name) == name and \
+        "/" not in name and "\\" not in name and not os.path.isabs(name)
+
+
+def _syx_names(directory):
+    return sorted([fn for fn in os.listdir(directory) if fn.lower().endswith('.syx')])
+
+
+def library_banks(directory):
+    """
+    Find the banks of a directory. A directory with .syx files is a
+    bank, otherwise each sub-directory with .syx files is a bank.
+    :param directory: Bank or library directory
+    :return: Dict of bank name to bank directory
+    """
+    if _syx_names(directory):
+        return {basename(os.path.normpath(directory)): directory}
+    banks = {}
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_dir() and _syx_names(entry.path):
+            banks[entry.name] = entry.path
+    return banks
+
+
+def _member_name(bank, name):
+    map_frame = map_frame_from_path(name)
+    if map_frame is None:
+        return "{}/other.syx".format(bank)
+    return "{}/map-{:02}.syx".format(bank, map_frame[0])
+
+
+def export_banks(archive_path, banks):
+    """
+    Write banks to an archive
+    :param archive_path: Archive file to create
+    :param banks: Dict of bank name to bank directory
+    :return: Number of frames written
+    """
+    manifest = {"format": FORMAT, "banks": {}}
+    count = 0
+    tmp_path = archive_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_LZMA) as zf:
+        for bank, directory in banks.items():
+            entries = {}
+            members = {}
+            for name in _syx_names(directory):
+                with open(join(directory, name), "rb") as fh:
+                    data = fh.read()
+                member = members.setdefault(_member_name(bank, name), [])
+                offset = sum([len(d) for d in member])
+                member.append(data)
+                entries[name] = [_member_name(bank, name), offset, len(data), hashlib.sha256(data).hexdigest()]
+                count += 1
+            for member, frames in members.items():
+                zf.writestr(member, b"".join(frames))
+            manifest["banks"][bank] = entries
+        zf.writestr(MANIFEST, json.dumps(manifest, indent=1))
+    os.replace(tmp_path, archive_path)
+    return count
+
+
+def export_directory(archive_path, directory):
+    """
+    Write a bank or a whole library of banks to an archive
+    :param archive_path: Archive file to create
+    :param directory: Bank or library directory
+    :return: Number of frames written
+    """
+    banks = library_banks(directory)
+    if not banks:
+        raise ArchiveError("No .syx files found in {}".format(directory))
+    return export_banks(archive_path, banks)
+
+
+class BankArchive():
+    """
+    Read access to a bank archive. Members are read on demand.
+    """
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._zip = zipfile.ZipFile(path, "r")
+            self._manifest = json.loads(self._zip.read(MANIFEST).decode("utf-8"))
+        except (zipfile.BadZipFile, KeyError, ValueError, lzma.LZMAError, zlib.error, EOFError) as ex:
+            raise ArchiveError("{} is not a bank archive: {}".format(path, ex))
+        if not isinstance(self._manifest, dict) or self._manifest.get("format") != FORMAT:
+            raise ArchiveError("Unsupported archive format {}".format(
+                self._manifest.get("format") if isinstance(self._manifest, dict) else None))
+        self._check_manifest()
+
+    def _check_manifest(self):
+        """
+        Archives come from other machines. Bank and frame names become file
+        names on extract, so only plain names are accepted.
+        """
+        banks = self._manifest.get("banks")
+        if not isinstance(banks, dict):
+            raise ArchiveError("{} has no bank list".format(self.path))
+        for bank, entries in banks.items():
+            if not _is_plain_name(bank):
+                raise ArchiveError("Invalid bank name '{}' in {}".format(bank, self.path))
+            if not isinstance(entries, dict):
+                raise ArchiveError("Invalid entry for bank '{}' in {}".format(bank, self.path))
+            for name, entry in entries.items():
+                if not _is_plain_name(name) or not name.lower().endswith(".syx"):
+                    raise ArchiveError("Invalid frame name '{}' in {}".format(name, self.path))
+                if not (isinstance(entry, list) and len(entry) == 4 and isinstance(entry[0], str) and
+                        isinstance(entry[1], int) and isinstance(entry[2], int) and isinstance(entry[3], str)):
+                    raise ArchiveError("Invalid entry for {}/{} in {}".format(bank, name, self.path))
+
+    def _read_member(self, member):
+        try:
+            return self._zip.read(member)
+        except (KeyError, zipfile.BadZipFile, lzma.LZMAError, zlib.error, EOFError) as ex:
+            raise ArchiveError("{}: unable to read {}: {}".format(self.path, member, ex))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def banks(self):
+        return sorted(self._manifest["banks"])
+
+    def names(self, bank, maps=None):
+        """
+        Frame file names of a bank
+        :param bank: Bank name
+        :param maps: Optional collection of map numbers to select
+        :return: Sorted file names
+        """
+        if bank not in self._manifest["banks"]:
+            raise ArchiveError("No bank '{}' in {}".format(bank, self.path))
+        names = sorted(self._manifest["banks"][bank])
+        if maps is not None:
+            names = [n for n in names if (map_frame_from_path(n) or (None,))[0] in maps]
+        return names
+
+    def read(self, bank, name):
+        """
+        Read one frame and check it against the manifest
+        :param bank: Bank name
+        :param name: Frame file name
+        :return: Frame bytes
+        """
+        return self._frame(bank, name, self._read_member(self._manifest["banks"][bank][name][0]))
+
+    def _frame(self, bank, name, member_data):
+        member, offset, length, digest = self._manifest["banks"][bank][name]
+        data = member_data[offset:offset + length]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ArchiveError("{}/{} does not match the manifest".format(bank, name))
+        return data
+
+    def frames(self, bank, maps=None):
+        """
+        Stream the frames of a bank. Each map member is read once.
+        :return: Generator of (name, frame bytes)
+        """
+        member, member_data = None, None
+        for name in self.names(bank, maps):
+            if self._manifest["banks"][bank][name][0] != member:
+                member = self._manifest["banks"][bank][name][0]
+                member_data = self._read_member(member)
+            yield name, self._frame(bank, name, member_data)
+
+    def extract(self, bank, directory, maps=None):
+        """
+        Write a bank (or some of its maps) to a bank directory
+        :param bank: Bank name
+        :param directory: Target directory
+        :param maps: Optional collection of map numbers
+        :return: Number of files written
+        """
+        os.makedirs(directory, exist_ok=True)
+        count = 0
+        for name, data in self.frames(bank, maps):
+            with open(join(directory, name), "wb") as fh:
+                fh.write(data)
+            count += 1
+        return count
+
+    def extract_all(self, directory, maps=None):
+        """
+        Import the archive into a directory. A single bank is written to
+        the directory itself, several banks to one sub-directory each.
+        :return: Number of files written
+        """
+        banks = self.banks()
+        if len(banks) == 1:
+            return self.extract(banks[0], directory, maps)
+        return sum([self.extract(bank, join(directory, bank), maps) for bank in banks])
+
+
+def is_archive(path):
+    return not isdir(path) and zipfile.is_zipfile(path)
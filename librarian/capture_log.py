@@ -0,0 +1,252 @@
+# coding: utf-8
+#
+# capture_log - record MIDI input with timestamps and replay it
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# A capture holds every event a MIDI in port delivered, exactly as it
+# arrived (split sysex, realtime bytes and all), with the time rtmidi
+# gave it. File format:
+#
+#   "PCRC" version(u8) started(f64, epoch seconds) port_len(u16) port(utf-8)
+#   records: delta_us(varint) length(varint) message bytes
+#
+# delta_us is the time since the previous event in microseconds. The
+# deltas are taken from the running total so rounding does not add up
+# over a long capture.
+#
+# Replay sends each event at start + time / speed. Waiting for a deadline
+# measured from the start of the replay, not for a delta after the last
+# send, corrects drift: a late send shortens the next wait instead of
+# delaying every event after it. The last stretch before a deadline is a
+# short spin, because sleep() can oversleep by a millisecond or more.
+#
+
+import struct
+import time
+from collections import namedtuple
+
+
+MAGIC = b"PCRC"
+VERSION = 1
+CAPTURE_EXTENSION = ".pcrcap"
+
+# Spin instead of sleeping when a deadline is this close (seconds)
+SPIN_THRESHOLD = 0.002
+
+_HEADER = struct.Struct(">4sBdH")
+_READ_SIZE = 64 * 1024
+
+# One event of a capture, time in seconds from the first event
+CaptureEvent = namedtuple("CaptureEvent", ["time", "message"])
+
+# Outcome of a replay. Lateness is how long after its deadline an event was sent.
+ReplayResult = namedtuple("ReplayResult", ["events", "bytes", "duration", "max_late", "mean_late"])
+
+
+class CaptureError(Exception):
+    pass
+
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class CaptureRecorder():
+    """
+    Writes MIDI input events to a capture file
+    """
+    def __init__(self, path, port_name=""):
+        """
+        Create a capture file
+        :param path: Capture file path
+        :param port_name: Name of the port being recorded
+        """
+        self.path = path
+        self.events = 0
+        self._elapsed = 0.0
+        self._written_us = 0
+        name = port_name.encode("utf-8")
+        self._fh = open(path, "wb")
+        self._fh.write(_HEADER.pack(MAGIC, VERSION, time.time(), len(name)) + name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, message, deltatime):
+        """
+        Add an event
+        :param message: Message bytes (or list of ints) as delivered by the port
+        :param deltatime: Seconds since the previous event, as given by rtmidi
+        :return: None
+        """
+        if self.events:
+            self._elapsed += deltatime
+        now_us = int(round(self._elapsed * 1000000))
+        self._fh.write(_varint(now_us - self._written_us) + _varint(len(message)) + bytes(message))
+        self._written_us = now_us
+        self.events += 1
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class CaptureReader():
+    """
+    Reads the events of a capture file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        header = self._fh.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            self._fh.close()
+            raise CaptureError("{} is not a capture file".format(path))
+        magic, version, self.started, name_len = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            self._fh.close()
+            raise CaptureError("{} is not a version {} capture file".format(path, VERSION))
+        self.port_name = self._fh.read(name_len).decode("utf-8")
+        self._data_start = self._fh.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._fh.close()
+
+    def __iter__(self):
+        """
+        The events in order. A record cut short (by a crash) ends the capture.
+        :return: Generator of CaptureEvent
+        """
+        self._fh.seek(self._data_start)
+        data = b""
+        pos = 0
+        now_us = 0
+        at_eof = False
+        while True:
+            try:
+                delta, start = _read_varint(data, pos)
+                length, start = _read_varint(data, start)
+                complete = start + length <= len(data)
+            except IndexError:
+                complete = False
+            if not complete:
+                if at_eof:
+                    break
+                chunk = self._fh.read(_READ_SIZE)
+                at_eof = not chunk
+                data = data[pos:] + chunk
+                pos = 0
+                continue
+            now_us += delta
+            yield CaptureEvent(now_us / 1000000.0, data[start:start + length])
+            pos = start + length
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if b < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _wait_until(deadline, cancel=None):
+    """
+    Wait until a perf_counter() deadline
+    :return: False if canceled
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return True
+        if cancel is not None and cancel.is_set():
+            return False
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(min(remaining - SPIN_THRESHOLD, 0.1))
+
+
+def replay(events, midiout, speed=1.0, cancel=None, on_event=None):
+    """
+    Send captured events with their recorded timing
+    :param events: Iterable of CaptureEvent, e.g. a CaptureReader
+    :param midiout: Open MIDI out port
+    :param speed: Timing scale, 2.0 replays twice as fast. 0 sends as fast as possible.
+    :param cancel: Optional threading.Event that stops the replay
+    :param on_event: Optional callable (event, late) called after each send
+    :return: ReplayResult
+    """
+    count = 0
+    sent_bytes = 0
+    max_late = 0.0
+    total_late = 0.0
+    start = time.perf_counter()
+    first = None
+    for event in events:
+        if first is None:
+            first = event.time
+        if speed > 0:
+            deadline = start + (event.time - first) / speed
+            if not _wait_until(deadline, cancel):
+                break
+            late = time.perf_counter() - deadline
+        else:
+            if cancel is not None and cancel.is_set():
+                break
+            late = 0.0
+        midiout.send_message(event.message)
+        count += 1
+        sent_bytes += len(event.message)
+        max_late = max(max_late, late)
+        total_late += late
+        if on_event is not None:
+            on_event(event, late)
+    return ReplayResult(count, sent_bytes, time.perf_counter() - start, max_late,
+                        total_late / count if count else 0.0)
+
+
+def replay_file(path, port, speed=1.0, cancel=None, on_event=None):
+    """
+    Replay a capture file to a MIDI out port
+    :param path: Capture file
+    :param port: MIDI out port number
+    :return: ReplayResult
+    """
+    from pcr_midi_util import open_midiout
+
+    with CaptureReader(path) as reader:
+        midiout = open_midiout(port)
+        try:
+            return replay(reader, midiout, speed, cancel, on_event)
+        finally:
+            midiout.close_port()
@@ -15,16 +15,36 @@
 # You should have received a copy of the GNU General Public License
 # along with this program (the LICENSE.md file).  If not, see <http://www.gnu.org/licenses/>.
 #
+import atexit
 import os
 import json
+import threading
+import time
+from pcr_sysex import FILE_NAME_TEMPLATE, file_index, frame_file_name, map_frame_from_path
 
 
 class Configuration():
     active_config = {
         "recent": [],
-        "last_recent": ""
+        "last_recent": "",
+        "directories": {},
+        "port_identities": {}
     }
 
+    # Maximum number of recent directories kept (least recently used are dropped)
+    MAX_RECENT = 10
+    # Changes are written this many seconds after the last change
+    FLUSH_DELAY = 2.0
+    # Directory listings with more non pcr-NNNN.syx names than this are not cached
+    MAX_CACHED_NAMES = 100
+
+    _lock = threading.RLock()
+    # Serializes writes of the file, the flush timer and the atexit flush can save at the same time
+    _save_lock = threading.Lock()
+    _dirty = False
+    _flush_timer = None
+    _flush_at_exit = False
+
     @classmethod
     def load_configuration(cls):
         # Try to open the conf file. If there isn't one, we give up.
@@ -50,48 +70,195 @@ class Configuration():
             print("Unable to parse configuration file as JSON")
             print(str(ex))
 
+        # Files written by older versions lack some keys
+        cls.active_config.setdefault("recent", [])
+        cls.active_config.setdefault("last_recent", "")
+        cls.active_config.setdefault("directories", {})
+        cls.active_config.setdefault("port_identities", {})
+
+        # Pending changes are written when the app exits
+        if not cls._flush_at_exit:
+            atexit.register(cls.flush)
+            cls._flush_at_exit = True
+
     @classmethod
     def save_configuration(cls):
+        """
+        Write the configuration file now. The file is written to a temp
+        file which then replaces the configuration file, so a crash
+        never leaves a partial file behind.
+        """
         try:
             cfg_path = cls.get_file_path()
 
-            if not os.path.exists(os.path.dirname(cfg_path)):
+            if os.path.dirname(cfg_path) and not os.path.exists(os.path.dirname(cfg_path)):
                 p = os.path.dirname(cfg_path)
                 os.makedirs(p)
 
-            cfg = open(cfg_path, 'w')
-            cfg_json = json.dumps(cls.active_config, indent=4)
-            cfg.write(cfg_json)
-            cfg.close()
+            with cls._save_lock:
+                # Taken under the save lock so the last snapshot taken is the last one written
+                with cls._lock:
+                    cfg_json = json.dumps(cls.active_config, indent=4)
+                    cls._dirty = False
+                tmp_path = cfg_path + ".tmp"
+                with open(tmp_path, 'w') as cfg:
+                    cfg.write(cfg_json)
+                os.replace(tmp_path, cfg_path)
         except Exception as ex:
             print("Unable to open {0}".format(cfg_path))
             print(str(ex))
             return
 
+    @classmethod
+    def flush(cls):
+        """
+        Write pending changes, if there are any
+        """
+        with cls._lock:
+            if cls._flush_timer is not None:
+                cls._flush_timer.cancel()
+                cls._flush_timer = None
+            dirty = cls._dirty
+        if dirty:
+            cls.save_configuration()
+
+    @classmethod
+    def _changed(cls):
+        """
+        Schedule a write. Changes made within FLUSH_DELAY of
+        each other are written together.
+        """
+        with cls._lock:
+            cls._dirty = True
+            if cls._flush_timer is not None:
+                cls._flush_timer.cancel()
+            cls._flush_timer = threading.Timer(cls.FLUSH_DELAY, cls.flush)
+            cls._flush_timer.daemon = True
+            cls._flush_timer.start()
+
     @classmethod
     def get_recent(cls):
         return cls.active_config["recent"]
 
     @classmethod
     def set_recent(cls, dir):
-        try:
-            cls.active_config["recent"].remove(dir)
-        except ValueError:
-            pass
-        cls.active_config["recent"].append(dir)
-        # TODO Trim list?
-        cls.save_configuration()
+        """
+        Make a directory the most recently used one. The list is kept
+        in least to most recently used order and trimmed to MAX_RECENT.
+        """
+        with cls._lock:
+            recent = cls.active_config["recent"]
+            if recent and recent[-1] == dir:
+                return
+            try:
+                recent.remove(dir)
+            except ValueError:
+                pass
+            recent.append(dir)
+            del recent[:-cls.MAX_RECENT]
+            # Forget metadata of directories that fell off the list
+            directories = cls.active_config["directories"]
+            for d in list(directories.keys()):
+                if d not in recent:
+                    del directories[d]
+        cls._changed()
 
     @classmethod
     def clear_recent(cls):
-        cls.active_config["recent"].clear()
-        cls.save_configuration()
+        with cls._lock:
+            cls.active_config["recent"].clear()
+            cls.active_config["directories"].clear()
+        cls._changed()
 
     @classmethod
     def set_last_recent(cls, dir):
-        cls.active_config["last_recent"] = dir
-        cls.save_configuration()
+        with cls._lock:
+            cls.active_config["last_recent"] = dir
+        cls._changed()
+
+    @classmethod
+    def set_directory_info(cls, dir, names, mtime_ns):
+        """
+        Record what the last scan of a directory found
+        :param dir: The directory
+        :param names: Names of the .syx files in the directory
+        :param mtime_ns: Modification time of the directory when it was scanned
+        """
+        info = {
+            "file_count": len(names),
+            "last_scan": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mtime_ns": mtime_ns,
+            "listing": _compress_names(names, cls.MAX_CACHED_NAMES)
+        }
+        with cls._lock:
+            old = cls.active_config["directories"].get(dir, {})
+            if old.get("mtime_ns") == mtime_ns and old.get("file_count") == len(names):
+                # Nothing new worth a write
+                return
+            if "device" in old:
+                info["device"] = old["device"]
+            cls.active_config["directories"][dir] = info
+        cls._changed()
+
+    @classmethod
+    def set_directory_device(cls, dir, device):
+        """
+        Record the device the files of a directory were received from
+        :param dir: The directory
+        :param device: MIDI in port name, or None when the files came from elsewhere
+        """
+        with cls._lock:
+            cls.active_config["directories"].setdefault(dir, {})["device"] = device
+        cls._changed()
+
+    @classmethod
+    def get_directory_device(cls, dir):
+        """
+        Return the device the files of a directory were last received from
+        :param dir: The directory
+        :return: MIDI in port name or None
+        """
+        return cls.active_config["directories"].get(dir, {}).get("device")
+
+    @classmethod
+    def get_directory_info(cls, dir):
+        """
+        Return the recorded metadata of a directory
+        :param dir: The directory
+        :return: Dict with file_count, last_scan, mtime_ns and device keys or None
+        """
+        return cls.active_config["directories"].get(dir)
+
+    @classmethod
+    def get_cached_listing(cls, dir):
+        """
+        Return the .syx file names recorded for a directory
+        :param dir: The directory
+        :return: (mtime_ns, names) or None if no listing was recorded
+        """
+        info = cls.get_directory_info(dir)
+        if not info or info.get("listing") is None:
+            return None
+        return info["mtime_ns"], _expand_names(info["listing"])
+
 
+    @classmethod
+    def get_port_identities(cls):
+        """
+        Return the identity probe results by MIDI in port name
+        :return: Dict of port name to identity dict, or {"no_answer": time} for ports that did not answer
+        """
+        return dict(cls.active_config.get("port_identities", {}))
+
+    @classmethod
+    def set_port_identities(cls, identities):
+        """
+        Record identity probe results. Ports not in identities keep their entries.
+        :param identities: Dict of port name to identity dict or {"no_answer": time}
+        """
+        with cls._lock:
+            cls.active_config.setdefault("port_identities", {}).update(identities)
+        cls._changed()
 
     @classmethod
     def get_last_recent(cls):
@@ -113,6 +280,18 @@ class Configuration():
 
         return file_name
 
+    @classmethod
+    def get_history_directory(cls):
+        """
+        Returns the snapshot history directory. It can be set with a
+        "history_directory" key, otherwise it lives next to the
+        configuration file.
+        """
+        path = cls.active_config.get("history_directory")
+        if path:
+            return path
+        return os.path.join(os.path.dirname(cls.get_file_path()), "history")
+
     @classmethod
     def IsLinux(cls):
         """
@@ -127,3 +306,38 @@ class Configuration():
         Returns True if the OS is a Windows type (Windows 7, etc.)
         """
         return os.name == "nt"
+
+
+def _compress_names(names, max_other):
+    """
+    Compact form of a directory listing: runs of pcr-NNNN.syx
+    file numbers plus any other names
+    :param names: File names
+    :param max_other: Give up if there are more other names than this
+    :return: Dict with "runs" and "other" keys or None
+    """
+    numbers = []
+    other = []
+    for name in names:
+        map_frame = map_frame_from_path(name)
+        # Names spelled another way (e.g. PCR-0101.SYX) are kept as they are
+        if map_frame is not None and frame_file_name(*map_frame) == name:
+            numbers.append(file_index(*map_frame))
+        else:
+            other.append(name)
+    if len(other) > max_other:
+        return None
+
+    runs = []
+    for n in sorted(numbers):
+        if runs and runs[-1][1] == n - 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return {"runs": runs, "other": other}
+
+
+def _expand_names(listing):
+    names = [FILE_NAME_TEMPLATE.format(n) for first, last in listing["runs"] for n in range(first, last + 1)]
+    names.extend(listing["other"])
+    return names
@@ -0,0 +1,380 @@
+# coding: utf-8
+#
+# control_map_browser - virtualized browser for control map files
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import bisect
+import os
+import queue
+import threading
+import tkinter
+from itertools import groupby
+from tkinter import Frame, Canvas, Scrollbar, Label, Entry, StringVar
+from tkinter import font as tkfont
+from pcr_sysex import map_frame_from_path, validate_check_sum, CONTROL_MAP_LEN
+
+
+# Row kinds
+BANK = 0
+MAP = 1
+FRAME = 2
+
+
+class ControlMapIndex():
+    """
+    Sorted index of control map files presented as rows grouped
+    bank (directory) -> map -> frame. Rows are rebuilt only when
+    the files, filter or collapsed groups change.
+    Each row is a tuple (kind, key, depth, text, path).
+    """
+    def __init__(self):
+        self._paths = []
+        self._filter = ""
+        self._collapsed = set()
+        self._rows = None
+
+    def __len__(self):
+        return len(self._paths)
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = self._build_rows()
+        return self._rows
+
+    def add(self, paths):
+        for path in paths:
+            i = bisect.bisect_left(self._paths, path)
+            if i == len(self._paths) or self._paths[i] != path:
+                self._paths.insert(i, path)
+        self._rows = None
+
+    def remove(self, paths):
+        for path in paths:
+            i = bisect.bisect_left(self._paths, path)
+            if i < len(self._paths) and self._paths[i] == path:
+                del self._paths[i]
+        self._rows = None
+
+    def clear(self):
+        self._paths.clear()
+        self._rows = None
+
+    def set_filter(self, text):
+        self._filter = text.strip().lower()
+        self._rows = None
+
+    def toggle(self, key):
+        """
+        Collapse or expand a bank or map group
+        :param key: Group key from a BANK or MAP row
+        :return: None
+        """
+        if key in self._collapsed:
+            self._collapsed.remove(key)
+        else:
+            self._collapsed.add(key)
+        self._rows = None
+
+    def is_collapsed(self, key):
+        return key in self._collapsed
+
+    def _build_rows(self):
+        if self._filter:
+            paths = [p for p in self._paths if self._filter in p.lower()]
+        else:
+            paths = self._paths
+
+        rows = []
+        for bank, bank_paths in groupby(paths, key=os.path.dirname):
+            bank_paths = list(bank_paths)
+            bank_key = (bank,)
+            rows.append((BANK, bank_key, 0, "{} ({} files)".format(bank, len(bank_paths)), None))
+            if bank_key in self._collapsed:
+                continue
+            for map_number, map_paths in groupby(bank_paths, key=_map_number):
+                map_paths = list(map_paths)
+                map_key = (bank, map_number)
+                if map_number is None:
+                    text = "Other files ({})".format(len(map_paths))
+                else:
+                    text = "Map {} ({} frames)".format(map_number, len(map_paths))
+                rows.append((MAP, map_key, 1, text, None))
+                if map_key in self._collapsed:
+                    continue
+                for path in map_paths:
+                    rows.append((FRAME, path, 2, os.path.basename(path), path))
+        return rows
+
+
+def _map_number(path):
+    map_frame = map_frame_from_path(path)
+    return map_frame[0] if map_frame else None
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_frame_details(path):
+    """
+    Per row details for a control map file
+    :param path: Path of a .syx file
+    :return: Details text
+    """
+    try:
+        with open(path, 'rb') as fh:
+            data = fh.read(CONTROL_MAP_LEN + 1)
+    except OSError as ex:
+        return "unreadable: {}".format(ex.strerror)
+    if len(data) != CONTROL_MAP_LEN:
+        return "{} bytes".format(len(data))
+    map_frame = map_frame_from_path(path)
+    checksum = "checksum ok" if validate_check_sum(data) else "checksum error"
+    if map_frame:
+        return "map {} frame {}, {}".format(map_frame[0], map_frame[1], checksum)
+    return checksum
+
+
+class ControlMapBrowser(Frame):
+    """
+    Virtualized list of control map files. Only the visible rows
+    are drawn, so very large libraries scroll instantly. Per row
+    details are read on a worker thread when a row first becomes visible,
+    and again after refresh() reports a new modification time.
+    Click a bank or map row to collapse or expand it.
+    """
+    FILTER_DELAY = 150
+    DETAILS_POLL = 50
+    ROW_PAD = 2
+    INDENT = 20
+
+    def __init__(self, master, width=100, height=10, **kwargs):
+        """
+        Create a control map browser
+        :param master: Parent widget
+        :param width: Width in characters
+        :param height: Height in rows
+        """
+        super(ControlMapBrowser, self).__init__(master, **kwargs)
+
+        self._index = ControlMapIndex()
+        self._top = 0
+        self._text_items = []
+        self._detail_items = []
+        self._filter_after_id = None
+        self._details_after_id = None
+        # Path: (mtime_ns, details text)
+        self._details = {}
+        self._details_pending = set()
+        self._details_requests = queue.Queue()
+        self._details_results = queue.Queue()
+        self._details_thread = None
+        # Paths of the rows on screen, replaced on every redraw
+        self._visible_paths = frozenset()
+
+        self._font = tkfont.nametofont("TkDefaultFont")
+        self._row_height = self._font.metrics("linespace") + ControlMapBrowser.ROW_PAD
+        self._detail_x = int(self._font.measure("0") * width * 0.5)
+
+        # Type-ahead filter
+        self._fr_filter = Frame(self)
+        self._lbl_filter = Label(self._fr_filter, text="Filter")
+        self._lbl_filter.pack(side=tkinter.LEFT)
+        self._v_filter = StringVar()
+        self._v_filter.trace_add("write", self._on_filter_changed)
+        self._ent_filter = Entry(self._fr_filter, textvariable=self._v_filter)
+        self._ent_filter.pack(side=tkinter.LEFT, fill=tkinter.X, expand=True, padx=5)
+        self._fr_filter.pack(side=tkinter.TOP, fill=tkinter.X, pady=2)
+
+        self._scrollbar = Scrollbar(self, orient=tkinter.VERTICAL, command=self._on_scrollbar)
+        self._scrollbar.pack(side=tkinter.RIGHT, fill=tkinter.Y)
+        self._canvas = Canvas(self, width=self._font.measure("0") * width,
+                              height=self._row_height * height,
+                              background="#ffffff", highlightthickness=0)
+        self._canvas.pack(side=tkinter.LEFT, fill=tkinter.BOTH, expand=True)
+
+        self._canvas.bind("<Configure>", self._redraw)
+        self._canvas.bind("<Button-1>", self._on_click)
+        self._canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self._canvas.bind("<Button-4>", lambda e: self.scroll(-3))
+        self._canvas.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def add_files(self, paths):
+        self._index.add(paths)
+        self._redraw()
+
+    def remove_files(self, paths):
+        self._index.remove(paths)
+        for path in paths:
+            self._details.pop(path, None)
+        self._redraw()
+
+    def refresh(self, stats):
+        """
+        Forget the details of files rewritten since they were read and redraw
+        :param stats: Dict of path: (size, mtime_ns) from a directory scan
+        """
+        for path, (size, mtime_ns) in stats.items():
+            cached = self._details.get(path)
+            if cached is not None and cached[0] != mtime_ns:
+                del self._details[path]
+        self._redraw()
+
+    def clear(self):
+        self._index.clear()
+        self._details.clear()
+        self._top = 0
+        self._redraw()
+
+    def scroll(self, rows):
+        self._set_top(self._top + rows)
+
+    def _visible_row_count(self):
+        return max(int(self._canvas.winfo_height() / self._row_height), 1)
+
+    def _set_top(self, top):
+        max_top = max(len(self._index.rows) - self._visible_row_count(), 0)
+        top = min(max(int(top), 0), max_top)
+        if top != self._top:
+            self._top = top
+            self._redraw()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._set_top(float(args[1]) * len(self._index.rows))
+        elif args[0] == "scroll":
+            count = int(args[1])
+            if args[2] == "pages":
+                count *= self._visible_row_count()
+            self.scroll(count)
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-delta * 3)
+
+    def _on_click(self, event):
+        row_number = self._top + int(event.y / self._row_height)
+        rows = self._index.rows
+        if row_number < len(rows) and rows[row_number][0] != FRAME:
+            self._index.toggle(rows[row_number][1])
+            self._redraw()
+
+    def _on_filter_changed(self, *args):
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(ControlMapBrowser.FILTER_DELAY, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_after_id = None
+        self._index.set_filter(self._v_filter.get())
+        self._top = 0
+        self._redraw()
+
+    def _redraw(self, event=None):
+        """
+        Draw the visible rows. Canvas items are reused from one redraw to the next.
+        :return:
+        """
+        rows = self._index.rows
+        visible = self._visible_row_count()
+        self._top = min(self._top, max(len(rows) - visible, 0))
+
+        # Grow the canvas item pool as needed
+        while len(self._text_items) < visible:
+            y = len(self._text_items) * self._row_height
+            self._text_items.append(self._canvas.create_text(0, y, anchor=tkinter.NW, font=self._font))
+            self._detail_items.append(self._canvas.create_text(self._detail_x, y, anchor=tkinter.NW,
+                                                               font=self._font, fill="#606060"))
+
+        self._visible_paths = frozenset([row[4] for row in rows[self._top:self._top + visible] if row[4]])
+
+        for i in range(len(self._text_items)):
+            row_number = self._top + i
+            text_item = self._text_items[i]
+            detail_item = self._detail_items[i]
+            if i >= visible or row_number >= len(rows):
+                self._canvas.itemconfigure(text_item, text="")
+                self._canvas.itemconfigure(detail_item, text="")
+                continue
+
+            kind, key, depth, text, path = rows[row_number]
+            if kind != FRAME:
+                text = ("+ " if self._index.is_collapsed(key) else "- ") + text
+            self._canvas.coords(text_item, 4 + depth * ControlMapBrowser.INDENT, i * self._row_height)
+            self._canvas.itemconfigure(text_item, text=text)
+            self._canvas.itemconfigure(detail_item, text=self._get_details(path) if path else "")
+
+        if rows:
+            self._scrollbar.set(self._top / len(rows), min((self._top + visible) / len(rows), 1.0))
+        else:
+            self._scrollbar.set(0.0, 1.0)
+
+    def _get_details(self, path):
+        """
+        Return cached row details or queue the row for loading
+        :param path: Path of the row file
+        :return: Details text, empty until loaded
+        """
+        cached = self._details.get(path)
+        if cached is not None:
+            return cached[1]
+        if path not in self._details_pending:
+            self._details_pending.add(path)
+            self._details_requests.put(path)
+            self._start_details_worker()
+        return ""
+
+    def _start_details_worker(self):
+        if self._details_thread is None:
+            self._details_thread = threading.Thread(target=self._details_worker,
+                                                    name="browser_details", daemon=True)
+            self._details_thread.start()
+        if self._details_after_id is None:
+            self._details_after_id = self.after(ControlMapBrowser.DETAILS_POLL, self._check_details)
+
+    def _details_worker(self):
+        while True:
+            path = self._details_requests.get()
+            # Skip rows that were scrolled away before we got to them
+            if path in self._visible_paths:
+                # Stat first, a write after it shows up as a newer mtime in the next scan
+                mtime = _mtime_ns(path)
+                self._details_results.put((path, (mtime, read_frame_details(path))))
+            else:
+                self._details_results.put((path, None))
+
+    def _check_details(self):
+        self._details_after_id = None
+        changed = False
+        try:
+            while True:
+                path, details = self._details_results.get_nowait()
+                self._details_pending.discard(path)
+                if details is not None:
+                    self._details[path] = details
+                    changed = True
+        except queue.Empty:
+            pass
+        if changed:
+            self._redraw()
+        if self._details_pending:
+            self._details_after_id = self.after(ControlMapBrowser.DETAILS_POLL, self._check_details)
@@ -0,0 +1,138 @@
+# coding: utf-8
+#
+# dir_scanner - background scanning of control map directories
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import os
+import queue
+import threading
+
+
+# Scan result message kinds
+ADDED = "added"
+REMOVED = "removed"
+DONE = "done"
+FAILED = "failed"
+
+
+class DirectoryScanner():
+    """
+    Scans a directory for .syx files on a worker thread.
+    Results are posted to a queue as (scan_id, kind, paths) messages:
+    REMOVED and ADDED batches relative to the paths the caller already
+    has, then DONE with the directory modification time in place of
+    paths. Starting a new scan abandons the previous one.
+    """
+    BATCH_SIZE = 200
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._scan_id = 0
+        # directory -> {path: (size, mtime_ns)}
+        self._stat_cache = {}
+        self.results = queue.Queue()
+
+    @property
+    def current_scan(self):
+        return self._scan_id
+
+    def scan(self, directory, known=(), cached_listing=None):
+        """
+        Start scanning a directory
+        :param directory: The directory to be scanned
+        :param known: Paths the caller already has (e.g. in a listbox)
+        :param cached_listing: Optional (mtime_ns, names) from an earlier scan.
+        If the directory has not been modified since, the names are used
+        instead of reading the directory.
+        :return: The id of the new scan
+        """
+        with self._lock:
+            self._scan_id += 1
+            scan_id = self._scan_id
+        threading.Thread(target=self._run, args=(scan_id, directory, frozenset(known), cached_listing),
+                         name="dir_scanner", daemon=True).start()
+        return scan_id
+
+    def stat_cache(self, directory):
+        """
+        Return the stat results from the last completed scan of a directory
+        :param directory: Directory path
+        :return: Dict of path: (size, mtime_ns). Empty if never scanned.
+        """
+        with self._lock:
+            return dict(self._stat_cache.get(directory, {}))
+
+    def _cancelled(self, scan_id):
+        return scan_id != self._scan_id
+
+    def _run(self, scan_id, directory, known, cached_listing):
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError as ex:
+            self.results.put((scan_id, FAILED, str(ex)))
+            return
+
+        if cached_listing is not None and cached_listing[0] == mtime_ns:
+            self._use_listing(scan_id, directory, known, cached_listing[1], mtime_ns)
+        else:
+            self._scan(scan_id, directory, known, mtime_ns)
+
+    def _use_listing(self, scan_id, directory, known, names, mtime_ns):
+        """
+        Post results from a cached listing without reading the directory
+        """
+        paths = [os.path.join(directory, name) for name in names]
+        added = [path for path in paths if path not in known]
+        current = frozenset(paths)
+        removed = [path for path in known if path not in current]
+        if removed:
+            self.results.put((scan_id, REMOVED, removed))
+        for i in range(0, len(added), self._batch_size):
+            self.results.put((scan_id, ADDED, added[i:i + self._batch_size]))
+        self.results.put((scan_id, DONE, mtime_ns))
+
+    def _scan(self, scan_id, directory, known, mtime_ns):
+        stats = {}
+        batch = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if self._cancelled(scan_id):
+                        return
+                    if not entry.name.lower().endswith('.syx') or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    stats[entry.path] = (st.st_size, st.st_mtime_ns)
+                    if entry.path not in known:
+                        batch.append(entry.path)
+                        if len(batch) >= self._batch_size:
+                            self.results.put((scan_id, ADDED, batch))
+                            batch = []
+        except OSError as ex:
+            self.results.put((scan_id, FAILED, str(ex)))
+            return
+
+        removed = [path for path in known if path not in stats]
+        if removed:
+            self.results.put((scan_id, REMOVED, removed))
+        if batch:
+            self.results.put((scan_id, ADDED, batch))
+
+        with self._lock:
+            self._stat_cache[directory] = stats
+        self.results.put((scan_id, DONE, mtime_ns))
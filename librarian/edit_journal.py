@@ -0,0 +1,251 @@
+# coding: utf-8
+#
+# edit_journal - undo/redo journal for frame edits
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# The journal records every byte a frame edit changes as
+# (file number, offset, old, new, checksum delta). Undo writes the old
+# values back, redo the new ones, so both cost as much as the edit did.
+#
+# The journal file sits next to the bank (bank/.pcr-journal for a
+# directory, bank.syx.journal for a file) and is only ever appended to:
+#
+#   "O" label_len(u16) label count(u32) count * [file(u16) offset(u8) old(u8) new(u8) cs_delta(i8)]
+#   "U"                                 undo of the last operation
+#   "R"                                 redo of the last undone operation
+#
+
+import os
+import struct
+from os.path import join
+from pcr_sysex import file_index, frame_file_name, map_frame_from_index, map_frame_from_path
+
+
+_OP = b"O"
+_UNDO = b"U"
+_REDO = b"R"
+_EDIT = struct.Struct(">HBBBb")
+_OP_HEADER = struct.Struct(">I")
+
+
+class JournalError(Exception):
+    pass
+
+
+def journal_path(bank_path):
+    """
+    Journal file of a bank
+    :param bank_path: Bank directory or single bank .syx file
+    :return: Journal file path
+    """
+    if bank_path.lower().endswith(".syx"):
+        return bank_path + ".journal"
+    return join(bank_path, ".pcr-journal")
+
+
+class Operation():
+    """
+    One undoable step made of byte edits
+    """
+    def __init__(self, label=""):
+        self.label = label
+        self.edits = []
+
+    def encode(self):
+        label = self.label.encode("utf-8")
+        parts = [_OP, struct.pack(">H", len(label)), label, _OP_HEADER.pack(len(self.edits))]
+        parts.extend([_EDIT.pack(*edit) for edit in self.edits])
+        return b"".join(parts)
+
+
+class EditJournal():
+    """
+    Records the edits made to the frames of a frame_editor.Bank and
+    undoes or redoes them
+    """
+    def __init__(self, bank, path=None):
+        """
+        Attach a journal to a bank
+        :param bank: frame_editor.Bank
+        :param path: Journal file, None keeps the journal in memory
+        """
+        self._bank = bank
+        self._path = path
+        self._done = []
+        self._undone = []
+        self._current = None
+        self._applying = False
+        if path is not None and os.path.exists(path):
+            self._load()
+        for frame in bank.frames.values():
+            frame.listeners.append(self._on_edit)
+
+    def detach(self):
+        for frame in self._bank.frames.values():
+            if self._on_edit in frame.listeners:
+                frame.listeners.remove(self._on_edit)
+
+    @property
+    def can_undo(self):
+        return bool(self._done)
+
+    @property
+    def can_redo(self):
+        return bool(self._undone)
+
+    @property
+    def redo_count(self):
+        """
+        Number of undone operations that can be redone
+        """
+        return len(self._undone)
+
+    def history(self):
+        """
+        Labels of the operations that can be undone, oldest first
+        """
+        return [op.label for op in self._done]
+
+    def begin(self, label=""):
+        """
+        Start an operation. Edits until commit() are undone as one step.
+        """
+        if self._current is not None:
+            raise JournalError("Operation '{}' is still open".format(self._current.label))
+        self._current = Operation(label)
+
+    def commit(self):
+        """
+        Finish the current operation and append it to the journal
+        :return: Number of byte edits in the operation
+        """
+        op, self._current = self._current, None
+        if op is None or not op.edits:
+            return 0
+        self._done.append(op)
+        self._undone = []
+        self._append(op.encode())
+        return len(op.edits)
+
+    def _on_edit(self, frame, offset, old, new, cs_delta):
+        if self._applying:
+            return
+        map_frame = map_frame_from_path(frame.name)
+        if map_frame is None:
+            raise JournalError("Frame '{}' is not named by map and frame".format(frame.name))
+        edit = (file_index(*map_frame), offset, old, new, cs_delta)
+        if self._current is not None:
+            self._current.edits.append(edit)
+        else:
+            op = Operation("Edit {} byte {}".format(frame.name, offset))
+            op.edits.append(edit)
+            self._done.append(op)
+            self._undone = []
+            self._append(op.encode())
+
+    def undo(self):
+        """
+        Undo the last operation
+        :return: Label of the operation undone
+        """
+        if not self._done:
+            raise JournalError("Nothing to undo")
+        op = self._done[-1]
+        self._apply(list(reversed(op.edits)), undo=True)
+        self._undone.append(self._done.pop())
+        self._append(_UNDO)
+        return op.label
+
+    def redo(self):
+        """
+        Redo the last undone operation
+        :return: Label of the operation redone
+        """
+        if not self._undone:
+            raise JournalError("Nothing to redo")
+        op = self._undone[-1]
+        self._apply(op.edits, undo=False)
+        self._done.append(self._undone.pop())
+        self._append(_REDO)
+        return op.label
+
+    def _apply(self, edits, undo):
+        """
+        Write the old (undo) or new values of an operation's edits. Every
+        edit is checked against the bank before any byte changes, so an
+        operation is applied completely or not at all.
+        :param edits: List of edits in the order to apply them
+        """
+        changes = []
+        # Values as they will be after the edits checked so far, for bytes edited more than once
+        pending = {}
+        for number, offset, old, new, cs_delta in edits:
+            frame = self._bank.frames.get(frame_file_name(*map_frame_from_index(number)))
+            if frame is None:
+                raise JournalError("The bank has no frame {}".format(number))
+            expected, value = (new, old) if undo else (old, new)
+            current = pending.get((number, offset), frame[offset])
+            if current != expected:
+                raise JournalError("Frame {} byte {} is {}, the journal expects {}".format(
+                    number, offset, current, expected))
+            pending[(number, offset)] = value
+            changes.append((frame, offset, value))
+        self._applying = True
+        try:
+            for frame, offset, value in changes:
+                frame.set(offset, value)
+        finally:
+            self._applying = False
+
+    def _append(self, record):
+        if self._path is None:
+            return
+        with open(self._path, "ab") as fh:
+            fh.write(record)
+
+    def _load(self):
+        """
+        Rebuild the undo and redo stacks from the journal file. An
+        incomplete last record (from a crash) is ignored.
+        """
+        with open(self._path, "rb") as fh:
+            data = fh.read()
+        pos = 0
+        while pos < len(data):
+            kind = data[pos:pos + 1]
+            if kind == _OP:
+                try:
+                    (label_len,) = struct.unpack_from(">H", data, pos + 1)
+                    label = data[pos + 3:pos + 3 + label_len].decode("utf-8")
+                    (count,) = _OP_HEADER.unpack_from(data, pos + 3 + label_len)
+                except (struct.error, UnicodeDecodeError):
+                    break
+                start = pos + 3 + label_len + _OP_HEADER.size
+                end = start + count * _EDIT.size
+                if end > len(data):
+                    break
+                op = Operation(label)
+                op.edits = [_EDIT.unpack_from(data, start + i * _EDIT.size) for i in range(count)]
+                self._done.append(op)
+                self._undone = []
+                pos = end
+            elif kind == _UNDO and self._done:
+                self._undone.append(self._done.pop())
+                pos += 1
+            elif kind == _REDO and self._undone:
+                self._done.append(self._undone.pop())
+                pos += 1
+            else:
+                raise JournalError("Corrupt journal {} at byte {}".format(self._path, pos))
@@ -0,0 +1,202 @@
+# coding: utf-8
+#
+# event_log - bounded structured event log
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import itertools
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+
+LogEvent = namedtuple("LogEvent", ["seq", "timestamp", "level", "source", "message", "transfer"])
+
+INFO = "INFO"
+WARNING = "WARNING"
+ERROR = "ERROR"
+
+
+class EventLog():
+    """
+    Structured event log backed by a bounded ring buffer.
+    Logging an event is a single append, plus a count for errors of a
+    transfer so its summary is complete even if the ring buffer drops
+    events. A background thread writes new events to the output stream
+    (collapsing repeats).
+    """
+    MAX_EVENTS = 1000
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, max_events=MAX_EVENTS, flush_interval=FLUSH_INTERVAL, stream=None):
+        """
+        Create an event log
+        :param max_events: Number of events kept in memory
+        :param flush_interval: Seconds between background flushes
+        :param stream: Output stream for flushed events. Default is stdout.
+        """
+        self._events = deque(maxlen=max_events)
+        self._seq = itertools.count(1)
+        self._flush_interval = flush_interval
+        self._stream = stream
+        self._flush_lock = threading.Lock()
+        self._last_flushed = 0
+        self._summaries = {}
+        self._summary_lock = threading.Lock()
+        self._transfer_ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def log(self, level, source, message, transfer=None):
+        """
+        Record an event. This is safe to call from a receive path.
+        :param level: INFO, WARNING or ERROR
+        :param source: Name of the component logging the event
+        :param message: Message text or an exception
+        :param transfer: Optional transfer id from begin_transfer()
+        :return: None
+        """
+        self._events.append(LogEvent(next(self._seq), time.time(), level, source, message, transfer))
+        if level == ERROR and transfer is not None:
+            with self._summary_lock:
+                if transfer in self._summaries:
+                    self._summaries[transfer][1][str(message)] += 1
+
+    def info(self, source, message, transfer=None):
+        self.log(INFO, source, message, transfer)
+
+    def warning(self, source, message, transfer=None):
+        self.log(WARNING, source, message, transfer)
+
+    def error(self, source, message, transfer=None):
+        self.log(ERROR, source, message, transfer)
+
+    def begin_transfer(self, name):
+        """
+        Start collecting an error summary for a transfer
+        :param name: Description of the transfer
+        :return: Transfer id to be passed with logged events
+        """
+        transfer = next(self._transfer_ids)
+        with self._summary_lock:
+            self._summaries[transfer] = (name, Counter())
+        self.info(name, "Transfer started", transfer)
+        return transfer
+
+    def end_transfer(self, transfer):
+        """
+        Finish a transfer and log its error summary
+        :param transfer: Transfer id from begin_transfer()
+        :return: Counter of error messages logged during the transfer
+        """
+        with self._summary_lock:
+            name, errors = self._summaries.pop(transfer, ("", Counter()))
+        if errors:
+            summary = ", ".join(["{} x{}".format(m, n) for m, n in errors.most_common()])
+            self.warning(name, "Transfer ended with {} error(s): {}".format(sum(errors.values()), summary))
+        else:
+            self.info(name, "Transfer ended without errors")
+        return errors
+
+    def recent(self, count=50):
+        """
+        Return the most recent events
+        :param count: Maximum number of events
+        :return: List of LogEvent, oldest first
+        """
+        events = list(self._events)
+        return events[-count:]
+
+    def format_recent(self, count=50):
+        return "\n".join([EventLog.format_event(e) for e in self.recent(count)])
+
+    @staticmethod
+    def format_event(event):
+        return "{} {:7} {}: {}".format(time.strftime("%H:%M:%S", time.localtime(event.timestamp)),
+                                       event.level, event.source, event.message)
+
+    def start(self, stream=None):
+        """
+        Start the background flusher thread
+        :param stream: Optional output stream that replaces the one given
+        when the log was created, e.g. stderr for command line tools
+        :return: None
+        """
+        if stream is not None:
+            self._stream = stream
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event_log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background flusher and write anything still pending
+        :return: None
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """
+        Write events logged since the last flush.
+        Consecutive identical events are collapsed into one line.
+        :return: None
+        """
+        with self._flush_lock:
+            events = [e for e in list(self._events) if e.seq > self._last_flushed]
+            if not events:
+                return
+
+            lines = []
+            if events[0].seq > self._last_flushed + 1:
+                lines.append("{} event(s) dropped".format(events[0].seq - self._last_flushed - 1))
+            self._last_flushed = events[-1].seq
+
+            previous = None
+            repeats = 0
+            for event in events:
+                key = (event.level, event.source, str(event.message))
+                if key == previous:
+                    repeats += 1
+                    continue
+                if repeats:
+                    lines.append("  (repeated {} more time(s))".format(repeats))
+                    repeats = 0
+                previous = key
+                lines.append(EventLog.format_event(event))
+            if repeats:
+                lines.append("  (repeated {} more time(s))".format(repeats))
+
+            stream = self._stream or sys.stdout
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except Exception:
+                # Nowhere left to report this
+                pass
+
+    def _run(self):
+        while not self._stop.wait(self._flush_interval):
+            self.flush()
+
+
+# The app wide event log
+event_log = EventLog()
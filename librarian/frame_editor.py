@@ -0,0 +1,285 @@
+# coding: utf-8
+#
+# frame_editor - edit control map frames and apply edit templates to banks
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# The Roland checksum is cs = -sum(sx[7:139]) & 0x7F, so changing one
+# byte from old to new changes it to (cs - (new - old)) & 0x7F. Frame
+# edits keep the checksum up to date that way instead of summing the
+# whole frame again.
+#
+# Edit template (JSON):
+#   {"name": "move to channel",
+#    "maps": "1-15", "frames": "1-50",          optional, default all
+#    "transforms": [
+#      {"op": "set", "offsets": [20, 26], "value": "$channel", "mask": 15},
+#      {"op": "add", "offset": 31, "value": 1, "modulo": 16},
+#      {"op": "map", "offsets": [40], "table": {"7": 10, "10": 7}, "frames": "1-10"}]}
+#
+# Offsets are byte positions within the frame (7-138). "mask" limits an
+# edit to some bits of the byte, the value is applied to the masked
+# field. "$name" values come from the parameters given when the template
+# is applied, so one template serves many rigs. The template language
+# knows nothing about what the bytes mean; the offsets come from the user.
+#
+
+import json
+import os
+from map_index import MapIndex, parse_map_spec, parse_number_spec
+from pcr_sysex import CHECKSUM_OFFSET, CHECKSUM_START, CONTROL_MAP_LEN, FRAMES_PER_MAP, \
+    calc_check_sum, map_frame_from_path
+
+
+class EditError(Exception):
+    pass
+
+
+class Frame():
+    """
+    A control map frame that can be edited
+    """
+    def __init__(self, data, name=""):
+        """
+        Wrap a frame
+        :param data: Frame bytes
+        :param name: File name of the frame
+        """
+        if len(data) != CONTROL_MAP_LEN:
+            raise EditError("{}: wrong length {}".format(name, len(data)))
+        self.name = name
+        self._data = bytearray(data)
+        self.listeners = []
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, offset):
+        return self._data[offset]
+
+    def __setitem__(self, offset, value):
+        self.set(offset, value)
+
+    @property
+    def checksum(self):
+        return self._data[CHECKSUM_OFFSET]
+
+    def set(self, offset, value):
+        """
+        Change one data byte and update the checksum
+        :param offset: Byte position 7-138
+        :param value: New value 0-127
+        :return: The checksum delta (new - old checksum), 0 if nothing changed
+        """
+        if not CHECKSUM_START <= offset < CHECKSUM_OFFSET:
+            raise EditError("Offset {} is outside the frame data (7-138)".format(offset))
+        if not 0 <= value <= 0x7F:
+            raise EditError("Value {} at offset {} is not a 7 bit value".format(value, offset))
+        old = self._data[offset]
+        if old == value:
+            return 0
+        self._data[offset] = value
+        old_cs = self._data[CHECKSUM_OFFSET]
+        self._data[CHECKSUM_OFFSET] = (old_cs - (value - old)) & 0x7F
+        cs_delta = self._data[CHECKSUM_OFFSET] - old_cs
+        for listener in self.listeners:
+            listener(self, offset, old, value, cs_delta)
+        return cs_delta
+
+    def is_valid(self):
+        return self._data[CHECKSUM_OFFSET] == calc_check_sum(self._data)
+
+    def to_bytes(self):
+        return bytes(self._data)
+
+
+class Bank():
+    """
+    Editable frames of a bank by file name
+    """
+    def __init__(self, frames):
+        """
+        :param frames: List of Frame in send order
+        """
+        self.frames = {frame.name: frame for frame in frames}
+
+    @classmethod
+    def open(cls, path):
+        """
+        Load a bank directory, bank archive or single bank .syx file
+        """
+        with MapIndex.open(path) as index:
+            return cls([Frame(data, name) for name, data in index.frames()])
+
+    def select(self, maps=None, frames=None):
+        """
+        Frames of some maps
+        :param maps: Map numbers, None for all
+        :param frames: Frame numbers within each map, None for all
+        :return: List of Frame
+        """
+        selected = []
+        for name, frame in self.frames.items():
+            map_frame = map_frame_from_path(name)
+            if map_frame is None:
+                continue
+            if (maps is None or map_frame[0] in maps) and (frames is None or map_frame[1] in frames):
+                selected.append(frame)
+        return selected
+
+    def items(self):
+        return [(name, frame.to_bytes()) for name, frame in self.frames.items()]
+
+    def save(self, output):
+        """
+        Write the bank as a directory, or a single file if output ends in .syx
+        """
+        from map_composer import write_bank
+        check_output(output)
+        write_bank(self.items(), output)
+
+
+def check_output(output):
+    """
+    Edited banks are written as a directory or a single .syx file, which
+    is also where the edit journal lives. Archives and MIDI files are
+    made from the result with export or midi-export.
+    :param output: Output path
+    :return: None. Raises EditError for outputs that cannot be written.
+    """
+    from bank_archive import ARCHIVE_EXTENSION
+    from midi_file import MIDI_EXTENSIONS
+
+    ext = os.path.splitext(output)[1].lower()
+    if ext == ARCHIVE_EXTENSION or ext in MIDI_EXTENSIONS:
+        raise EditError("Cannot write an edited bank to '{}', use a directory or a .syx file".format(output))
+    if ext != ".syx" and os.path.exists(output) and not os.path.isdir(output):
+        raise EditError("Output '{}' is a file, use a directory or a .syx file".format(output))
+
+
+def _field(mask):
+    shift = (mask & -mask).bit_length() - 1
+    return shift, mask >> shift
+
+
+class Template():
+    """
+    A compiled edit template
+    """
+    OPS = ("set", "add", "map")
+
+    def __init__(self, spec):
+        """
+        Compile a template
+        :param spec: Template dict (see the module comment)
+        """
+        self.name = spec.get("name", "")
+        self._maps = parse_map_spec(spec["maps"]) if spec.get("maps") else None
+        self._frames = parse_number_spec(spec["frames"], FRAMES_PER_MAP, "Frames") if spec.get("frames") else None
+        self._transforms = [self._compile(t) for t in spec.get("transforms", [])]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as fh:
+            return cls(json.load(fh))
+
+    def _compile(self, t):
+        op = t.get("op")
+        if op not in Template.OPS:
+            raise EditError("Unknown transform op '{}'".format(op))
+        offsets = t["offsets"] if "offsets" in t else [t["offset"]]
+        for offset in offsets:
+            if not CHECKSUM_START <= offset < CHECKSUM_OFFSET:
+                raise EditError("Offset {} is outside the frame data (7-138)".format(offset))
+        mask = t.get("mask", 0x7F)
+        if not 0 < mask <= 0x7F:
+            raise EditError("Mask {} is not a 7 bit mask".format(mask))
+        maps = parse_map_spec(t["maps"]) if t.get("maps") else self._maps
+        frames = parse_number_spec(t["frames"], FRAMES_PER_MAP, "Frames") if t.get("frames") else self._frames
+        table = {int(k): v for k, v in t.get("table", {}).items()}
+        return {"op": op, "offsets": offsets, "mask": mask, "value": t.get("value"), "table": table,
+                "modulo": t.get("modulo"), "maps": maps, "frames": frames}
+
+    @staticmethod
+    def _value(value, params):
+        if isinstance(value, str) and value.startswith("$"):
+            if value[1:] not in params:
+                raise EditError("No value given for template parameter '{}'".format(value[1:]))
+            return int(params[value[1:]])
+        return value
+
+    def apply(self, bank, params=None):
+        """
+        Apply the template to a bank
+        :param bank: Bank
+        :param params: Dict of template parameter values
+        :return: Number of bytes changed
+        """
+        params = params or {}
+        changed = 0
+        for t in self._transforms:
+            value = Template._value(t["value"], params)
+            shift, field_max = _field(t["mask"])
+            keep = ~t["mask"] & 0x7F
+            for frame in bank.select(t["maps"], t["frames"]):
+                for offset in t["offsets"]:
+                    old = frame[offset]
+                    field = (old & t["mask"]) >> shift
+                    if t["op"] == "set":
+                        new_field = value
+                    elif t["op"] == "add":
+                        new_field = field + value
+                        if t["modulo"]:
+                            new_field %= t["modulo"]
+                    else:
+                        new_field = t["table"].get(field, field)
+                    new = (old & keep) | (min(max(new_field, 0), field_max) << shift)
+                    if new != old:
+                        frame.set(offset, new)
+                        changed += 1
+        return changed
+
+
+def apply_template_batch(template, jobs, journal=True):
+    """
+    Apply one template to many banks
+    :param template: Template
+    :param jobs: List of dicts with "input", "output" and optional "params"
+    :param journal: Record the edits in the output bank's edit journal so they can be undone
+    :return: List of (output, bytes changed)
+    """
+    from edit_journal import EditJournal, journal_path
+
+    # Fail before any bank is changed
+    for job in jobs:
+        check_output(job["output"])
+
+    results = []
+    for job in jobs:
+        bank = Bank.open(job["input"])
+        if journal:
+            if job["output"] != job["input"] and os.path.exists(journal_path(job["output"])):
+                # The old journal belongs to the bank being replaced
+                os.remove(journal_path(job["output"]))
+            if not job["output"].lower().endswith(".syx"):
+                os.makedirs(job["output"], exist_ok=True)
+            bank_journal = EditJournal(bank, journal_path(job["output"]))
+            bank_journal.begin(template.name or "Template")
+            changed = template.apply(bank, job.get("params"))
+            bank_journal.commit()
+        else:
+            changed = template.apply(bank, job.get("params"))
+        bank.save(job["output"])
+        results.append((job["output"], changed))
+    return results
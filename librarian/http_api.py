@@ -0,0 +1,378 @@
+# coding: utf-8
+#
+# http_api - local HTTP/JSON control API for the librarian engine
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# Endpoints
+#   GET    /ports                  MIDI in and out port names
+#   GET    /banks                  bank names in the library
+#   GET    /banks/<name>           download a bank as one .syx file
+#   GET    /jobs                   recent jobs
+#   POST   /jobs                   {"kind": "backup", "port": "PCR 1", "bank": "pcr1"}
+#                                  ("maps": "3-5" restores only those maps)
+#   POST   /backup-all             {"prefix": "nightly"} backup every MIDI in port
+#   GET    /jobs/<id>              job status
+#   DELETE /jobs/<id>              cancel a job
+#   GET    /jobs/<id>/events       job progress as Server-Sent Events
+#
+# Banks are directories of .syx files below the library directory.
+# Jobs for the same port are queued, jobs for different ports run
+# at the same time.
+#
+"""
+Serve a local HTTP/JSON API for PCR backups and restores.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse, parse_qs
+
+import job_queue
+import pcr_cli
+from event_log import event_log
+from map_index import parse_map_spec
+from transfer_progress import TransferProgress
+
+
+log = logging.getLogger("pcr-http")
+
+# Seconds between Server-Sent Events progress updates
+EVENT_INTERVAL = 0.25
+_FINAL_STATES = (job_queue.DONE, job_queue.FAILED, job_queue.CANCELED)
+
+
+class LibrarianService():
+    """
+    Job queue and bank library behind the HTTP API
+    """
+    def __init__(self, library, db_path=":memory:"):
+        """
+        Create the service
+        :param library: Directory holding one sub-directory per bank
+        :param db_path: SQLite job database. Default is in memory.
+        """
+        self.library = os.path.realpath(library)
+        self._progress = {}
+        self._lock = threading.Lock()
+        self.store = job_queue.JobStore(db_path)
+        self.pool = job_queue.PortWorkerPool(self.store, self._run_job)
+        self.pool.listeners.append(self._job_changed)
+
+    def start(self):
+        self.pool.start()
+
+    def stop(self):
+        self.pool.stop()
+
+    def bank_path(self, name):
+        """
+        Resolve a bank name to its directory, staying inside the library
+        :param name: Bank name
+        :return: Directory path
+        """
+        path = os.path.realpath(os.path.join(self.library, name))
+        if not name or os.path.dirname(path) != self.library:
+            raise ValueError("Invalid bank name '{}'".format(name))
+        return path
+
+    def banks(self):
+        return sorted([e.name for e in os.scandir(self.library) if e.is_dir()])
+
+    def submit(self, kind, port, bank, single=False, clean=False, incremental=False, maps=None):
+        if kind not in job_queue.JOB_KINDS:
+            raise ValueError("Unknown job kind '{}'".format(kind))
+        if maps is not None:
+            if not isinstance(maps, str):
+                raise ValueError("maps must be a string such as \"3-5\"")
+            parse_map_spec(maps)
+        directory = self.bank_path(bank)
+        if kind == "backup":
+            os.makedirs(directory, exist_ok=True)
+        params = {"directory": directory, "bank": bank, "single": single, "clean": clean,
+                  "incremental": incremental, "maps": maps}
+        return self.pool.submit(kind, port, params, max_attempts=1)
+
+    def progress(self, job_id):
+        with self._lock:
+            return self._progress.get(job_id)
+
+    def _job_changed(self, job_id, status):
+        # Finished jobs are read from the store, their progress is no longer needed
+        if status in _FINAL_STATES:
+            with self._lock:
+                self._progress.pop(job_id, None)
+
+    def _run_job(self, job, cancel):
+        progress = TransferProgress()
+        with self._lock:
+            self._progress[job["id"]] = progress
+        params = json.loads(job["params"])
+        params["command"] = job["kind"]
+        params.setdefault("port", job["port"])
+        return pcr_cli.run_job(params, cancel, progress)
+
+
+def _job_view(job, progress=None):
+    view = {k: job[k] for k in ("id", "kind", "port", "status", "attempts", "exit_code", "error", "created", "updated")}
+    view["bank"] = json.loads(job["params"]).get("bank")
+    if progress is not None:
+        snap = progress.snapshot()
+        view["progress"] = {"done": snap.done, "total": snap.total, "bytes": snap.bytes,
+                            "bytes_per_sec": snap.bytes_per_sec, "eta": snap.eta}
+    return view
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, fmt, *args):
+        log.debug(fmt, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _route(self):
+        return [unquote(p) for p in urlparse(self.path).path.strip("/").split("/") if p]
+
+    def do_GET(self):
+        parts = self._route()
+        try:
+            if parts == ["ports"]:
+                self._send_json(200, {"in": pcr_cli._in_ports(), "out": pcr_cli._out_ports()})
+            elif parts == ["banks"]:
+                self._send_json(200, {"banks": self.service.banks()})
+            elif len(parts) == 2 and parts[0] == "banks":
+                self._send_bank(parts[1])
+            elif parts == ["jobs"]:
+                status = parse_qs(urlparse(self.path).query).get("status", [None])[0]
+                self._send_json(200, {"jobs": [_job_view(j) for j in self.service.store.list(status)]})
+            elif len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+                job = self.service.store.get(int(parts[1]))
+                if job is None:
+                    self._send_json(404, {"error": "No such job"})
+                else:
+                    self._send_json(200, _job_view(job, self.service.progress(job["id"])))
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[1].isdigit() and parts[2] == "events":
+                self._send_events(int(parts[1]))
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except ValueError as ex:
+            self._send_json(400, {"error": str(ex)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except OSError as ex:
+            log.error(ex)
+            self._send_json(500, {"error": str(ex)})
+
+    def do_POST(self):
+        parts = self._route()
+        try:
+            body = self._read_json()
+            if parts == ["jobs"]:
+                job_id = self.service.submit(body.get("kind"), body.get("port", ""), body.get("bank", ""),
+                                             single=body.get("single", False), clean=body.get("clean", False),
+                                             incremental=body.get("incremental", False),
+                                             maps=body.get("maps"))
+                self._send_json(202, {"id": job_id})
+            elif parts == ["backup-all"]:
+                prefix = body.get("prefix", "backup")
+                ids = []
+                for port in pcr_cli._in_ports():
+                    bank = "{}-{}".format(prefix, re.sub(r"[^A-Za-z0-9_.-]+", "_", port).strip("_"))
+                    ids.append(self.service.submit("backup", port, bank, clean=True))
+                self._send_json(202, {"ids": ids})
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except ValueError as ex:
+            self._send_json(400, {"error": str(ex)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except OSError as ex:
+            log.error(ex)
+            self._send_json(500, {"error": str(ex)})
+
+    def do_DELETE(self):
+        parts = self._route()
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            if self.service.pool.cancel(int(parts[1])):
+                self._send_json(200, {"canceled": True})
+            else:
+                self._send_json(409, {"error": "Job is not queued or running"})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def _send_bank(self, name):
+        path = self.service.bank_path(name)
+        if not os.path.isdir(path):
+            self._send_json(404, {"error": "No such bank"})
+            return
+        # Read the whole bank (about 100KB) first so a read error can still be answered with a 500
+        data = []
+        for f in pcr_cli.bank_files(path):
+            with open(f, 'rb') as fh:
+                data.append(fh.read())
+        data = b"".join(data)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", 'attachment; filename="{}.syx"'.format(quote(name)))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_events(self, job_id):
+        if self.service.store.get(job_id) is None:
+            self._send_json(404, {"error": "No such job"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                job = self.service.store.get(job_id)
+                view = _job_view(job, self.service.progress(job_id))
+                final = job["status"] in _FINAL_STATES
+                self.wfile.write("event: {}\ndata: {}\n\n".format("done" if final else "progress",
+                                                                   json.dumps(view)).encode("utf-8"))
+                self.wfile.flush()
+                if final:
+                    break
+                time.sleep(EVENT_INTERVAL)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class LibrarianHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, port=8080, host="127.0.0.1"):
+        super(LibrarianHTTPServer, self).__init__((host, port), _Handler)
+        self.service = service
+
+
+class ApiClient():
+    """
+    Minimal client for the HTTP API
+    """
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip("/")
+
+    def _request(self, method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self._base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def ports(self):
+        return self._request("GET", "/ports")
+
+    def banks(self):
+        return self._request("GET", "/banks")["banks"]
+
+    def submit(self, kind, port, bank, single=False, clean=False, incremental=False):
+        return self._request("POST", "/jobs", {"kind": kind, "port": port, "bank": bank, "single": single,
+                                               "clean": clean, "incremental": incremental})["id"]
+
+    def backup_all(self, prefix="backup"):
+        return self._request("POST", "/backup-all", {"prefix": prefix})["ids"]
+
+    def job(self, job_id):
+        return self._request("GET", "/jobs/{}".format(job_id))
+
+    def cancel(self, job_id):
+        return self._request("DELETE", "/jobs/{}".format(job_id))
+
+    def events(self, job_id):
+        """
+        Follow a job's Server-Sent Events
+        :param job_id: Job id
+        :return: Generator of (event, data dict) until the job ends
+        """
+        with urllib.request.urlopen(self._base_url + "/jobs/{}/events".format(job_id)) as resp:
+            event = None
+            for line in resp:
+                line = line.decode("utf-8").rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    yield event, json.loads(line[6:])
+
+    def download_bank(self, name):
+        with urllib.request.urlopen(self._base_url + "/banks/{}".format(quote(name))) as resp:
+            return resp.read()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-l', '--library', required=True, help="directory holding one sub-directory per bank")
+    parser.add_argument('--port', type=int, default=8080, help="HTTP port (default: %(default)s)")
+    parser.add_argument('--db', default=":memory:", help="SQLite job database (default: in memory)")
+    parser.add_argument('--emulate', type=int, default=0, metavar="N",
+                        help="add N emulated PCRs as MIDI ports, for testing")
+    parser.add_argument('-v', '--verbose', action="store_true", help='verbose logging output (debug)')
+    args = parser.parse_args(args)
+    logging.basicConfig(format="%(name)s: %(levelname)s - %(message)s",
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+
+    if args.emulate:
+        from pcr_emulator import PCREmulator
+        from pcr_midi_util import register_virtual_device
+        for i in range(args.emulate):
+            register_virtual_device("PCR Emulator {}".format(i + 1), PCREmulator.synthetic())
+
+    service = LibrarianService(args.library, args.db)
+    server = LibrarianHTTPServer(service, args.port)
+    event_log.start(sys.stderr)
+    service.start()
+    log.info("Serving on http://127.0.0.1:%d/", server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        event_log.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
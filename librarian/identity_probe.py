@@ -0,0 +1,221 @@
+# coding: utf-8
+#
+# identity_probe - find the MIDI ports of the connected keyboards
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# The probe opens every MIDI in port, sends a Universal Non-Realtime
+# Identity Request to all devices on every MIDI out port at once and
+# collects the Identity Replies that arrive on the in ports within a
+# short timeout. The whole probe takes one timeout however many ports
+# there are.
+#
+#   request   F0 7E 7F 06 01 F7
+#   reply     F0 7E dev 06 02 mfr(1 or 3) family(2) member(2) version(4) F7
+#
+# Replies say which in port a device is on but not which out port the
+# request went through, so a replying in port is paired with the out port
+# of the same name (ignoring in/out words and port numbers), e.g.
+# "PCR-800 MIDI IN 1" with "PCR-800 MIDI OUT 1".
+#
+# The family code of the PCR is not known here, so the PCR is found by
+# elimination: when exactly one in port has a Roland device on it, that
+# is taken to be the PCR. With several Roland devices (a synth or an
+# interface in the same rack) they are all labelled with their family
+# and member codes and none is picked.
+#
+# Results are cached by port name in the configuration, so the probe
+# only runs again when ports appear that have not been seen yet. A port
+# where nothing answered is cached with the time of the probe and tried
+# again after NO_ANSWER_TTL, as its device may have been switched off.
+# Ports that never answer (e.g. "Midi Through") therefore cost at most
+# one probe per NO_ANSWER_TTL. File > Detect PCR ports probes at once.
+#
+
+import difflib
+import re
+import time
+from collections import namedtuple
+
+
+IDENTITY_REQUEST = [0xF0, 0x7E, 0x7F, 0x06, 0x01, 0xF7]
+ROLAND = 0x41
+# Seconds to wait for replies
+PROBE_TIMEOUT = 0.3
+POLL_INTERVAL = 0.005
+# Seconds a "no answer" result is trusted
+NO_ANSWER_TTL = 3600
+
+Identity = namedtuple("Identity", ["device_id", "manufacturer", "family", "member", "version"])
+
+_PORT_WORDS = re.compile(r"\b(midi ?)?(in|out|input|output)\b|\bmidi(in|out)\b|\s*\d+:\d+$")
+
+
+def parse_identity_reply(message):
+    """
+    Decode an Identity Reply
+    :param message: Sysex message
+    :return: Identity or None if the message is not an Identity Reply
+    """
+    if len(message) < 15 or message[0] != 0xF0 or message[1] != 0x7E or message[3:5] != bytes([0x06, 0x02]):
+        return None
+    pos = 5
+    if message[pos] == 0:
+        manufacturer = tuple(message[pos:pos + 3])
+        pos += 3
+    else:
+        manufacturer = message[pos]
+        pos += 1
+    if len(message) < pos + 9:
+        return None
+    family = message[pos] | (message[pos + 1] << 7)
+    member = message[pos + 2] | (message[pos + 3] << 7)
+    version = tuple(message[pos + 4:pos + 8])
+    return Identity(message[2], manufacturer, family, member, version)
+
+
+def is_roland(identity):
+    return identity is not None and identity.manufacturer == ROLAND
+
+
+def describe(identity, is_pcr=False):
+    """
+    Short label of an identity for the port lists
+    :param is_pcr: The device was identified as the PCR, see detect_ports()
+    """
+    if identity is None:
+        return ""
+    if is_pcr:
+        return "Roland PCR"
+    if is_roland(identity):
+        return "Roland {:04X}/{:04X}".format(identity.family, identity.member)
+    if isinstance(identity.manufacturer, tuple):
+        return "ID " + " ".join(["%02X" % b for b in identity.manufacturer])
+    return "ID %02X" % identity.manufacturer
+
+
+def _port_key(name):
+    return " ".join(_PORT_WORDS.sub(" ", name.lower()).split())
+
+
+def pair_port(in_name, out_ports):
+    """
+    The out port that belongs to the same device as an in port
+    :param in_name: MIDI in port name
+    :param out_ports: MIDI out port names
+    :return: Out port name or None
+    """
+    if in_name in out_ports:
+        return in_name
+    key = _port_key(in_name)
+    keys = [_port_key(name) for name in out_ports]
+    if key in keys:
+        return out_ports[keys.index(key)]
+    close = difflib.get_close_matches(key, keys, n=1, cutoff=0.75)
+    return out_ports[keys.index(close[0])] if close else None
+
+
+def probe(in_ports, out_ports, timeout=PROBE_TIMEOUT):
+    """
+    Send an Identity Request on every out port and collect the replies
+    :param in_ports: MIDI in port names, numbered in list order
+    :param out_ports: MIDI out port names, numbered in list order
+    :param timeout: Seconds to wait for replies
+    :return: Dict of in port name to Identity, or None for ports that did not answer
+    """
+    from pcr_midi_util import open_midiin, open_midiout
+    from event_log import event_log
+
+    midiins = []
+    results = {name: None for name in in_ports}
+    try:
+        for number, name in enumerate(in_ports):
+            try:
+                midiin = open_midiin(number)
+                midiin.ignore_types(sysex=False)
+                midiins.append((name, midiin))
+            except Exception as ex:
+                event_log.error("Identity probe", ex)
+        for number, name in enumerate(out_ports):
+            try:
+                midiout = open_midiout(number)
+                midiout.send_message(IDENTITY_REQUEST)
+                midiout.close_port()
+            except Exception as ex:
+                event_log.error("Identity probe", ex)
+
+        deadline = time.monotonic() + timeout
+        waiting = dict(midiins)
+        while waiting and time.monotonic() < deadline:
+            for name, midiin in list(waiting.items()):
+                event = midiin.get_message()
+                while event is not None:
+                    identity = parse_identity_reply(bytes(event[0]))
+                    if identity is not None:
+                        results[name] = identity
+                        del waiting[name]
+                        break
+                    event = midiin.get_message()
+            time.sleep(POLL_INTERVAL)
+    finally:
+        for name, midiin in midiins:
+            midiin.close_port()
+    return results
+
+
+def _to_config(identity, now):
+    return {"no_answer": now} if identity is None else identity._asdict()
+
+
+def _is_fresh(entry, now):
+    """
+    True if a cached entry can be used without probing. Entries of
+    older versions hold None for no answer and are probed again.
+    """
+    if entry is None:
+        return False
+    return "no_answer" not in entry or now - entry["no_answer"] < NO_ANSWER_TTL
+
+
+def _from_config(entry):
+    if entry is None or "no_answer" in entry:
+        return None
+    manufacturer = entry["manufacturer"]
+    return Identity(entry["device_id"], tuple(manufacturer) if isinstance(manufacturer, list) else manufacturer,
+                    entry["family"], entry["member"], tuple(entry["version"]))
+
+
+def detect_ports(in_ports, out_ports, timeout=PROBE_TIMEOUT, refresh=False):
+    """
+    Identify the devices on the MIDI ports, probing only if some in
+    port has not been seen before or its "no answer" result has expired
+    :param in_ports: MIDI in port names
+    :param out_ports: MIDI out port names
+    :param refresh: Probe even if every port is cached
+    :return: (dict of in port name to Identity or None, list of (in port, out port)
+    pairs of PCRs). The list is empty unless exactly one in port has a Roland device.
+    """
+    from configuration import Configuration
+
+    cached = Configuration.get_port_identities()
+    now = time.time()
+    if refresh or not all(_is_fresh(cached.get(name), now) for name in in_ports):
+        identities = probe(in_ports, out_ports, timeout)
+        Configuration.set_port_identities({name: _to_config(identity, now)
+                                           for name, identity in identities.items()})
+    else:
+        identities = {name: _from_config(cached[name]) for name in in_ports}
+    rolands = [name for name in in_ports if is_roland(identities[name])]
+    pcrs = [(rolands[0], pair_port(rolands[0], out_ports))] if len(rolands) == 1 else []
+    return identities, pcrs
@@ -0,0 +1,184 @@
+# coding: utf-8
+#
+# incremental_backup - scheduled backups that only store changed control maps
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# An incremental backup of a device is a series of snapshot directories
+# below one device directory:
+#
+#   backups/pcr1/20201003-020000/manifest.json
+#   backups/pcr1/20201003-020000/pcr-0001.syx ... (changed maps only)
+#   backups/pcr1/20201004-020000/manifest.json   (nothing changed)
+#
+# The manifest records the hash of every map. A map that differs from
+# the previous snapshot has its frames stored in the snapshot. A map
+# that did not change is only marked as unchanged and points at the
+# snapshot that holds its frames.
+#
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from os.path import basename, isdir, isfile, join
+from pcr_sysex import FRAMES_PER_MAP, frame_file_name, map_frame_from_index
+
+
+MANIFEST = "manifest.json"
+SNAPSHOT_NAME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def read_manifest(snapshot_dir):
+    """
+    Read the manifest of a snapshot
+    :param snapshot_dir: Snapshot directory
+    :return: Manifest dict or None if the directory is not a snapshot
+    """
+    path = join(snapshot_dir, MANIFEST)
+    if not isfile(path):
+        return None
+    with open(path, "r") as fh:
+        return json.load(fh)
+
+
+def list_snapshots(device_dir):
+    """
+    Snapshots of a device, oldest first
+    :param device_dir: Device directory
+    :return: List of snapshot names
+    """
+    if not isdir(device_dir):
+        return []
+    return sorted([e.name for e in os.scandir(device_dir)
+                   if e.is_dir() and isfile(join(e.path, MANIFEST))])
+
+
+def latest_snapshot(device_dir):
+    snapshots = list_snapshots(device_dir)
+    return snapshots[-1] if snapshots else None
+
+
+def snapshot_files(device_dir, name=None):
+    """
+    Locate the frame files that make up a snapshot
+    :param device_dir: Device directory
+    :param name: Snapshot name, default is the latest
+    :return: Frame file paths in send order
+    """
+    name = name or latest_snapshot(device_dir)
+    manifest = read_manifest(join(device_dir, name)) if name else None
+    if manifest is None:
+        return []
+    files = []
+    for map_number in sorted(manifest["maps"], key=int):
+        entry = manifest["maps"][map_number]
+        source = join(device_dir, entry["stored_in"])
+        files.extend([join(source, frame_file_name(int(map_number), f)) for f in range(1, entry["frames"] + 1)])
+    return files
+
+
+def materialize(device_dir, target, name=None):
+    """
+    Copy a snapshot's frames into a plain bank directory
+    :param device_dir: Device directory
+    :param target: Bank directory to fill
+    :param name: Snapshot name, default is the latest
+    :return: Number of files copied
+    """
+    files = snapshot_files(device_dir, name)
+    os.makedirs(target, exist_ok=True)
+    for f in files:
+        shutil.copyfile(f, join(target, basename(f)))
+    return len(files)
+
+
+class IncrementalSnapshot():
+    """
+    Receives frames as they stream in, hashes each map and writes
+    the frames of the maps that changed since the previous snapshot.
+    Pass on_frame as the frame handler of transfer_engine.receive_frames.
+    """
+    def __init__(self, device_dir, port_name="", name=None):
+        """
+        Start a snapshot
+        :param device_dir: Device directory holding the snapshots
+        :param port_name: Recorded in the manifest
+        :param name: Snapshot name, default is the current time
+        """
+        self.device_dir = device_dir
+        self.name = name or time.strftime(SNAPSHOT_NAME_FORMAT)
+        self.path = join(device_dir, self.name)
+        previous = latest_snapshot(device_dir)
+        self._previous = read_manifest(join(device_dir, previous)) if previous else None
+        self._manifest = {"created": time.time(), "port": port_name, "maps": {}}
+        self._map_number = None
+        self._frames = []
+        self._hash = None
+        self.changed = []
+        self.unchanged = []
+        os.makedirs(self.path, exist_ok=True)
+
+    def on_frame(self, index, data):
+        map_number, frame_number = map_frame_from_index(index)
+        if map_number != self._map_number:
+            self._finish_map()
+            self._map_number = map_number
+            self._hash = hashlib.sha256()
+        self._hash.update(data)
+        self._frames.append((frame_number, data))
+        if len(self._frames) == FRAMES_PER_MAP:
+            self._finish_map()
+
+    def _finish_map(self):
+        if not self._frames:
+            return
+        map_number = self._map_number
+        digest = self._hash.hexdigest()
+        key = str(map_number)
+        old = self._previous["maps"].get(key) if self._previous else None
+        if old is not None and old["hash"] == digest and old["frames"] == len(self._frames):
+            self._manifest["maps"][key] = {"hash": digest, "frames": len(self._frames),
+                                           "changed": False, "stored_in": old["stored_in"]}
+            self.unchanged.append(map_number)
+        else:
+            for frame_number, data in self._frames:
+                with open(join(self.path, frame_file_name(map_number, frame_number)), "wb") as fh:
+                    fh.write(data)
+            self._manifest["maps"][key] = {"hash": digest, "frames": len(self._frames),
+                                           "changed": True, "stored_in": self.name}
+            self.changed.append(map_number)
+        self._frames = []
+        self._map_number = None
+
+    def close(self):
+        """
+        Store the remaining frames and write the manifest. The manifest
+        is written last so an interrupted backup is never used as the
+        previous snapshot.
+        :return: Manifest dict
+        """
+        self._finish_map()
+        tmp = join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(self._manifest, fh, indent=1)
+        os.replace(tmp, join(self.path, MANIFEST))
+        return self._manifest
+
+    def discard(self):
+        """
+        Remove a snapshot that did not complete
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
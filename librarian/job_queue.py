@@ -0,0 +1,343 @@
+# coding: utf-8
+#
+# job_queue - persistent job queue with one worker per MIDI port
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+The persistent job queue and the port workers shared by the backup
+daemon and the HTTP API. Nothing here needs a socket, so the module
+works on every platform.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import pcr_cli
+
+
+log = logging.getLogger("pcr-jobs")
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELED = "canceled"
+
+JOB_KINDS = ("backup", "restore", "verify")
+
+# Exit codes that are not worth retrying
+_NO_RETRY = (pcr_cli.EXIT_OK, pcr_cli.EXIT_USAGE, pcr_cli.EXIT_CANCELED)
+
+
+class JobStore():
+    """
+    SQLite backed job queue. One connection is shared by all threads.
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            port TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            next_run REAL NOT NULL,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            exit_code INTEGER,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (port, status, next_run);
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.executescript(JobStore._SCHEMA)
+            # Jobs that were running when the daemon stopped are run again
+            self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def submit(self, kind, port, params, max_attempts=3, delay=0.0):
+        """
+        Queue a job
+        :param kind: backup, restore or verify
+        :param port: Key of the MIDI port the job uses (see pcr_cli.port_key)
+        :param params: Dict of job settings (directory etc.)
+        :param max_attempts: Number of tries before the job fails
+        :param delay: Seconds before the job may run
+        :return: The job id
+        """
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO jobs (kind, port, params, status, max_attempts, next_run, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, str(port), json.dumps(params), QUEUED, max_attempts, now + delay, now, now))
+            return cur.lastrowid
+
+    def claim_next(self, port):
+        """
+        Take the next runnable job for a port and mark it running
+        :param port: Port key
+        :return: Job dict or None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE port = ? AND status = ? AND next_run <= ? ORDER BY next_run, id LIMIT 1",
+                (port, QUEUED, now)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                             (RUNNING, now, row["id"]))
+            job = dict(row)
+            job["attempts"] += 1
+            return job
+
+    def next_run_time(self, port):
+        """
+        When the next queued job of a port becomes runnable
+        :param port: Port key
+        :return: Time (epoch seconds) or None if nothing is queued
+        """
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_run) FROM jobs WHERE port = ? AND status = ?",
+                                   (port, QUEUED)).fetchone()
+            return row[0]
+
+    def finish(self, job_id, status, exit_code=None, error=None, next_run=None):
+        with self._lock:
+            if next_run is None:
+                self._db.execute("UPDATE jobs SET status = ?, exit_code = ?, error = ?, updated = ? WHERE id = ?",
+                                 (status, exit_code, error, time.time(), job_id))
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, exit_code = ?, error = ?, next_run = ?, updated = ? WHERE id = ?",
+                    (status, exit_code, error, next_run, time.time(), job_id))
+
+    def requeue(self, job_id):
+        """
+        Put a job that was interrupted by a shutdown back in the queue. The
+        interrupted run does not count as an attempt.
+        :param job_id: Job id
+        """
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), updated = ? WHERE id = ?",
+                             (QUEUED, time.time(), job_id))
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued job
+        :param job_id: Job id
+        :return: True if a queued job was canceled
+        """
+        with self._lock:
+            cur = self._db.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+                                   (CANCELED, time.time(), job_id, QUEUED))
+            return cur.rowcount > 0
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list(self, status=None, limit=100):
+        with self._lock:
+            if status:
+                rows = self._db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?",
+                                        (status, limit)).fetchall()
+            else:
+                rows = self._db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            return [dict(r) for r in rows]
+
+    def ports(self):
+        """
+        Ports that have queued jobs
+        :return: List of port keys
+        """
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT port FROM jobs WHERE status = ?", (QUEUED,))]
+
+
+def run_job(job, cancel):
+    """
+    Run a stored job with the command line engine
+    :param job: Job dict from the JobStore
+    :param cancel: threading.Event for canceling the job
+    :return: Exit code
+    """
+    params = json.loads(job["params"])
+    params["command"] = job["kind"]
+    # Jobs queued before the port was kept in the params have it as the key
+    params.setdefault("port", job["port"])
+    return pcr_cli.run_job(params, cancel)
+
+
+class PortWorkerPool():
+    """
+    One worker thread per MIDI port. A worker runs the jobs of its
+    port one at a time, so jobs on different ports run concurrently.
+    """
+    BACKOFF_BASE = 30.0
+    BACKOFF_MAX = 3600.0
+    IDLE_WAIT = 5.0
+
+    def __init__(self, store, runner=run_job):
+        """
+        Create the worker pool
+        :param store: JobStore
+        :param runner: Callable (job, cancel_event) returning an exit code
+        """
+        self._store = store
+        self._runner = runner
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._wakeups = {}
+        self._running = {}
+        # Running jobs canceled by the user, as opposed to stopped by a shutdown
+        self._user_canceled = set()
+        self._stop = threading.Event()
+        self.listeners = []
+
+    def start(self):
+        for port in self._store.ports():
+            self.wake(port)
+
+    def stop(self):
+        """
+        Stop the workers. Running jobs are interrupted and queued again,
+        so they run when the pool is next started.
+        """
+        self._stop.set()
+        with self._lock:
+            for cancel in self._running.values():
+                cancel.set()
+            for wakeup in self._wakeups.values():
+                wakeup.set()
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.join()
+
+    def submit(self, kind, port, params, max_attempts=3):
+        """
+        Queue a job on the worker of its port
+        :param kind: backup, restore or verify
+        :param port: MIDI port number or name
+        :param params: Dict of job settings
+        :return: The job id
+        """
+        # A port given by number and by name must get one worker, not two
+        key = pcr_cli.port_key(kind, port)
+        job_id = self._store.submit(kind, key, dict(params, port=str(port)), max_attempts)
+        self.wake(key)
+        return job_id
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job
+        :param job_id: Job id
+        :return: True if the job was canceled
+        """
+        if self._store.cancel(job_id):
+            self._publish(job_id, CANCELED)
+            return True
+        with self._lock:
+            cancel = self._running.get(job_id)
+            if cancel is not None:
+                self._user_canceled.add(job_id)
+        if cancel is not None:
+            cancel.set()
+            return True
+        return False
+
+    def wake(self, port):
+        """
+        Make sure the port has a worker and that it checks for jobs
+        :param port: Port key
+        :return: None
+        """
+        with self._lock:
+            if port not in self._workers:
+                self._wakeups[port] = threading.Event()
+                worker = threading.Thread(target=self._work, args=(port,), name="port-{}".format(port), daemon=True)
+                self._workers[port] = worker
+                worker.start()
+            self._wakeups[port].set()
+
+    def _publish(self, job_id, status):
+        for listener in list(self.listeners):
+            try:
+                listener(job_id, status)
+            except Exception as ex:
+                log.error("Job listener failed: %s", ex)
+
+    def _work(self, port):
+        wakeup = self._wakeups[port]
+        while not self._stop.is_set():
+            job = self._store.claim_next(port)
+            if job is None:
+                next_run = self._store.next_run_time(port)
+                timeout = PortWorkerPool.IDLE_WAIT if next_run is None else max(next_run - time.time(), 0.0)
+                wakeup.wait(min(timeout, PortWorkerPool.IDLE_WAIT))
+                wakeup.clear()
+                continue
+
+            cancel = threading.Event()
+            with self._lock:
+                self._running[job["id"]] = cancel
+            self._publish(job["id"], RUNNING)
+            log.info("Job %d: %s on port %s, attempt %d", job["id"], job["kind"], port, job["attempts"])
+            try:
+                code = self._runner(job, cancel)
+                error = None
+            except Exception as ex:
+                code = pcr_cli.EXIT_ERROR
+                error = str(ex)
+            finally:
+                with self._lock:
+                    del self._running[job["id"]]
+                    user_canceled = job["id"] in self._user_canceled
+                    self._user_canceled.discard(job["id"])
+
+            if code == pcr_cli.EXIT_OK:
+                self._store.finish(job["id"], DONE, code)
+                status = DONE
+            elif self._stop.is_set() and not user_canceled:
+                self._store.requeue(job["id"])
+                status = QUEUED
+                log.info("Job %d interrupted by shutdown, queued to run again", job["id"])
+            elif cancel.is_set() or code == pcr_cli.EXIT_CANCELED:
+                self._store.finish(job["id"], CANCELED, code, error)
+                status = CANCELED
+            elif code not in _NO_RETRY and job["attempts"] < job["max_attempts"]:
+                delay = min(PortWorkerPool.BACKOFF_BASE * 2 ** (job["attempts"] - 1), PortWorkerPool.BACKOFF_MAX)
+                self._store.finish(job["id"], QUEUED, code, error, next_run=time.time() + delay)
+                status = QUEUED
+                log.info("Job %d failed with exit code %d, retry in %.0f s", job["id"], code, delay)
+            else:
+                self._store.finish(job["id"], FAILED, code, error)
+                status = FAILED
+            self._publish(job["id"], status)
@@ -0,0 +1,197 @@
+# coding: utf-8
+#
+# map_composer - assemble a new bank from control maps of other banks
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# A frame's destination is given by the address that follows the sysex
+# header. Moving a map to another slot means giving its frames the
+# addresses of the target slot. Rather than computing addresses, the
+# composer copies them from a bank that holds the target slot: the
+# reference bank if one is given, otherwise the first source bank that
+# has the slot. The checksum of every frame is then recomputed.
+#
+# Composition spec (JSON):
+#   {"reference": "backups/full",
+#    "maps": {"1": {"bank": "backups/2019", "map": 7},
+#             "2": {"bank": "backups/2020.pcrz", "map": 3}},
+#    "output": "show"}               directory, or a .syx file name
+#
+
+import json
+import os
+from os.path import join
+from map_index import MapIndex
+from pcr_sysex import CHECKSUM_OFFSET, CONTROL_MAP_LEN, calc_check_sum, frame_file_name
+
+
+# Roland DT1 data set: 7 header bytes then the address
+ADDRESS_START = 7
+ADDRESS_LEN = 4
+
+
+class ComposeError(Exception):
+    pass
+
+
+class BankComposer():
+    """
+    Builds a bank from map slots of other banks. Source banks are
+    indexed once and can be shared by many compositions.
+    """
+    def __init__(self, reference=None):
+        """
+        Create a composer
+        :param reference: Optional bank path with the addresses of every slot
+        """
+        self._reference = reference
+        self._indexes = {}
+        self._cache = {}
+        self._slots = {}
+
+    def close(self):
+        for index in self._indexes.values():
+            index.close()
+        self._indexes = {}
+
+    def _index(self, bank):
+        if bank not in self._indexes:
+            self._indexes[bank] = MapIndex.open(bank)
+        return self._indexes[bank]
+
+    def _map_frames(self, bank, map_number):
+        """
+        The frames of one map of a bank, read once
+        :return: List of (file name, frame bytes)
+        """
+        key = (bank, map_number)
+        if key not in self._cache:
+            frames = list(self._index(bank).frames([map_number]))
+            for name, data in frames:
+                if len(data) != CONTROL_MAP_LEN:
+                    raise ComposeError("{} map {}: {} is not a control map frame".format(bank, map_number, name))
+            self._cache[key] = frames
+        return self._cache[key]
+
+    def set_reference(self, reference):
+        self._reference = reference
+
+    def clear(self):
+        self._slots = {}
+
+    def add(self, target_map, bank, source_map):
+        """
+        Put a map of a bank into a slot of the new bank
+        :param target_map: Slot 1-15 in the new bank
+        :param bank: Source bank path (directory, archive or .syx bank file)
+        :param source_map: Map number in the source bank
+        :return: None
+        """
+        self._slots[int(target_map)] = (bank, int(source_map))
+
+    def _addresses(self, target_map):
+        """
+        The address bytes of each frame of a slot
+        """
+        candidates = [self._reference] if self._reference else []
+        candidates.extend([bank for bank, source_map in self._slots.values()])
+        for bank in candidates:
+            if target_map in self._index(bank).maps():
+                return [data[ADDRESS_START:ADDRESS_START + ADDRESS_LEN]
+                        for name, data in self._map_frames(bank, target_map)]
+        raise ComposeError("No bank holds slot {} to take its addresses from".format(target_map))
+
+    def compose(self):
+        """
+        Build the new bank
+        :return: List of (file name, frame bytes) in send order
+        """
+        bank_frames = []
+        for target_map in sorted(self._slots):
+            bank, source_map = self._slots[target_map]
+            frames = self._map_frames(bank, source_map)
+            addresses = self._addresses(target_map) if target_map != source_map else None
+            if addresses is not None and len(addresses) < len(frames):
+                raise ComposeError("Slot {} has {} frames, map {} of {} has {}".format(
+                    target_map, len(addresses), source_map, bank, len(frames)))
+            for frame_number, (name, data) in enumerate(frames, 1):
+                if addresses is not None:
+                    frame = bytearray(data)
+                    frame[ADDRESS_START:ADDRESS_START + ADDRESS_LEN] = addresses[frame_number - 1]
+                    frame[CHECKSUM_OFFSET] = calc_check_sum(frame)
+                    data = bytes(frame)
+                bank_frames.append((frame_file_name(target_map, frame_number), data))
+        return bank_frames
+
+    def write(self, output):
+        """
+        Build the new bank and write it
+        :param output: Directory, or a file name ending in .syx for a single file
+        :return: Number of frames written
+        """
+        frames = self.compose()
+        write_bank(frames, output)
+        return len(frames)
+
+
+def write_bank(frames, output):
+    """
+    Write frames as a bank directory or as one .syx file
+    :param frames: List of (file name, frame bytes)
+    :param output: Directory, or a file name ending in .syx
+    :return: None
+    """
+    if output.lower().endswith(".syx"):
+        with open(output, "wb") as fh:
+            for name, data in frames:
+                fh.write(data)
+        return
+    os.makedirs(output, exist_ok=True)
+    for name, data in frames:
+        with open(join(output, name), "wb") as fh:
+            fh.write(data)
+
+
+def compose_specs(specs, base_dir=""):
+    """
+    Run a batch of compositions. Banks used by several specs are read once.
+    :param specs: List of composition spec dicts
+    :param base_dir: Directory that relative paths are resolved against
+    :return: List of (output, frame count)
+    """
+    def path(p):
+        return p if os.path.isabs(p) else join(base_dir, p)
+
+    composer = BankComposer()
+    results = []
+    try:
+        for spec in specs:
+            composer.clear()
+            composer.set_reference(path(spec["reference"]) if spec.get("reference") else None)
+            for target_map, slot in spec["maps"].items():
+                composer.add(int(target_map), path(slot["bank"]), slot.get("map", int(target_map)))
+            results.append((spec["output"], composer.write(path(spec["output"]))))
+    finally:
+        composer.close()
+    return results
+
+
+def load_specs(spec_file):
+    """
+    Read a composition spec file holding one spec or a list of specs
+    :return: List of spec dicts
+    """
+    with open(spec_file, "r") as fh:
+        specs = json.load(fh)
+    return specs if isinstance(specs, list) else [specs]
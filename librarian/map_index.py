@@ -0,0 +1,215 @@
+# coding: utf-8
+#
+# map_index - find the frames of individual control maps
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# A bank can be a directory of pcr-NNNN.syx files, a bank archive, a
+# Standard MIDI File or a single .syx file holding all frames back to
+# back (as written by a bulk dump recorder or downloaded from the HTTP
+# API). In a directory or archive the map comes from the file name, in a
+# single file or MIDI file from the position of the frame.
+#
+
+import os
+from os.path import basename, isdir, join
+from pcr_sysex import FRAMES_PER_MAP, MAP_COUNT, frame_file_name, map_frame_from_path
+from sysex_stream import iter_file_messages
+
+
+def parse_map_spec(spec):
+    """
+    Parse a map selection such as "7", "3-5" or "1,3-5"
+    :param spec: Selection string. Empty or "all" selects every map.
+    :return: Sorted list of map numbers 1-15
+    """
+    return parse_number_spec(spec, MAP_COUNT, "Maps")
+
+
+def parse_number_spec(spec, highest, label="Numbers"):
+    """
+    Parse a selection of numbers such as "7", "3-5" or "1,3-5"
+    :param spec: Selection string. Empty or "all" selects 1 through highest.
+    :param highest: Largest valid number
+    :param label: What is selected, for error messages
+    :return: Sorted list of numbers
+    """
+    spec = (spec or "").strip().lower()
+    if spec in ("", "all"):
+        return list(range(1, highest + 1))
+    numbers = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if sep else first
+        except ValueError:
+            raise ValueError("Invalid selection '{}'".format(part))
+        if not 1 <= first <= last <= highest:
+            raise ValueError("{} must be in the range 1-{}, not '{}'".format(label, highest, part))
+        numbers.update(range(first, last + 1))
+    return sorted(numbers)
+
+
+class MapIndex():
+    """
+    Map number to frames index of a bank
+    """
+    def __init__(self, frames, source=None):
+        """
+        Create an index
+        :param frames: Dict of map number to a list of (frame_number, name, loader)
+        where loader() returns the frame bytes
+        :param source: Optional open object (archive) to close with the index
+        """
+        self._frames = frames
+        self._source = source
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    @classmethod
+    def from_paths(cls, paths):
+        """
+        Index the pcr-NNNN.syx files of a list of paths. Other files are ignored.
+        """
+        frames = {}
+        for path in paths:
+            map_frame = map_frame_from_path(path)
+            if map_frame is not None:
+                frames.setdefault(map_frame[0], []).append((map_frame[1], path, _file_loader(path)))
+        return cls(frames)
+
+    @classmethod
+    def from_directory(cls, directory):
+        return cls.from_paths([join(directory, fn) for fn in os.listdir(directory)])
+
+    @classmethod
+    def from_archive(cls, path, bank=None):
+        from bank_archive import BankArchive, ArchiveError
+
+        archive = BankArchive(path)
+        banks = archive.banks()
+        if bank is None and len(banks) != 1:
+            raise ArchiveError("{} holds {} banks, choose one of {}".format(path, len(banks), banks))
+        bank = bank or banks[0]
+        frames = {}
+        for name in archive.names(bank):
+            map_frame = map_frame_from_path(name)
+            if map_frame is not None:
+                frames.setdefault(map_frame[0], []).append(
+                    (map_frame[1], name, lambda name=name: archive.read(bank, name)))
+        return cls(frames, archive)
+
+    @classmethod
+    def from_bank_file(cls, path):
+        """
+        Index a single .syx file with the frames of one or more maps in dump order
+        """
+        frames = {}
+        for i, message in enumerate(iter_file_messages(path)):
+            message = bytes(message)
+            map_number, frame_number = divmod(i, FRAMES_PER_MAP)
+            frames.setdefault(map_number + 1, []).append(
+                (frame_number + 1, frame_file_name(map_number + 1, frame_number + 1),
+                 lambda message=message: message))
+        return cls(frames)
+
+    @classmethod
+    def from_midi_file(cls, path, bank=None):
+        """
+        Index the control map frames of one bank of a Standard MIDI File
+        :param bank: Bank name (see midi_file.bank_frames), may be omitted
+        if the file holds one bank
+        """
+        from midi_file import MidiFileError, bank_frames
+
+        banks = {}
+        for name, file_name, frame in bank_frames(path):
+            if bank is None or name == bank:
+                banks.setdefault(name, []).append((file_name, frame))
+        if bank is None and len(banks) > 1:
+            raise MidiFileError("{} holds {} banks, choose one of {}".format(path, len(banks), sorted(banks)))
+        if not banks:
+            raise MidiFileError("{} holds no {}control map frames".format(
+                path, "" if bank is None else "bank {} ".format(bank)))
+        frames = {}
+        for file_name, frame in list(banks.values())[0]:
+            map_number, frame_number = map_frame_from_path(file_name)
+            frames.setdefault(map_number, []).append((frame_number, file_name, lambda frame=frame: frame))
+        return cls(frames)
+
+    @classmethod
+    def open(cls, path, bank=None):
+        """
+        Index a bank directory, bank archive, MIDI file or single bank file
+        :param path: Bank path
+        :param bank: Bank name within an archive or MIDI file
+        """
+        from bank_archive import is_archive
+        from midi_file import is_midi_file
+
+        if isdir(path):
+            return cls.from_directory(path)
+        if is_archive(path):
+            return cls.from_archive(path, bank)
+        if is_midi_file(path):
+            return cls.from_midi_file(path, bank)
+        return cls.from_bank_file(path)
+
+    def maps(self):
+        return sorted(self._frames)
+
+    def _select(self, maps):
+        maps = self.maps() if maps is None else maps
+        missing = [m for m in maps if m not in self._frames]
+        if missing:
+            raise ValueError("Map(s) {} not found".format(", ".join([str(m) for m in missing])))
+        for m in sorted(maps):
+            for frame_number, name, loader in sorted(self._frames[m], key=lambda f: f[0]):
+                yield name, loader
+
+    def names(self, maps=None):
+        """
+        Frame names (paths for a directory) of some maps in send order
+        :param maps: Map numbers, None for all
+        :return: List of names
+        """
+        return [name for name, loader in self._select(maps)]
+
+    def frames(self, maps=None):
+        """
+        Read the frames of some maps in send order
+        :param maps: Map numbers, None for all
+        :return: Generator of (file name, frame bytes)
+        """
+        for name, loader in self._select(maps):
+            yield basename(name), loader()
+
+
+def _file_loader(path):
+    def load():
+        with open(path, "rb") as fh:
+            return fh.read()
+    return load
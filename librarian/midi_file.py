@@ -0,0 +1,391 @@
+# coding: utf-8
+#
+# midi_file - sysex banks in Standard MIDI Files
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# Reading walks the chunks and events of the file in order through a
+# small read buffer, so a file of any size is converted in constant
+# memory. Sysex events of every track are fed to a sysex_stream parser
+# per track, which joins messages split into an F0 packet followed by F7
+# continuation packets. Channel and meta events are skipped; tempo events
+# are kept to give each message its time in seconds.
+#
+# Control map frames are sorted into banks by track and device ID, 750
+# frames to a bank. Frames of other devices are counted and skipped.
+# The frame address does not say which map slot a frame belongs to, so
+# files written here carry a marker meta event ("map 3") before the
+# first frame of each map and the frames that follow it are numbered
+# from there. Without markers, as in a dump recorded from the keyboard,
+# frames are numbered in the order they arrive.
+#
+# A bank is written as a format 0 file with one tick per millisecond
+# (division 500 at the default 120 bpm). Every frame after the first is
+# delayed by the pacing a restore uses, the message delay plus the file
+# delay, so a sequencer playing the file back paces the PCR like the
+# librarian does.
+#
+
+import os
+import re
+import shutil
+import struct
+import tempfile
+from collections import namedtuple
+from os.path import basename, isdir, join, splitext
+from pcr_sysex import FRAMES_PER_MAP, MAP_COUNT, frame_file_name, is_control_map_frame, map_frame_from_path
+from sysex_stream import SysexStreamParser
+
+
+MIDI_EXTENSIONS = (".mid", ".midi", ".smf")
+DIVISION = 500
+TEMPO = 500000
+FRAMES_PER_BANK = FRAMES_PER_MAP * MAP_COUNT
+
+_READ_SIZE = 64 * 1024
+_HEADER = struct.Struct(">4sI")
+_MTHD = struct.Struct(">HHH")
+_MAP_MARKER = "map {}"
+_MAP_MARKER_RE = re.compile(r"^map (\d+)$", re.IGNORECASE)
+
+# Data bytes that follow a channel status, by high nibble
+_CHANNEL_DATA = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+# A sysex message found in a file. marker is the text of the last marker
+# meta event before the message in its track, or None.
+SmfSysex = namedtuple("SmfSysex", ["track", "tick", "seconds", "message", "marker"])
+
+
+class MidiFileError(Exception):
+    pass
+
+
+def is_midi_file(path):
+    """
+    True if the path is a Standard MIDI File
+    """
+    if isdir(path):
+        return False
+    if splitext(path)[1].lower() in MIDI_EXTENSIONS:
+        return True
+    try:
+        with open(path, "rb") as fh:
+            return fh.read(4) == b"MThd"
+    except OSError:
+        return False
+
+
+class _Reader():
+    """
+    Buffered reader of one chunk of the file
+    """
+    def __init__(self, fh, length):
+        self._fh = fh
+        self._left = length
+        self._buf = b""
+        self._pos = 0
+
+    def _fill(self):
+        data = self._fh.read(min(_READ_SIZE, self._left))
+        if not data:
+            raise MidiFileError("Track ends early")
+        self._left -= len(data)
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+
+    @property
+    def at_end(self):
+        return self._pos >= len(self._buf) and self._left == 0
+
+    def byte(self):
+        if self._pos >= len(self._buf):
+            self._fill()
+        b = self._buf[self._pos]
+        self._pos += 1
+        return b
+
+    def read(self, n):
+        while len(self._buf) - self._pos < n:
+            self._fill()
+        data = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return data
+
+    def skip(self, n):
+        available = len(self._buf) - self._pos
+        if n <= available:
+            self._pos += n
+            return
+        n -= available
+        if n > self._left:
+            raise MidiFileError("Track ends early")
+        self._buf, self._pos = b"", 0
+        self._fh.seek(n, os.SEEK_CUR)
+        self._left -= n
+
+    def finish(self):
+        """
+        Move the file to the end of the chunk
+        """
+        self._fh.seek(self._left, os.SEEK_CUR)
+        self._buf, self._pos, self._left = b"", 0, 0
+
+    def vlq(self):
+        value = 0
+        for i in range(4):
+            b = self.byte()
+            value = (value << 7) | (b & 0x7F)
+            if b < 0x80:
+                return value
+        raise MidiFileError("Variable length quantity is too long")
+
+
+class _TempoMap():
+    """
+    Tick to seconds conversion from the tempo events seen so far
+    """
+    def __init__(self, division):
+        if division & 0x8000:
+            # SMPTE: frames per second and ticks per frame
+            fps = 256 - (division >> 8)
+            self._smpte = (29.97 if fps == 29 else fps) * (division & 0xFF)
+        else:
+            self._smpte = None
+        self._division = division
+        # (tick, seconds at tick, tempo) in tick order
+        self._changes = [(0, 0.0, TEMPO)]
+
+    def add(self, tick, tempo):
+        if self._smpte is None:
+            self._changes.append((tick, self.seconds(tick), tempo))
+            self._changes.sort(key=lambda c: c[0])
+
+    def seconds(self, tick):
+        if self._smpte is not None:
+            return tick / self._smpte
+        for change_tick, change_seconds, tempo in reversed(self._changes):
+            if change_tick <= tick:
+                return change_seconds + (tick - change_tick) * tempo / 1000000.0 / self._division
+        return 0.0
+
+
+def read_sysex(path, parser_stats=None):
+    """
+    Stream the sysex messages of a Standard MIDI File
+    :param path: File path
+    :param parser_stats: Optional dict that receives the "skipped" and
+    "discarded" byte/message counts of the sysex parsers
+    :return: Generator of SmfSysex, in track order
+    """
+    with open(path, "rb") as fh:
+        header = fh.read(_HEADER.size + _MTHD.size)
+        if len(header) < _HEADER.size + _MTHD.size:
+            raise MidiFileError("{} is too short for a Standard MIDI File".format(basename(path)))
+        chunk_id, length = _HEADER.unpack_from(header)
+        if chunk_id != b"MThd" or length < _MTHD.size:
+            raise MidiFileError("{} is not a Standard MIDI File".format(basename(path)))
+        fmt, tracks, division = _MTHD.unpack_from(header, _HEADER.size)
+        fh.seek(length - _MTHD.size, os.SEEK_CUR)
+        tempo_map = _TempoMap(division)
+
+        track = 0
+        while True:
+            header = fh.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            chunk_id, length = _HEADER.unpack(header)
+            if chunk_id != b"MTrk":
+                # Unknown chunks are skipped, as the SMF spec asks
+                fh.seek(length, os.SEEK_CUR)
+                continue
+            track += 1
+            parser = SysexStreamParser()
+            reader = _Reader(fh, length)
+            for tick, message, marker in _track_sysex(reader, parser, tempo_map):
+                yield SmfSysex(track, tick, tempo_map.seconds(tick), message, marker)
+            reader.finish()
+            if parser_stats is not None:
+                parser_stats["skipped"] = parser_stats.get("skipped", 0) + parser.skipped
+                parser_stats["discarded"] = parser_stats.get("discarded", 0) + parser.discarded + \
+                    (1 if parser.pending else 0)
+
+
+def _track_sysex(reader, parser, tempo_map):
+    """
+    The sysex messages of one track
+    :return: Generator of (tick, message bytes, marker text)
+    """
+    tick = 0
+    running = None
+    marker = None
+    while not reader.at_end:
+        tick += reader.vlq()
+        status = reader.byte()
+        if status < 0x80:
+            # Running status, the byte read is the first data byte
+            if running is None:
+                raise MidiFileError("Data byte without a status at tick {}".format(tick))
+            reader.skip(_CHANNEL_DATA[running & 0xF0] - 1)
+            continue
+        if status == 0xFF:
+            running = None
+            meta_type = reader.byte()
+            data = reader.read(reader.vlq())
+            if meta_type == 0x51 and len(data) == 3:
+                tempo_map.add(tick, int.from_bytes(data, "big"))
+            elif meta_type == 0x06:
+                marker = data.decode("latin-1")
+            elif meta_type == 0x2F:
+                break
+            continue
+        if status in (0xF0, 0xF7):
+            data = reader.read(reader.vlq())
+            if status == 0xF0:
+                data = b"\xF0" + data
+            # F7 packets continue a split message or carry escaped bytes
+            for message in parser.feed(data):
+                yield tick, bytes(message), marker
+            running = None
+            continue
+        if status >= 0xF0:
+            raise MidiFileError("Unexpected status {:02X} at tick {}".format(status, tick))
+        running = status
+        reader.skip(_CHANNEL_DATA[status & 0xF0])
+
+
+def bank_frames(path, stats=None):
+    """
+    Sort the control map frames of a Standard MIDI File into banks. A bank
+    is named after the file, track and device ID, e.g. dump-t2-d10; a
+    device sending more than one bank gets dump-t2-d10-2 and so on.
+    :param path: MIDI file
+    :param stats: Optional dict that receives the number of other sysex
+    messages as "skipped"
+    :return: Generator of (bank name, frame file name, frame bytes)
+    """
+    stem = splitext(basename(path))[0]
+    # Per (track, device): [frames seen, marker, marker map, frames since the marker]
+    states = {}
+    for event in read_sysex(path):
+        if not is_control_map_frame(event.message):
+            if stats is not None:
+                stats["skipped"] = stats.get("skipped", 0) + 1
+            continue
+        key = (event.track, event.message[2])
+        state = states.setdefault(key, [0, None, None, 0])
+        count = state[0]
+        state[0] += 1
+        if event.marker != state[1]:
+            m = _MAP_MARKER_RE.match(event.marker or "")
+            state[1:] = [event.marker, int(m.group(1)) if m else None, 0]
+        state[3] += 1
+        number, position = divmod(count, FRAMES_PER_BANK)
+        name = "{}-t{}-d{:02x}".format(stem, key[0], key[1])
+        if number:
+            name = "{}-{}".format(name, number + 1)
+        if state[2] is not None and state[3] <= FRAMES_PER_MAP:
+            map_number, frame_number = state[2], state[3]
+        else:
+            map_number, frame_number = divmod(position, FRAMES_PER_MAP)
+            map_number, frame_number = map_number + 1, frame_number + 1
+        yield name, frame_file_name(map_number, frame_number), event.message
+
+
+def import_banks(path, directory):
+    """
+    Pull the control map frames out of a Standard MIDI File into bank
+    directories, one frame at a time. The frames are written to a
+    temporary directory first, so a file that turns out to be damaged
+    part way through leaves no partial banks behind.
+    :param path: MIDI file
+    :param directory: Directory for the banks, see bank_frames() for their names
+    :return: (list of (bank name, frame count), number of other sysex messages skipped)
+    """
+    banks = {}
+    stats = {}
+    os.makedirs(directory, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".midi-import-", dir=directory)
+    try:
+        for bank, file_name, frame in bank_frames(path, stats):
+            if bank not in banks:
+                os.mkdir(join(tmp_dir, bank))
+                banks[bank] = 0
+            with open(join(tmp_dir, bank, file_name), "wb") as fh:
+                fh.write(frame)
+            banks[bank] += 1
+
+        for bank in banks:
+            os.makedirs(join(directory, bank), exist_ok=True)
+            for name in os.listdir(join(tmp_dir, bank)):
+                os.replace(join(tmp_dir, bank, name), join(directory, bank, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return list(banks.items()), stats.get("skipped", 0)
+
+
+def _vlq(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def write_bank(frames, path, interval=100, name=None):
+    """
+    Write frames as a timed format 0 Standard MIDI File. The track is
+    written as the frames come and its length patched in at the end.
+    A map marker goes before the first frame of each map.
+    :param frames: Iterable of (file name, frame bytes) in send order. The
+    map numbers are taken from pcr-NNNN.syx file names.
+    :param path: MIDI file to create
+    :param interval: Milliseconds from one frame to the next
+    :param name: Optional track name
+    :return: Number of frames written
+    """
+    count = 0
+    with open(path, "wb") as fh:
+        fh.write(_HEADER.pack(b"MThd", _MTHD.size) + _MTHD.pack(0, 1, DIVISION))
+        track_start = fh.tell()
+        fh.write(_HEADER.pack(b"MTrk", 0))
+        length = 0
+        events = [b"\x00\xFF\x51\x03" + TEMPO.to_bytes(3, "big")]
+        if name:
+            text = name.encode("utf-8")
+            events.append(b"\x00\xFF\x03" + _vlq(len(text)) + text)
+        for event in events:
+            fh.write(event)
+            length += len(event)
+        # One tick is a millisecond at DIVISION ticks per TEMPO microseconds
+        ticks = int(round(interval * DIVISION * 1000.0 / TEMPO))
+        current_map = None
+        for file_name, frame in frames:
+            if frame[:1] != b"\xF0":
+                raise MidiFileError("{} is not a sysex message".format(file_name))
+            delta = _vlq(ticks if count else 0)
+            event = b""
+            map_frame = map_frame_from_path(file_name)
+            if map_frame is not None and map_frame[0] != current_map:
+                current_map = map_frame[0]
+                text = _MAP_MARKER.format(current_map).encode("latin-1")
+                # The marker takes the frame's delay, the frame follows it at once
+                event = delta + b"\xFF\x06" + _vlq(len(text)) + text
+                delta = b"\x00"
+            event += delta + b"\xF0" + _vlq(len(frame) - 1) + bytes(frame[1:])
+            fh.write(event)
+            length += len(event)
+            count += 1
+        fh.write(b"\x00\xFF\x2F\x00")
+        length += 4
+        fh.seek(track_start)
+        fh.write(_HEADER.pack(b"MTrk", length))
+    return count
@@ -0,0 +1,790 @@
+# coding: utf-8
+#
+# pcr_cli - headless command line interface for the PCR Librarian
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# Syntax
+#   python3 pcr_cli.py list-ports [--json] [--probe]
+#   python3 pcr_cli.py backup -p port -o directory [--single] [--clean]
+#   python3 pcr_cli.py backup -p port -o device_directory --incremental
+#   python3 pcr_cli.py restore -p port -i directory [--maps 3-5]
+#   python3 pcr_cli.py verify directory [directory ...]
+#   python3 pcr_cli.py diff directory_a directory_b
+#   python3 pcr_cli.py batch jobs.json
+#   python3 pcr_cli.py history [device] [--seq N --export directory]
+#   python3 pcr_cli.py compose -o output [--reference bank] 1=bank_a:7 2=bank_b:3 ...
+#   python3 pcr_cli.py compose --spec compositions.json
+#   python3 pcr_cli.py transform template.json -i bank -o new_bank [--param name=value ...]
+#   python3 pcr_cli.py transform template.json --batch rigs.json
+#   python3 pcr_cli.py undo|redo bank [--steps N]
+#   python3 pcr_cli.py journal bank
+#   python3 pcr_cli.py export archive.pcrz directory
+#   python3 pcr_cli.py import archive.pcrz directory [--bank name]
+#   python3 pcr_cli.py backup -p port -o directory --record dump.pcrcap
+#   python3 pcr_cli.py replay dump.pcrcap -p port [--speed 2]
+#   python3 pcr_cli.py midi-import dump.mid directory
+#   python3 pcr_cli.py midi-export bank bank.mid [--maps 3-5] [--delay MS]
+#
+"""
+Back up, restore, verify and compare PCR control map banks without the GUI.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import bank_archive
+import capture_log
+import incremental_backup
+import midi_file
+import transfer_engine
+from event_log import event_log
+from map_index import MapIndex, parse_map_spec
+from transfer_engine import TransferError, TransferTimeout, TransferCancelled
+from profiling import resolve_profile_path, run_profiled
+
+
+log = logging.getLogger("pcr-librarian")
+
+# Exit codes
+EXIT_OK = 0
+# Also used by diff when the banks differ
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PORT = 3
+EXIT_TIMEOUT = 4
+EXIT_INVALID = 5
+EXIT_CANCELED = 130
+
+
+def _in_ports():
+    from pcr_midi_util import get_midiin_ports
+    return get_midiin_ports()
+
+
+def _out_ports():
+    from pcr_midi_util import get_midiout_ports
+    return get_midiout_ports()
+
+
+def port_key(command, port):
+    """
+    Name the MIDI port a job uses by direction and port name, so that the
+    number and the name of one port give the same key
+    :param command: Job command (backup, restore, ...)
+    :param port: Port number or name as given for the job
+    :return: Key such as "in:PCR 1". A port that cannot be resolved keeps
+    its spec as the key, the job reports the error when it runs.
+    """
+    if command == "backup":
+        direction, names = "in", _in_ports()
+    elif command == "restore":
+        direction, names = "out", _out_ports()
+    else:
+        return str(port)
+    try:
+        return "{}:{}".format(direction, names[transfer_engine.resolve_port(port, names)])
+    except TransferError:
+        return str(port)
+
+
+def list_ports(as_json=False, probe=False):
+    """
+    Print the MIDI ports
+    :param probe: Identify the devices on the ports (see identity_probe)
+    :return: Exit code
+    """
+    in_ports = _in_ports()
+    out_ports = _out_ports()
+    identities, pcrs = {}, []
+    if probe:
+        import identity_probe
+        identities, pcrs = identity_probe.detect_ports(in_ports, out_ports, refresh=True)
+    if as_json:
+        ports = {"in": in_ports, "out": out_ports}
+        if probe:
+            ports["identities"] = {name: identity._asdict() if identity else None
+                                   for name, identity in identities.items()}
+            ports["pcr"] = pcrs
+        print(json.dumps(ports, indent=4))
+        return EXIT_OK
+    paired = dict(pcrs)
+    print("MIDI in ports")
+    for portno, name in enumerate(in_ports):
+        identity = identities.get(name)
+        if identity is None:
+            print("  [{}] {}".format(portno, name))
+        else:
+            # describe() gives the family and member codes of Roland devices
+            print("  [{}] {}  ({}, device {:02X}{})".format(
+                portno, name, identity_probe.describe(identity, name in paired), identity.device_id,
+                ", out port " + paired[name] if paired.get(name) else ""))
+    print("MIDI out ports")
+    for portno, name in enumerate(out_ports):
+        print("  [{}] {}".format(portno, name))
+    return EXIT_OK
+
+
+def backup(port, directory, expected=transfer_engine.ALL, clean=False, wait=60.0, idle_timeout=5.0, cancel=None,
+           progress=None, incremental=False, record=None):
+    """
+    Receive a bank from a PCR into a directory
+    :param incremental: Add a snapshot to the device directory that only
+    stores the maps that changed since the previous snapshot
+    :param record: Optional capture file that records the input events with their timing
+    :return: Exit code
+    """
+    in_ports = _in_ports()
+    try:
+        port = transfer_engine.resolve_port(port, in_ports)
+    except TransferError as ex:
+        log.error(ex)
+        return EXIT_PORT
+
+    snapshot = None
+    if incremental:
+        snapshot = incremental_backup.IncrementalSnapshot(directory, in_ports[port])
+    elif clean:
+        transfer_engine.clean_directory(directory)
+    recorder = capture_log.CaptureRecorder(record, in_ports[port]) if record else None
+    log.info("Start the control map bulk transfer at the PCR on in port %d", port)
+    try:
+        received = transfer_engine.receive_frames(port, directory, expected, wait=wait,
+                                                  idle_timeout=idle_timeout, progress=progress, cancel=cancel,
+                                                  on_frame=snapshot.on_frame if snapshot else None,
+                                                  recorder=recorder)
+    except TransferTimeout as ex:
+        log.error("Timed out: %s", ex)
+        if snapshot:
+            snapshot.discard()
+        return EXIT_TIMEOUT
+    except TransferCancelled as ex:
+        log.error(ex)
+        if snapshot:
+            snapshot.discard()
+        return EXIT_CANCELED
+    finally:
+        if recorder:
+            recorder.close()
+            log.info("Recorded %d input events to %s", recorder.events, record)
+
+    if snapshot:
+        snapshot.close()
+        directory = snapshot.path
+        log.info("Snapshot %s: %d maps changed, %d unchanged",
+                 snapshot.name, len(snapshot.changed), len(snapshot.unchanged))
+    log.info("Received %d frames into %s", received, directory)
+
+    # A snapshot directory only holds the changed maps, bank_files() gives every frame of the bank
+    files = bank_files(directory)
+    problems = transfer_engine.verify_files(files)
+    for path, problem in problems:
+        log.error("%s: %s", path, problem)
+    return EXIT_INVALID if problems else EXIT_OK
+
+
+def restore(port, directory, delay=transfer_engine.MESSAGE_DELAY, cancel=None, files=None, progress=None,
+            maps=None):
+    """
+    Send a bank from a directory to a PCR
+    :param directory: Bank directory, bank archive or single bank .syx file
+    :param files: Optional subset of the directory's files to send
+    :param maps: Optional list of map numbers to send
+    :return: Exit code
+    """
+    try:
+        port = transfer_engine.resolve_port(port, _out_ports())
+    except TransferError as ex:
+        log.error(ex)
+        return EXIT_PORT
+
+    if files is None and not os.path.isdir(directory):
+        with _unpacked_bank(directory, maps) as bank_dir:
+            return restore(port, bank_dir, delay=delay, cancel=cancel, progress=progress)
+    if files is None:
+        files = bank_files(directory)
+        if maps is not None:
+            files = MapIndex.from_paths(files).names(maps)
+    if not files:
+        log.error("No SysEx (.syx) files found in %s", directory)
+        return EXIT_INVALID
+    try:
+        sent = transfer_engine.send_files(files, port, progress=progress, delay=delay, cancel=cancel)
+    except TransferCancelled as ex:
+        log.error(ex)
+        return EXIT_CANCELED
+    except TransferError as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    log.info("Sent %d files to out port %d", sent, port)
+    return EXIT_OK
+
+
+def bank_files(directory):
+    """
+    Frame files of a bank. The directory can be a plain bank, an
+    incremental snapshot or a device directory (latest snapshot).
+    :param directory: Directory path
+    :return: Frame file paths in send order
+    """
+    if incremental_backup.read_manifest(directory) is not None:
+        head, name = os.path.split(os.path.normpath(directory))
+        return incremental_backup.snapshot_files(head, name)
+    if incremental_backup.latest_snapshot(directory):
+        return incremental_backup.snapshot_files(directory)
+    return transfer_engine.list_syx_files(directory)
+
+
+@contextmanager
+def _unpacked_bank(path, maps=None, bank=None):
+    """
+    Write the frames of a bank archive or single bank file to a temporary directory
+    :param path: Archive or bank file path
+    :param maps: Optional list of map numbers
+    :param bank: Bank name, may be omitted for single bank archives
+    :return: Context manager giving the directory path
+    """
+    with MapIndex.open(path, bank) as index, tempfile.TemporaryDirectory() as tmp:
+        for name, data in index.frames(maps):
+            with open(os.path.join(tmp, name), "wb") as fh:
+                fh.write(data)
+        yield tmp
+
+
+def compose(slots, output, reference=None):
+    """
+    Build a bank from maps of other banks
+    :param slots: List of "slot=bank[:map]" strings. The map defaults to the slot.
+    :param output: Directory, or a .syx file for a single file bank
+    :param reference: Optional bank to take slot addresses from
+    :return: Exit code
+    """
+    spec = {"reference": reference, "output": output, "maps": {}}
+    for slot in slots:
+        target, sep, source = slot.partition("=")
+        bank, colon, source_map = source.rpartition(":")
+        if not colon or not source_map.isdigit():
+            bank, source_map = source, target
+        if not sep or not target.isdigit() or not bank:
+            log.error("Invalid slot '%s', expected slot=bank[:map]", slot)
+            return EXIT_USAGE
+        spec["maps"][target] = {"bank": bank, "map": int(source_map)}
+    return compose_batch([spec])
+
+
+def compose_batch(specs, base_dir=""):
+    """
+    Run a list of composition specs
+    :return: Exit code
+    """
+    import map_composer
+
+    try:
+        for output, count in map_composer.compose_specs(specs, base_dir):
+            log.info("Wrote %d frames to %s", count, output)
+    except (map_composer.ComposeError, bank_archive.ArchiveError, KeyError) as ex:
+        log.error("Compose failed: %s", ex)
+        return EXIT_INVALID
+    return EXIT_OK
+
+
+def transform(template_file, jobs):
+    """
+    Apply an edit template to one or more banks
+    :param template_file: JSON edit template
+    :param jobs: List of dicts with "input", "output" and optional "params"
+    :return: Exit code
+    """
+    import frame_editor
+
+    try:
+        template = frame_editor.Template.load(template_file)
+        for output, changed in frame_editor.apply_template_batch(template, jobs):
+            log.info("%s: %d bytes changed", output, changed)
+    except (frame_editor.EditError, bank_archive.ArchiveError, KeyError) as ex:
+        log.error("Transform failed: %s", ex)
+        return EXIT_INVALID
+    return EXIT_OK
+
+
+def undo_redo(bank_path, redo=False, steps=1):
+    """
+    Undo or redo edits recorded in a bank's edit journal
+    :param bank_path: Bank directory or single bank .syx file
+    :param redo: Redo instead of undo
+    :param steps: Number of operations
+    :return: Exit code
+    """
+    from edit_journal import EditJournal, JournalError, journal_path
+    from frame_editor import Bank
+
+    bank = Bank.open(bank_path)
+    journal = EditJournal(bank, journal_path(bank_path))
+    done = 0
+    try:
+        for i in range(steps):
+            label = journal.redo() if redo else journal.undo()
+            done += 1
+            log.info("%s %s", "Redone:" if redo else "Undone:", label)
+    except JournalError as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    finally:
+        # A failed step changes nothing, the steps before it are kept as the journal records them
+        if done:
+            bank.save(bank_path)
+    return EXIT_OK
+
+
+def show_journal(bank_path):
+    """
+    List the operations of a bank's edit journal
+    :return: Exit code
+    """
+    from edit_journal import EditJournal, journal_path
+    from frame_editor import Bank
+
+    journal = EditJournal(Bank.open(bank_path), journal_path(bank_path))
+    for number, label in enumerate(journal.history(), 1):
+        print("{:4} {}".format(number, label))
+    print("{} can be undone, {} can be redone".format(len(journal.history()), journal.redo_count))
+    return EXIT_OK
+
+
+def export_archive(archive, directory):
+    """
+    Export a bank or a library of banks to an archive
+    :return: Exit code
+    """
+    count = bank_archive.export_directory(archive, directory)
+    log.info("Exported %d files to %s", count, archive)
+    return EXIT_OK
+
+
+def import_archive(archive, directory, bank=None):
+    """
+    Import an archive (or one of its banks) into a directory
+    :return: Exit code
+    """
+    with bank_archive.BankArchive(archive) as ar:
+        if bank:
+            count = ar.extract(bank, directory)
+        else:
+            count = ar.extract_all(directory)
+    log.info("Imported %d files into %s", count, directory)
+    return EXIT_OK
+
+
+def replay(port, capture, speed=1.0, cancel=None):
+    """
+    Send a recorded capture to a MIDI out port with its recorded timing
+    :param capture: Capture file written by backup --record
+    :param speed: Timing scale, 2.0 replays twice as fast, 0 as fast as possible
+    :return: Exit code
+    """
+    try:
+        port = transfer_engine.resolve_port(port, _out_ports())
+    except TransferError as ex:
+        log.error(ex)
+        return EXIT_PORT
+    try:
+        result = capture_log.replay_file(capture, port, speed, cancel)
+    except capture_log.CaptureError as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    log.info("Replayed %d events (%d bytes) in %.3f s, late by %.2f ms on average, %.2f ms at most",
+             result.events, result.bytes, result.duration, result.mean_late * 1000, result.max_late * 1000)
+    return EXIT_OK
+
+
+def midi_import(midi_path, directory):
+    """
+    Pull the control map banks out of a Standard MIDI File
+    :return: Exit code
+    """
+    try:
+        banks, skipped = midi_file.import_banks(midi_path, directory)
+    except midi_file.MidiFileError as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    for name, count in banks:
+        log.info("Imported %d frames into %s", count, os.path.join(directory, name))
+    if skipped:
+        log.info("Skipped %d sysex messages of other devices", skipped)
+    if not banks:
+        log.error("%s holds no control map frames", midi_path)
+        return EXIT_INVALID
+    return EXIT_OK
+
+
+def midi_export(bank_path, midi_path, maps=None, delay=transfer_engine.MESSAGE_DELAY, bank=None):
+    """
+    Write a bank as a timed Standard MIDI File
+    :param bank_path: Bank directory, archive, MIDI or .syx file
+    :param midi_path: MIDI file to create
+    :param maps: Optional list of map numbers
+    :param delay: Pacing delay between sysex messages in ms. The file delay
+    of a restore is added, as every frame is sent from its own file.
+    :return: Exit code
+    """
+    if os.path.isdir(bank_path):
+        index = MapIndex.from_paths(bank_files(bank_path))
+    else:
+        index = MapIndex.open(bank_path, bank)
+    try:
+        with index:
+            count = midi_file.write_bank(index.frames(maps), midi_path, delay + transfer_engine.FILE_DELAY,
+                                         name=os.path.basename(os.path.normpath(bank_path)))
+    except midi_file.MidiFileError as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    log.info("Wrote %d frames to %s", count, midi_path)
+    return EXIT_OK
+
+
+def verify(directories):
+    """
+    Check every frame of one or more banks
+    :return: Exit code
+    """
+    result = EXIT_OK
+    for directory in directories:
+        if bank_archive.is_archive(directory):
+            # Reading an archive checks every frame against the manifest hashes
+            with _unpacked_bank(directory) as bank_dir:
+                files = transfer_engine.list_syx_files(bank_dir)
+                problems = transfer_engine.verify_files(files)
+        else:
+            files = bank_files(directory)
+            problems = transfer_engine.verify_files(files)
+        for path, problem in problems:
+            print("{}: {}".format(path, problem))
+        print("{}: {} files, {} problems".format(directory, len(files), len(problems)))
+        if problems or not files:
+            result = EXIT_INVALID
+    return result
+
+
+def diff(dir_a, dir_b):
+    """
+    Compare two banks
+    :return: EXIT_OK if identical, EXIT_ERROR if they differ
+    """
+    differences = transfer_engine.diff_directories(dir_a, dir_b)
+    for name, status in differences:
+        print("{}: {}".format(name, status))
+    return EXIT_ERROR if differences else EXIT_OK
+
+
+def history(device=None, seq=None, export=None, root=None):
+    """
+    List the snapshot history or write a snapshot out as a bank
+    :param device: Device key, None lists the devices
+    :param seq: Snapshot sequence number, None for the latest
+    :param export: Directory to write the snapshot to
+    :param root: History directory, default from the configuration
+    :return: Exit code
+    """
+    from snapshot_history import HistoryStore, HistoryError
+
+    store = HistoryStore(root or _history_directory())
+    if device is None:
+        for key in store.devices():
+            print(key)
+        return EXIT_OK
+    try:
+        if export:
+            count = store.export(device, seq, export)
+            print("Wrote {} files to {}".format(count, export))
+            return EXIT_OK
+        for entry in store.snapshots(device):
+            print("{:6} {} {:>8} bytes {}{}".format(entry["seq"], time.strftime("%Y-%m-%d %H:%M:%S",
+                                                   time.localtime(entry["created"])), entry["size"],
+                                                   "K " if entry["keyframe"] else "  ", entry["label"]))
+    except HistoryError as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    return EXIT_OK
+
+
+def _history_directory():
+    from configuration import Configuration
+    Configuration.load_configuration()
+    return Configuration.get_history_directory()
+
+
+def run_job(job, cancel=None, progress=None):
+    """
+    Run one job from a batch job file
+    :param job: Dict with a "command" key plus the command's settings
+    :param cancel: Optional threading.Event that stops the job
+    :param progress: Optional TransferProgress for backup and restore jobs
+    :return: Exit code
+    """
+    command = job.get("command")
+    if command == "backup":
+        expected = transfer_engine.SINGLE if job.get("single") else transfer_engine.ALL
+        return backup(job["port"], job["directory"], expected, clean=job.get("clean", False),
+                      wait=job.get("wait", 60.0), idle_timeout=job.get("idle_timeout", 5.0), cancel=cancel,
+                      progress=progress, incremental=job.get("incremental", False))
+    if command == "restore":
+        maps = parse_map_spec(job["maps"]) if job.get("maps") else None
+        return restore(job["port"], job["directory"], delay=job.get("delay", transfer_engine.MESSAGE_DELAY),
+                       cancel=cancel, progress=progress, maps=maps)
+    if command == "verify":
+        return verify([job["directory"]])
+    if command == "diff":
+        return diff(job["a"], job["b"])
+    log.error("Unknown batch command '%s'", command)
+    return EXIT_USAGE
+
+
+def run_batch(jobs):
+    """
+    Run batch jobs. Jobs for different ports run at the same time,
+    jobs for the same port run one after the other in file order.
+    :param jobs: List of job dicts
+    :return: The first non-zero exit code, or EXIT_OK
+    """
+    by_port = {}
+    for job in jobs:
+        by_port.setdefault(port_key(job.get("command"), job.get("port", "")), []).append(job)
+
+    results = []
+    cancel = threading.Event()
+
+    def run_port_jobs(port_jobs):
+        for job in port_jobs:
+            # A failing job must not end the thread, the port's other jobs still run
+            try:
+                code = run_job(job, cancel)
+            except KeyError as ex:
+                log.error("Job %s is missing the %s setting", json.dumps(job), ex)
+                code = EXIT_USAGE
+            except Exception as ex:
+                log.error("Job %s failed: %s", json.dumps(job), ex)
+                code = EXIT_ERROR
+            results.append(code)
+            if code != EXIT_OK:
+                log.error("Job %s failed with exit code %d", json.dumps(job), code)
+
+    threads = [threading.Thread(target=run_port_jobs, args=(port_jobs,), daemon=True)
+               for port_jobs in by_port.values()]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(0.2)
+    except KeyboardInterrupt:
+        cancel.set()
+        for t in threads:
+            t.join()
+        return EXIT_CANCELED
+
+    return next((code for code in results if code != EXIT_OK), EXIT_OK)
+
+
+def _run(args):
+    try:
+        if args.command == "list-ports":
+            return list_ports(args.json, args.probe)
+        if args.command == "backup":
+            expected = transfer_engine.SINGLE if args.single else transfer_engine.ALL
+            return backup(args.port, args.outdir, expected, clean=args.clean,
+                          wait=args.wait, idle_timeout=args.idle_timeout, incremental=args.incremental,
+                          record=args.record)
+        if args.command == "restore":
+            maps = parse_map_spec(args.maps) if args.maps else None
+            return restore(args.port, args.indir, delay=args.delay, maps=maps)
+        if args.command == "verify":
+            return verify(args.directories)
+        if args.command == "diff":
+            return diff(args.a, args.b)
+        if args.command == "history":
+            return history(args.device, args.seq, args.export)
+        if args.command == "compose":
+            if args.spec:
+                import map_composer
+                return compose_batch(map_composer.load_specs(args.spec), os.path.dirname(args.spec))
+            if not args.output or not args.slots:
+                log.error("compose needs -o and at least one slot, or --spec")
+                return EXIT_USAGE
+            return compose(args.slots, args.output, args.reference)
+        if args.command == "transform":
+            if args.batch:
+                with open(args.batch, "r") as fh:
+                    jobs = json.load(fh)
+            elif args.indir and args.output:
+                params = dict([p.split("=", 1) for p in args.param])
+                jobs = [{"input": args.indir, "output": args.output, "params": params}]
+            else:
+                log.error("transform needs -i and -o, or --batch")
+                return EXIT_USAGE
+            return transform(args.template, jobs)
+        if args.command in ("undo", "redo"):
+            return undo_redo(args.bank, args.command == "redo", args.steps)
+        if args.command == "journal":
+            return show_journal(args.bank)
+        if args.command == "export":
+            return export_archive(args.archive, args.directory)
+        if args.command == "import":
+            return import_archive(args.archive, args.directory, args.bank)
+        if args.command == "replay":
+            return replay(args.port, args.capture, args.speed)
+        if args.command == "midi-import":
+            return midi_import(args.midi_file, args.directory)
+        if args.command == "midi-export":
+            maps = parse_map_spec(args.maps) if args.maps else None
+            return midi_export(args.bank_path, args.midi_file, maps, args.delay, args.bank)
+        if args.command == "batch":
+            with open(args.jobfile, "r") as fh:
+                jobs = json.load(fh)
+            if isinstance(jobs, dict):
+                jobs = jobs.get("jobs", [])
+            return run_batch(jobs)
+    except KeyboardInterrupt:
+        return EXIT_CANCELED
+    except (bank_archive.ArchiveError, midi_file.MidiFileError, capture_log.CaptureError) as ex:
+        log.error(ex)
+        return EXIT_INVALID
+    except (OSError, ValueError) as ex:
+        log.error(ex)
+        return EXIT_ERROR
+    return EXIT_USAGE
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pcr-librarian", description=__doc__)
+    parser.add_argument('-v', '--verbose', action="store_true", help='verbose logging output (debug)')
+    parser.add_argument('--profile', nargs='?', const="", metavar="PATH",
+                        help='profile the run and write PATH (.pstats) plus a .txt summary')
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    p = subparsers.add_parser("list-ports", help="list MIDI in and out ports")
+    p.add_argument('--json', action="store_true", help="print the port lists as JSON")
+    p.add_argument('--probe', action="store_true",
+                   help="send an identity request on every out port and show which devices answer")
+
+    p = subparsers.add_parser("backup", help="receive control maps from a PCR")
+    p.add_argument('-p', '--port', required=True, help="MIDI in port number or name")
+    p.add_argument('-o', '--outdir', required=True, help="directory for the received .syx files")
+    p.add_argument('--single', action="store_true", help="receive the current control map only")
+    p.add_argument('--clean', action="store_true", help="delete existing .syx files first")
+    p.add_argument('--incremental', action="store_true",
+                   help="add a snapshot to the directory that only stores the maps changed since the last one")
+    p.add_argument('--wait', type=float, default=60.0, metavar="SECS",
+                   help="seconds to wait for the transfer to start (default: %(default)s)")
+    p.add_argument('--idle-timeout', type=float, default=5.0, metavar="SECS",
+                   help="seconds to wait between frames (default: %(default)s)")
+    p.add_argument('--record', metavar="FILE", help="record the input events and their timing to a capture file")
+
+    p = subparsers.add_parser("restore", help="send control maps to a PCR")
+    p.add_argument('-p', '--port', required=True, help="MIDI out port number or name")
+    p.add_argument('-i', '--indir', required=True, help="directory containing the .syx files, or a bank archive")
+    p.add_argument('-d', '--delay', type=int, default=transfer_engine.MESSAGE_DELAY, metavar="MS",
+                   help="pacing delay between sysex messages (default: %(default)s ms)")
+    p.add_argument('-m', '--maps', metavar="MAPS", help='send only these control maps, e.g. "7", "3-5" or "1,3-5"')
+
+    p = subparsers.add_parser("verify", help="check the frames of one or more banks")
+    p.add_argument('directories', nargs="+", metavar="directory", help="bank directory or bank archive")
+
+    p = subparsers.add_parser("diff", help="compare two banks")
+    p.add_argument('a', metavar="directory_a")
+    p.add_argument('b', metavar="directory_b")
+
+    p = subparsers.add_parser("batch", help="run the jobs of a JSON job file")
+    p.add_argument('jobfile', help='JSON list of jobs, e.g. [{"command": "backup", "port": 1, "directory": "..."}]')
+
+    p = subparsers.add_parser("compose", help="build a bank from control maps of other banks")
+    p.add_argument('slots', nargs="*", metavar="slot=bank[:map]",
+                   help="put a map of a bank (directory, archive or .syx file) into a slot, e.g. 1=old/2019:7")
+    p.add_argument('-o', '--output', help="bank directory, or a .syx file for a single file bank")
+    p.add_argument('-r', '--reference', metavar="BANK", help="full bank to take slot addresses from")
+    p.add_argument('--spec', help="JSON file with one or a list of compositions")
+
+    p = subparsers.add_parser("transform", help="apply an edit template to banks")
+    p.add_argument('template', help="JSON edit template")
+    p.add_argument('-i', '--indir', metavar="BANK", help="bank to edit (directory, archive or .syx file)")
+    p.add_argument('-o', '--output', help="bank directory, or a .syx file for a single file bank")
+    p.add_argument('--param', action="append", default=[], metavar="NAME=VALUE",
+                   help="template parameter, may be repeated")
+    p.add_argument('--batch', help='JSON list of {"input": ..., "output": ..., "params": {...}}')
+
+    for command in ("undo", "redo"):
+        p = subparsers.add_parser(command, help="{} edits recorded in a bank's edit journal".format(command))
+        p.add_argument('bank', help="bank directory or .syx file")
+        p.add_argument('-n', '--steps', type=int, default=1, help="number of operations (default: %(default)s)")
+
+    p = subparsers.add_parser("journal", help="list the edits recorded in a bank's edit journal")
+    p.add_argument('bank', help="bank directory or .syx file")
+
+    p = subparsers.add_parser("export", help="write a bank or a library of banks to a compressed archive")
+    p.add_argument('archive', help="archive file to create (.pcrz)")
+    p.add_argument('directory', help="bank directory, or a directory of bank directories")
+
+    p = subparsers.add_parser("import", help="unpack a bank archive")
+    p.add_argument('archive', help="archive file (.pcrz)")
+    p.add_argument('directory', help="target directory")
+    p.add_argument('--bank', help="import only this bank of the archive")
+
+    p = subparsers.add_parser("replay", help="send a capture recorded by backup --record with its timing")
+    p.add_argument('capture', help="capture file")
+    p.add_argument('-p', '--port', required=True, help="MIDI out port number or name")
+    p.add_argument('-s', '--speed', type=float, default=1.0,
+                   help="timing scale, 2 replays twice as fast, 0 as fast as possible (default: %(default)s)")
+
+    p = subparsers.add_parser("midi-import", help="pull control map banks out of a Standard MIDI File")
+    p.add_argument('midi_file', help="MIDI file (.mid)")
+    p.add_argument('directory', help="directory for the bank directories")
+
+    p = subparsers.add_parser("midi-export", help="write a bank as a timed Standard MIDI File")
+    p.add_argument('bank_path', metavar="bank", help="bank directory, archive or .syx file")
+    p.add_argument('midi_file', help="MIDI file to create (.mid)")
+    p.add_argument('-m', '--maps', metavar="MAPS", help='export only these control maps, e.g. "7", "3-5" or "1,3-5"')
+    p.add_argument('-d', '--delay', type=int, default=transfer_engine.MESSAGE_DELAY, metavar="MS",
+                   help="pacing delay between sysex messages (default: %(default)s ms)")
+    p.add_argument('--bank', help="bank within an archive or MIDI file")
+
+    p = subparsers.add_parser("history", help="list or export snapshots from the snapshot history")
+    p.add_argument('device', nargs="?", help="device key, omit to list the devices")
+    p.add_argument('--seq', type=int, help="snapshot number (default: latest)")
+    p.add_argument('--export', metavar="DIR", help="write the snapshot to a bank directory")
+
+    return parser
+
+
+def main(args=None):
+    parser = build_parser()
+    args = parser.parse_args(args)
+    logging.basicConfig(format="%(name)s: %(levelname)s - %(message)s",
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+    # Receive path errors go to the event log, stdout is kept for command output
+    event_log.start(sys.stderr)
+    try:
+        return run_profiled(resolve_profile_path(args.profile, "pcr-librarian"), _run, args)
+    finally:
+        event_log.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
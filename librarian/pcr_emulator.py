@@ -0,0 +1,206 @@
+# coding: utf-8
+#
+# pcr_emulator - software stand-in for a PCR keyboard
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# The emulator plays back a bank of control map frames when its MIDI in
+# port is opened (as if the bulk dump was started at the keyboard) and
+# keeps the frames sent to its MIDI out port as its new bank. Register
+# it with pcr_midi_util.register_virtual_device() to use it in place of
+# a real PCR.
+#
+
+
+import os
+import threading
+import time
+from pcr_sysex import CONTROL_MAP_LEN, FRAMES_PER_MAP, MAP_COUNT, calc_check_sum, CHECKSUM_OFFSET
+
+
+# Header of the frames made up by synthetic()
+_HEADER = [0xF0, 0x41, 0x10, 0x00, 0x00, 0x1A, 0x12]
+# Identity Reply: Roland, device 0x10. The family, member and version
+# bytes are made up, they are not the codes of a real PCR.
+_IDENTITY_REPLY = [0xF0, 0x7E, 0x10, 0x06, 0x02, 0x41, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xF7]
+
+
+class PCREmulator():
+    """
+    Emulated PCR holding a bank of control map frames
+    """
+    def __init__(self, frames, frame_interval=0.0):
+        """
+        Create an emulator
+        :param frames: List of frames (bytes) in dump order
+        :param frame_interval: Seconds between dumped frames
+        """
+        self._lock = threading.Lock()
+        self.frames = list(frames)
+        self.frame_interval = frame_interval
+        self._open_ins = []
+
+    @classmethod
+    def from_directory(cls, directory, frame_interval=0.0):
+        """
+        Emulate a PCR holding the bank saved in a directory
+        :param directory: Directory of pcr-NNNN.syx files
+        """
+        names = sorted([fn for fn in os.listdir(directory) if fn.lower().endswith('.syx')])
+        frames = []
+        for name in names:
+            with open(os.path.join(directory, name), 'rb') as fh:
+                frames.append(fh.read())
+        return cls(frames, frame_interval)
+
+    @classmethod
+    def synthetic(cls, maps=MAP_COUNT, frame_interval=0.0):
+        """
+        Emulate a PCR with made up but well formed frames. The
+        address bytes simply number the frames and are not meant
+        to match a real keyboard.
+        :param maps: Number of control maps
+        """
+        frames = []
+        for m in range(maps):
+            for f in range(FRAMES_PER_MAP):
+                frame = bytearray(CONTROL_MAP_LEN)
+                frame[0:len(_HEADER)] = bytes(_HEADER)
+                frame[7:11] = bytes([0, m, f, 0])
+                for i in range(11, CHECKSUM_OFFSET):
+                    frame[i] = (m * 7 + f * 3 + i) & 0x7F
+                frame[CHECKSUM_OFFSET] = calc_check_sum(frame)
+                frame[-1] = 0xF7
+                frames.append(bytes(frame))
+        return cls(frames, frame_interval)
+
+    def open_midiin(self):
+        midiin = _EmulatedMidiIn(self)
+        with self._lock:
+            self._open_ins.append(midiin)
+        return midiin
+
+    def open_midiout(self):
+        return _EmulatedMidiOut(self)
+
+    def _store(self, frames):
+        with self._lock:
+            self.frames = list(frames)
+
+    def _dump(self):
+        with self._lock:
+            return list(self.frames)
+
+    def _reply_identity(self):
+        with self._lock:
+            for midiin in self._open_ins:
+                midiin.replies.append(list(_IDENTITY_REPLY))
+
+    def _closed(self, midiin):
+        with self._lock:
+            if midiin in self._open_ins:
+                self._open_ins.remove(midiin)
+
+
+class _EmulatedMidiIn():
+    """
+    MIDI in side of the emulator. The bank dump starts when
+    sysex reception is enabled. Messages are polled with get_message()
+    or, after set_callback(), delivered from a thread as rtmidi does.
+    """
+    # Seconds between checks for the next message when delivering to a callback
+    CALLBACK_POLL = 0.001
+
+    def __init__(self, device):
+        self._device = device
+        self._pending = []
+        self._next_time = 0.0
+        self._last_time = None
+        self._callback_thread = None
+        self._callback_stop = threading.Event()
+        self.replies = []
+
+    def ignore_types(self, sysex=True, timing=True, active_sense=True):
+        if not sysex:
+            self._pending = self._device._dump()
+            self._next_time = time.monotonic()
+
+    def set_callback(self, func, data=None):
+        """
+        Deliver messages to func((message, deltatime), data) from a thread
+        """
+        self.cancel_callback()
+        self._callback_stop.clear()
+        self._callback_thread = threading.Thread(target=self._deliver, args=(func, data),
+                                                 name="pcr_emulator_in", daemon=True)
+        self._callback_thread.start()
+
+    def cancel_callback(self):
+        if self._callback_thread is not None:
+            self._callback_stop.set()
+            if self._callback_thread is not threading.current_thread():
+                self._callback_thread.join()
+            self._callback_thread = None
+
+    def _deliver(self, func, data):
+        while not self._callback_stop.is_set():
+            event = self._next_message()
+            if event is None:
+                self._callback_stop.wait(_EmulatedMidiIn.CALLBACK_POLL)
+            else:
+                func(event, data)
+
+    def get_message(self):
+        # Like rtmidi, nothing is queued for polling while a callback is set
+        if self._callback_thread is not None:
+            return None
+        return self._next_message()
+
+    def _next_message(self):
+        if self.replies:
+            return self.replies.pop(0), 0.0
+        if not self._pending or time.monotonic() < self._next_time:
+            return None
+        frame = self._pending.pop(0)
+        now = time.monotonic()
+        deltatime = 0.0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+        self._next_time = now + self._device.frame_interval
+        return list(frame), deltatime
+
+    def close_port(self):
+        self.cancel_callback()
+        self._pending = []
+        self._device._closed(self)
+
+
+class _EmulatedMidiOut():
+    """
+    MIDI out side of the emulator. Frames received become the
+    emulator's bank when the port is closed.
+    """
+    def __init__(self, device):
+        self._device = device
+        self.received = []
+
+    def send_message(self, message):
+        message = bytes(message)
+        if message[:2] == b"\xF0\x7E" and message[3:5] == b"\x06\x01":
+            self._device._reply_identity()
+            return
+        self.received.append(message)
+
+    def close_port(self):
+        if self.received:
+            self._device._store(self.received)
@@ -24,9 +24,15 @@
 #
 
 # Python 3
-import os.path
 import time
+# As early as possible for measuring time-to-first-frame
+_START_TIME = time.perf_counter()
+import argparse
+import bisect
+import os.path
 import inspect
+import queue
+import threading
 # from collections import OrderedDict
 from tkinter import filedialog, messagebox
 from tkinter import Tk, Frame, Button, Label, LabelFrame, Entry, StringVar, Menu, Listbox, Scrollbar
@@ -34,17 +40,27 @@ from tkinter import ttk
 from tkinter.ttk import Combobox
 import tkinter
 from text_message_box import TextMessageBox
-from pcr_midi_util import get_midiout_ports, get_midiin_ports
-from receive_dlg import ReceiveDlg
-from send_dlg import SendDlg
 from version import app_version
 from configuration import Configuration
+from event_log import event_log
+from profiling import resolve_profile_path, run_profiled
+from dir_scanner import DirectoryScanner, ADDED, REMOVED, DONE, FAILED
+from control_map_browser import ControlMapBrowser
 
 
 class PCRLibrarianApp(Tk):
     """
     Main window for thePCR Librarian app
     """
+    # Number of event log entries shown by Help > Recent Events
+    RECENT_EVENTS = 50
+    # Time-to-first-frame budget in milliseconds
+    STARTUP_BUDGET_MS = 500
+    # How often to check for MIDI port changes from the port watcher (ms)
+    PORT_DISCOVERY_POLL = 250
+    # How often to apply directory scan results (ms)
+    SCAN_POLL = 50
+
     def __init__(self):
         super(PCRLibrarianApp, self).__init__()
 
@@ -61,6 +77,17 @@ class PCRLibrarianApp(Tk):
         self.background_color = "#ffffff"
         self.highlight_color = "#e0e0e0"
 
+        # Control map files in the selected directory, sorted
+        self._files = []
+        self._scanner = DirectoryScanner()
+        # Snapshot history of received banks, opened on first use. The lock
+        # keeps history writes in order with the deletes before a receive.
+        self._history = None
+        self._history_lock = threading.Lock()
+        self._receive_pending = False
+        self._scan_after_id = None
+        self._scan_directory = None
+
         # Create window widgets
         self._create_widgets(sw, sh)
 
@@ -83,6 +110,12 @@ class PCRLibrarianApp(Tk):
         # Restore last used directory
         self._set_directory(Configuration.get_last_recent())
 
+        # MIDI port discovery happens in the background
+        self._start_port_discovery()
+
+        # Runs once the window is up and the event loop is idle
+        self.after_idle(self._on_first_frame)
+
     def _create_widgets(self, sw, sh):
         """
         Create the UI widgets
@@ -134,13 +167,10 @@ class PCRLibrarianApp(Tk):
         self._fr_dir.grid(row=r, column=0, padx=10)
         r += 1
 
-        # Control map file listbox with scrollbar
+        # Control map files browser (bank -> map -> frame)
         self._lb_frame = LabelFrame(self._ctrl_frame, text="Control Map Files", pady=5, padx=5)
-        self._lb_scrollbar = Scrollbar(self._lb_frame, orient=tkinter.VERTICAL)
-        self._lb_filelist = Listbox(master=self._lb_frame, width=100)
-        self._lb_scrollbar.config(command=self._lb_filelist.yview)
-        self._lb_scrollbar.pack(side=tkinter.RIGHT, fill=tkinter.Y)
-        self._lb_filelist.pack()
+        self._lb_filelist = ControlMapBrowser(self._lb_frame, width=100, height=10)
+        self._lb_filelist.pack(fill=tkinter.BOTH, expand=True)
         self._lb_frame.grid(row=r, column=0, pady=5)
         r += 1
 
@@ -155,8 +185,14 @@ class PCRLibrarianApp(Tk):
         self._btn_send_button = Button(master=self._button_frame, text="Send Control Map Files", state=tkinter.DISABLED, command=self._on_send)
         self._btn_send_button.grid(row=0, column=2, padx=5)
 
+        # Maps to send, e.g. "7" or "3-5". Blank sends all maps.
+        self._lbl_send_maps = Label(master=self._button_frame, text="Maps")
+        self._lbl_send_maps.grid(row=0, column=3)
+        self._ent_send_maps = Entry(master=self._button_frame, width=8)
+        self._ent_send_maps.grid(row=0, column=4, padx=5)
+
         self._btn_quit_button = Button(master=self._button_frame, text="Quit", command=self._on_close)
-        self._btn_quit_button.grid(row=0, column=3, padx=5)
+        self._btn_quit_button.grid(row=0, column=5, padx=5)
 
         # MIDI in/out ports listboxes
         self._lb_midiports_frame = LabelFrame(self, text="MIDI Ports", pady=5, padx=5)
@@ -175,24 +211,16 @@ class PCRLibrarianApp(Tk):
 
         self._lb_midiports_frame.grid(row=1, column=0, pady=5)
 
-        # Populate midin ports listbox
-        self._in_ports = get_midiin_ports()
-        for p in self._in_ports:
-            self._lb_midiin_ports.insert(tkinter.END, p)
-
-        # Populate midout ports listbox
-        self._out_ports = get_midiout_ports()
-        for p in self._out_ports:
-            self._lb_midiout_ports.insert(tkinter.END, p)
-
-        # Minimize the height of the ports listboxes
-        max_height = max(len(self._in_ports), len(self._out_ports))
-        self._lb_midiin_ports.config(height=max_height)
-        self._lb_midiout_ports.config(height=max_height)
-
-        # Default midi port selections
-        self._lb_midiin_ports.select_set(0)
-        self._lb_midiout_ports.select_set(0)
+        # The ports listboxes are filled when port discovery finishes
+        self._in_ports = []
+        self._out_ports = []
+        # Identity probe results by in port name, and the in/out port pairs of PCRs
+        self._port_identities = {}
+        self._pcr_ports = []
+        # A probe sends sysex to every device, so none is started during a transfer.
+        # None, or the refresh argument of a probe put off until the transfer ends.
+        self._transfer_active = False
+        self._deferred_probe = None
 
         # Status bar
         self._v_statusbar = StringVar(value="Select control map directory")
@@ -202,6 +230,183 @@ class PCRLibrarianApp(Tk):
         # Put the focus in the directory text box
         self._ent_directory.focus_set()
 
+    def _start_port_discovery(self):
+        """
+        Start the MIDI port watcher on a worker thread. Loading rtmidi and
+        asking the MIDI subsystem for ports can take a noticeable
+        amount of time, so the window does not wait for it.
+        Port list changes (hot-plug) are queued and applied on the UI thread.
+        :return:
+        """
+        self._port_results = queue.Queue()
+        self._probe_results = queue.Queue()
+        self._port_manager = None
+
+        def discover():
+            try:
+                # rtmidi is loaded here, off the UI thread
+                from port_manager import get_port_manager
+                port_manager = get_port_manager()
+                port_manager.subscribe(self._on_ports_changed)
+                port_manager.start()
+                self._port_manager = port_manager
+            except Exception as ex:
+                event_log.error("Port discovery", ex)
+
+        threading.Thread(target=discover, name="port_discovery", daemon=True).start()
+        self.after(PCRLibrarianApp.PORT_DISCOVERY_POLL, self._check_port_changes)
+
+    def _on_ports_changed(self, in_ports, out_ports):
+        """
+        Port watcher listener. Called on the watcher thread.
+        :param in_ports: MIDI in port names
+        :param out_ports: MIDI out port names
+        :return:
+        """
+        self._port_results.put((in_ports, out_ports))
+
+    def _check_port_changes(self):
+        """
+        Apply the latest port lists from the port watcher
+        :return:
+        """
+        ports = None
+        try:
+            while True:
+                ports = self._port_results.get_nowait()
+        except queue.Empty:
+            pass
+        if ports is not None:
+            self._fill_ports_listboxes(*ports)
+            self._start_identity_probe()
+        try:
+            while True:
+                self._apply_identities(*self._probe_results.get_nowait())
+        except queue.Empty:
+            pass
+        self.after(PCRLibrarianApp.PORT_DISCOVERY_POLL, self._check_port_changes)
+
+    def _start_identity_probe(self, refresh=False):
+        """
+        Identify the devices on the MIDI ports on a worker thread. Ports
+        seen before are answered from the configuration without probing.
+        :param refresh: Probe even if every port is known
+        :return:
+        """
+        if self._transfer_active:
+            self._deferred_probe = refresh or bool(self._deferred_probe)
+            return
+        in_ports, out_ports = list(self._in_ports), list(self._out_ports)
+
+        def detect():
+            try:
+                from identity_probe import detect_ports
+                identities, pcrs = detect_ports(in_ports, out_ports, refresh=refresh)
+                self._probe_results.put((in_ports, out_ports, identities, pcrs))
+            except Exception as ex:
+                event_log.error("Identity probe", ex)
+
+        threading.Thread(target=detect, name="identity_probe", daemon=True).start()
+
+    def _apply_identities(self, in_ports, out_ports, identities, pcrs):
+        """
+        Label the ports with the devices that answered the probe and
+        select the ports of the PCR, if one was identified
+        :return:
+        """
+        if in_ports != self._in_ports or out_ports != self._out_ports:
+            # The ports changed while probing, a new probe is on its way
+            return
+        from identity_probe import describe, is_roland
+
+        self._port_identities = identities
+        self._pcr_ports = pcrs
+        pcr_names = [pcr[0] for pcr in pcrs]
+        labels = ["{}  [{}]".format(name, describe(identities[name], name in pcr_names))
+                  if identities.get(name) else name for name in in_ports]
+        self._refill_port_listbox(self._lb_midiin_ports, in_ports, in_ports, labels)
+
+        selected = self._lb_midiin_ports.curselection()
+        if pcrs and not (selected and in_ports[selected[0]] in pcr_names):
+            in_name, out_name = pcrs[0]
+            self._lb_midiin_ports.selection_clear(0, tkinter.END)
+            self._lb_midiin_ports.select_set(in_ports.index(in_name))
+            if out_name is not None:
+                self._lb_midiout_ports.selection_clear(0, tkinter.END)
+                self._lb_midiout_ports.select_set(out_ports.index(out_name))
+            self._set_statusbar("PCR found on {}".format(in_name))
+        elif not pcrs and len([i for i in identities.values() if is_roland(i)]) > 1:
+            self._set_statusbar("Several Roland devices answered, select the PCR ports")
+
+    def _on_detect_ports(self):
+        self._set_statusbar("Detecting PCR ports")
+        self._start_identity_probe(refresh=True)
+
+    def _fill_ports_listboxes(self, in_ports, out_ports):
+        """
+        Fill the ports listboxes, keeping the current selections
+        if those ports are still there.
+        :param in_ports: MIDI in port names
+        :param out_ports: MIDI out port names
+        :return:
+        """
+        first_fill = not self._in_ports and not self._out_ports
+        self._refill_port_listbox(self._lb_midiin_ports, self._in_ports, in_ports)
+        self._refill_port_listbox(self._lb_midiout_ports, self._out_ports, out_ports)
+        self._in_ports = in_ports
+        self._out_ports = out_ports
+
+        # Minimize the height of the ports listboxes
+        max_height = max(len(self._in_ports), len(self._out_ports), 1)
+        self._lb_midiin_ports.config(height=max_height)
+        self._lb_midiout_ports.config(height=max_height)
+
+        # Refit the window height to the port lists
+        self.update_idletasks()
+        self.geometry("{0}x{1}".format(self.winfo_width(), self.winfo_reqheight()))
+
+        if not first_fill:
+            self._set_statusbar("MIDI ports changed")
+
+    @staticmethod
+    def _refill_port_listbox(listbox, old_ports, new_ports, labels=None):
+        selected = listbox.curselection()
+        selected_name = old_ports[selected[0]] if selected and selected[0] < len(old_ports) else None
+
+        listbox.delete(0, tkinter.END)
+        for p in (labels or new_ports):
+            listbox.insert(tkinter.END, p)
+
+        # Default midi port selection is the first port
+        if selected_name in new_ports:
+            listbox.select_set(new_ports.index(selected_name))
+        elif new_ports:
+            listbox.select_set(0)
+
+    def _on_first_frame(self):
+        """
+        Record how long it took to get the main window on the screen
+        :return:
+        """
+        elapsed_ms = (time.perf_counter() - _START_TIME) * 1000.0
+        if elapsed_ms > PCRLibrarianApp.STARTUP_BUDGET_MS:
+            event_log.warning("Startup", "Time to first frame {:.0f} ms exceeds budget of {} ms".format(
+                elapsed_ms, PCRLibrarianApp.STARTUP_BUDGET_MS))
+        else:
+            event_log.info("Startup", "Time to first frame {:.0f} ms".format(elapsed_ms))
+
+    def _selected_port(self, listbox):
+        """
+        Return the selected port number of a ports listbox
+        :param listbox: The MIDI in or out ports listbox
+        :return: Port number or None if there is no selection (yet)
+        """
+        selected_port = listbox.curselection()
+        if not selected_port:
+            self._set_statusbar("Select a MIDI port")
+            return None
+        return selected_port[0]
+
     def _create_menu(self):
         # will return x11 (Linux), win32 or aqua (macOS)
         gfx_platform = self.tk.call('tk', 'windowingsystem')
@@ -219,17 +424,32 @@ class PCRLibrarianApp(Tk):
             self.createcommand('tk::mac::ShowPreferences', self._show_preferences)
 
             filemenu = Menu(self._menu_bar, tearoff=0)
+            filemenu.add_command(label="Export bank...", command=self._on_export_bank)
+            filemenu.add_command(label="Import bank...", command=self._on_import_bank)
+            filemenu.add_separator()
+            filemenu.add_command(label="Detect PCR ports", command=self._on_detect_ports)
+            filemenu.add_separator()
             filemenu.add_command(label="Clear recent directories list", command=self._on_clear_recent)
             self._menu_bar.add_cascade(label="File", menu=filemenu)
+
+            helpmenu = Menu(self._menu_bar, tearoff=0)
+            helpmenu.add_command(label="Recent Events", command=self._show_recent_events)
+            self._menu_bar.add_cascade(label="Help", menu=helpmenu)
         elif gfx_platform in ["win32", "x11"]:
             # Build a menu for Windows or Linux
             filemenu = Menu(self._menu_bar, tearoff=0)
+            filemenu.add_command(label="Export bank...", command=self._on_export_bank)
+            filemenu.add_command(label="Import bank...", command=self._on_import_bank)
+            filemenu.add_separator()
+            filemenu.add_command(label="Detect PCR ports", command=self._on_detect_ports)
+            filemenu.add_separator()
             filemenu.add_command(label="Clear recent directories list", command=self._on_clear_recent)
             filemenu.add_separator()
             filemenu.add_command(label="Exit", command=self._on_close)
             self._menu_bar.add_cascade(label="File", menu=filemenu)
 
             helpmenu = Menu(self._menu_bar, tearoff=0)
+            helpmenu.add_command(label="Recent Events", command=self._show_recent_events)
             helpmenu.add_command(label="About", command=self._show_about)
             self._menu_bar.add_cascade(label="Help", menu=helpmenu)
 
@@ -241,9 +461,8 @@ class PCRLibrarianApp(Tk):
         :param text:
         :return:
         """
+        # Drawn by the event loop, no forced update
         self._v_statusbar.set(text)
-        # Force the widget to update now
-        self._lbl_statusbar.update()
 
     def _on_recent_directory(self, event=None):
         directory = self._cb_recent_dirs.get()
@@ -265,6 +484,62 @@ class PCRLibrarianApp(Tk):
         Configuration.clear_recent()
         self._cb_recent_dirs.config(values=Configuration.get_recent())
 
+    def _on_export_bank(self):
+        """
+        Export the .syx files of the selected directory to a bank archive
+        :return:
+        """
+        from bank_archive import export_directory, ArchiveError, ARCHIVE_EXTENSION
+
+        directory = self._ent_directory.get()
+        if not self._files:
+            self._set_statusbar("There are no .syx files to export")
+            return
+        path = filedialog.asksaveasfilename(title="Export bank", defaultextension=ARCHIVE_EXTENSION,
+                                            initialfile=os.path.basename(os.path.normpath(directory)),
+                                            filetypes=[("Bank archives", "*" + ARCHIVE_EXTENSION)])
+        if not path:
+            return
+        try:
+            count = export_directory(path, directory)
+            self._set_statusbar("Exported {} files to {}".format(count, path))
+        except (OSError, ArchiveError) as ex:
+            event_log.error("Export", ex)
+            self._set_statusbar("Export failed: {}".format(ex))
+
+    def _on_import_bank(self):
+        """
+        Import a bank archive into the selected directory. The .syx
+        files of the directory are replaced.
+        :return:
+        """
+        from bank_archive import BankArchive, ArchiveError, ARCHIVE_EXTENSION
+
+        directory = self._ent_directory.get()
+        if not directory:
+            self._set_statusbar("Select a directory to import into")
+            return
+        path = filedialog.askopenfilename(title="Import bank",
+                                          filetypes=[("Bank archives", "*" + ARCHIVE_EXTENSION),
+                                                     ("All files", "*")])
+        if not path:
+            return
+        try:
+            with BankArchive(path) as archive:
+                if len(archive.banks()) == 1 and self._files:
+                    if not messagebox.askyesno("Import bank",
+                                               "Replace the .syx files in {}?".format(directory), parent=self):
+                        return
+                    self._delete_existing_files()
+                count = archive.extract_all(directory)
+            # The files no longer hold what a device sent
+            Configuration.set_directory_device(directory, None)
+            self._set_statusbar("Imported {} files from {}".format(count, os.path.basename(path)))
+        except (OSError, ArchiveError) as ex:
+            event_log.error("Import", ex)
+            self._set_statusbar("Import failed: {}".format(ex))
+        self._load_files()
+
     def _set_directory(self, directory):
         if directory:
             Configuration.set_recent(directory)
@@ -272,51 +547,180 @@ class PCRLibrarianApp(Tk):
             self._ent_directory.delete(0, tkinter.END)
             self._ent_directory.insert(0, directory)
 
+            # Start over with an empty files list
+            self._files.clear()
+            self._fill_files_listbox()
             self._load_files()
 
             self._btn_receive_current_button["state"] = tkinter.NORMAL
             self._btn_receive_all_button["state"] = tkinter.NORMAL
 
-            self._fill_files_listbox()
             self._cb_recent_dirs.config(values=Configuration.get_recent())
 
     def _on_send(self):
         """
-        Send control map(s). Sends all .syx files from selected directory.
+        Send control map(s). Sends the .syx files of the maps entered in
+        the Maps field, or all .syx files from selected directory.
         :return:
         """
-        selected_port = self._lb_midiout_ports.curselection()
-        dlg = SendDlg(self, title="Send Control Map Sysex Files",
-                      port=selected_port[0], files=self._files)
+        from send_dlg import SendDlg
+        from map_index import MapIndex, parse_map_spec
+
+        selected_port = self._selected_port(self._lb_midiout_ports)
+        if selected_port is None:
+            return
+        files = self._files
+        spec = self._ent_send_maps.get().strip()
+        if spec:
+            try:
+                files = MapIndex.from_paths(self._files).names(parse_map_spec(spec))
+            except ValueError as ex:
+                self._set_statusbar(str(ex))
+                return
+        self._begin_transfer()
+        try:
+            dlg = SendDlg(self, title="Send Control Map Sysex Files",
+                          port=selected_port, files=files)
+        finally:
+            self._end_transfer()
+
+    def _begin_transfer(self):
+        self._transfer_active = True
+
+    def _end_transfer(self):
+        """
+        Run the identity probe that was put off by the transfer, if any
+        """
+        self._transfer_active = False
+        if self._deferred_probe is not None:
+            refresh, self._deferred_probe = self._deferred_probe, None
+            self._start_identity_probe(refresh=refresh)
 
     def _on_receive_current_map(self):
+        from receive_dlg import ReceiveDlg
+
         self._set_statusbar("Ready to receive current control map")
         self._on_receive_control_maps(ReceiveDlg.SINGLE)
 
     def _on_receive_all_maps(self):
+        from receive_dlg import ReceiveDlg
+
         self._set_statusbar("Ready to receive all 15 control maps")
         self._on_receive_control_maps(ReceiveDlg.ALL)
 
     def _on_receive_control_maps(self, count):
-        # Delete existing .syx files
-        self._delete_existing_files()
+        from receive_dlg import ReceiveDlg
+
+        selected_port = self._selected_port(self._lb_midiin_ports)
+        if selected_port is None or self._receive_pending:
+            return
+
+        device = self._in_ports[selected_port]
+        directory = self._ent_directory.get()
+        # The files about to be replaced are kept in the snapshot history,
+        # but only if they came from this device
+        keep = Configuration.get_directory_device(directory) == device
+        files = list(self._files)
+        result = []
+        done = threading.Event()
+
+        def prepare():
+            # Reading and deleting a whole bank is too slow for the UI thread
+            try:
+                with self._history_lock:
+                    if keep:
+                        self._archive_to_history(device, directory, "Before receive")
+                    for file in files:
+                        os.remove(file)
+            except OSError as ex:
+                event_log.error("Receive", ex)
+                result.append(ex)
+            finally:
+                done.set()
+
+        self._receive_pending = True
+        threading.Thread(target=prepare, name="receive_prepare", daemon=True).start()
+        self._when_set(done, lambda: self._receive_control_maps(selected_port, device, directory, count, result))
+
+    def _when_set(self, event, callback):
+        """
+        Call back on the UI thread once a worker thread sets an event
+        :param event: threading.Event
+        :param callback: Callable without arguments
+        :return:
+        """
+        if event.is_set():
+            callback()
+        else:
+            self.after(PCRLibrarianApp.SCAN_POLL, self._when_set, event, callback)
+
+    def _receive_control_maps(self, port, device, directory, count, errors):
+        """
+        Receive into a directory whose old files were archived and deleted
+        :param errors: Errors of the preparation, the receive is skipped if any
+        :return:
+        """
+        from receive_dlg import ReceiveDlg
+
+        self._receive_pending = False
+        self._files.clear()
+        self._fill_files_listbox()
+        if errors:
+            self._set_statusbar("Unable to delete the existing files: {}".format(errors[0]))
+            self._load_files()
+            return
 
-        selected_port = self._lb_midiin_ports.curselection()
         # Modal dialog box for receiving sysex messages from PCR
         dlg = ReceiveDlg(self, title="Receive Current Control Map",
-                         port=selected_port[0], dir=self._ent_directory.get(), control_map=count)
+                         port=port, dir=directory, control_map=count)
 
-        dlg.begin_modal()
+        self._begin_transfer()
+        try:
+            dlg.begin_modal()
+        finally:
+            self._end_transfer()
 
         if dlg.result:
+            Configuration.set_directory_device(directory, device)
+            threading.Thread(target=self._locked_archive_to_history,
+                             args=(device, directory, "Received {} frames".format(count)),
+                             name="history", daemon=True).start()
             self._set_statusbar("Current control map(s) received")
         else:
             self._set_statusbar("Canceled")
         self._load_files()
-        self._fill_files_listbox()
 
         del dlg
 
+    def _locked_archive_to_history(self, device, directory, label):
+        with self._history_lock:
+            self._archive_to_history(device, directory, label)
+
+    def _archive_to_history(self, device, directory, label):
+        """
+        Add the files of a directory to the device's snapshot history
+        unless they match its latest snapshot. Runs on a worker thread.
+        :param device: MIDI port name of the device
+        :param directory: Bank directory
+        :param label: Snapshot description
+        :return: Sequence number of the snapshot or None
+        """
+        from snapshot_history import HistoryStore, HistoryError, device_key, read_bank
+
+        try:
+            frames = read_bank(directory)
+            if not frames:
+                return None
+            if self._history is None:
+                self._history = HistoryStore(Configuration.get_history_directory())
+            key = device_key(device)
+            if self._history.latest(key) is not None and self._history.get(key) == frames:
+                return None
+            return self._history.add(key, frames, label)
+        except (OSError, HistoryError) as ex:
+            event_log.error("History", ex)
+            return None
+
     def _delete_existing_files(self):
         """
         Delete existing .syx files
@@ -329,26 +733,83 @@ class PCRLibrarianApp(Tk):
 
     def _load_files(self):
         """
-        Load all of the .syx files in the selected directory
+        Load all of the .syx files in the selected directory. The directory
+        is scanned in the background and only the files that were added or
+        removed since the last load are applied to the files browser.
         :return:
         """
-        self._files = []
-        directory = self._ent_directory.get()
-        self._files.extend(sorted([os.path.join(directory, fn) for fn in os.listdir(directory)
-                                   if fn.lower().endswith('.syx')]))
-        if len(self._files) >= 50:
-            self._btn_send_button["state"] = tkinter.NORMAL
-        else:
-            self._btn_send_button["state"] = tkinter.DISABLED
+        self._btn_send_button["state"] = tkinter.DISABLED
+        self._scan_directory = self._ent_directory.get()
+        # A listing recorded by an earlier scan is reused if the directory has not changed
+        self._scanner.scan(self._scan_directory, known=self._files,
+                           cached_listing=Configuration.get_cached_listing(self._scan_directory))
+        if self._scan_after_id is None:
+            self._scan_after_id = self.after(PCRLibrarianApp.SCAN_POLL, self._check_scan_results)
+
+    def _check_scan_results(self):
+        """
+        Apply directory scan results to the files list and browser
+        :return:
+        """
+        self._scan_after_id = None
+        done = False
+        try:
+            while not done:
+                scan_id, kind, result = self._scanner.results.get_nowait()
+                # Ignore leftovers from an abandoned scan
+                if scan_id != self._scanner.current_scan:
+                    continue
+                if kind == ADDED:
+                    self._add_files(result)
+                elif kind == REMOVED:
+                    self._remove_files(result)
+                elif kind == FAILED:
+                    self._set_statusbar("Unable to read directory: {}".format(result))
+                    done = True
+                elif kind == DONE:
+                    # Files received under existing names are not added or removed
+                    self._lb_filelist.refresh(self._scanner.stat_cache(self._scan_directory))
+                    if len(self._files) >= 50:
+                        self._btn_send_button["state"] = tkinter.NORMAL
+                    Configuration.set_directory_info(self._scan_directory,
+                                                     [os.path.basename(f) for f in self._files], result)
+                    done = True
+        except queue.Empty:
+            pass
+
+        if not done:
+            self._scan_after_id = self.after(PCRLibrarianApp.SCAN_POLL, self._check_scan_results)
+
+    def _add_files(self, paths):
+        """
+        Insert files into the sorted files list and browser
+        :param paths: Files to be added
+        :return:
+        """
+        for path in paths:
+            i = bisect.bisect_left(self._files, path)
+            self._files.insert(i, path)
+        self._lb_filelist.add_files(paths)
+
+    def _remove_files(self, paths):
+        """
+        Remove files from the files list and browser
+        :param paths: Files to be removed
+        :return:
+        """
+        for path in paths:
+            i = bisect.bisect_left(self._files, path)
+            if i < len(self._files) and self._files[i] == path:
+                del self._files[i]
+        self._lb_filelist.remove_files(paths)
 
     def _fill_files_listbox(self):
         """
-        Load the files listbox with all of the .syx files in the selected diretory
+        Load the files browser with all of the .syx files in the selected diretory
         :return:
         """
-        self._lb_filelist.delete(0, tkinter.END)
-        for f in self._files:
-            self._lb_filelist.insert(tkinter.END, f)
+        self._lb_filelist.clear()
+        self._lb_filelist.add_files(self._files)
 
     def _on_close(self):
         """
@@ -358,6 +819,9 @@ class PCRLibrarianApp(Tk):
         print(self._ent_directory.get())
         # Save the directory setting?
         Configuration.set_last_recent(self._ent_directory.get())
+        if self._port_manager is not None:
+            self._port_manager.unsubscribe(self._on_ports_changed)
+            self._port_manager.stop()
         # Essentially, this terminates the app by destroying the main window
         self.destroy()
         return True
@@ -388,13 +852,40 @@ class PCRLibrarianApp(Tk):
         mb.show()
         self.wait_window(window=mb)
 
+    def _show_recent_events(self):
+        """
+        Show the most recent entries in the event log
+        :return:
+        """
+        text = event_log.format_recent(PCRLibrarianApp.RECENT_EVENTS)
+        if not text:
+            text = "No events"
+        mb = TextMessageBox(self, title="Recent Events", text=text,
+                            heading="Last {} events".format(PCRLibrarianApp.RECENT_EVENTS),
+                            width=600, height=400)
+        mb.show()
+        self.wait_window(window=mb)
+
     def _show_preferences(self):
         tkinter.messagebox.showinfo("Preferences for PCR Librarian", "None currently defined")
 
 
-if __name__ == '__main__':
+def main():
     Configuration.load_configuration()
+    event_log.start()
 
     main_frame = PCRLibrarianApp()
     main_frame.mainloop()
+    event_log.stop()
+    Configuration.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PCR-300/500/800 Librarian")
+    parser.add_argument('--profile', nargs='?', const="", metavar="PATH",
+                        help="profile the session and write PATH (.pstats) plus a .txt summary")
+    # Ignore anything else, e.g. arguments added by an app launcher
+    args, unknown = parser.parse_known_args()
+
+    run_profiled(resolve_profile_path(args.profile, "pcr_librarian"), main)
     print("Ended")
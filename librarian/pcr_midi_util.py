@@ -17,12 +17,42 @@
 #
 
 
-from os.path import basename, exists, isdir, join
+from os.path import exists, isdir, join
 import os
 import time
-import rtmidi
-from rtmidi.midiutil import open_midioutput, open_midiinput, get_api_from_environment
-from rtmidi.midiconstants import END_OF_EXCLUSIVE, SYSTEM_EXCLUSIVE
+from rtmidi.midiutil import open_midioutput, open_midiinput
+from rtmidi.midiconstants import SYSTEM_EXCLUSIVE
+from event_log import event_log
+from pcr_sysex import is_control_map_frame
+from port_manager import get_port_manager
+from sysex_stream import SysexStreamParser, iter_file_messages
+
+
+# Virtual devices (e.g. the PCR emulator) by port name.
+# Their ports are numbered after the real MIDI ports.
+_virtual_devices = {}
+
+
+def register_virtual_device(name, device):
+    """
+    Make a virtual device available as a MIDI in and out port
+    :param name: Port name
+    :param device: Object with open_midiin() and open_midiout() methods
+    :return: None
+    """
+    _virtual_devices[name] = device
+
+
+def unregister_virtual_device(name):
+    _virtual_devices.pop(name, None)
+
+
+def _virtual_device(port, real_ports):
+    if isinstance(port, int) and port >= len(real_ports):
+        names = list(_virtual_devices.keys())
+        if port - len(real_ports) < len(names):
+            return _virtual_devices[names[port - len(real_ports)]]
+    return None
 
 
 def get_midiout_ports():
@@ -30,12 +60,7 @@ def get_midiout_ports():
     Return a list of MIDI out ports (names)
     :return:
     """
-    ports = []
-    midiout = rtmidi.MidiOut(get_api_from_environment())
-    port_list = midiout.get_ports()
-    for portno, name in enumerate(port_list):
-        ports.append(name)
-    return ports
+    return get_port_manager().out_ports() + list(_virtual_devices.keys())
 
 
 def open_midiout(port):
@@ -44,6 +69,9 @@ def open_midiout(port):
     :param port: Port to be opened, 0-n.
     :return:
     """
+    device = _virtual_device(port, get_port_manager().out_ports()) if _virtual_devices else None
+    if device is not None:
+        return device.open_midiout()
     midiout, name = open_midioutput(port=port)
     return midiout
 
@@ -53,12 +81,7 @@ def get_midiin_ports():
     Return a list of MIDI in ports (names)
     :return:
     """
-    ports = []
-    midiin = rtmidi.MidiIn(get_api_from_environment())
-    port_list = midiin.get_ports()
-    for portno, name in enumerate(port_list):
-        ports.append(name)
-    return ports
+    return get_port_manager().in_ports() + list(_virtual_devices.keys())
 
 
 def open_midiin(port):
@@ -67,6 +90,9 @@ def open_midiin(port):
     :param port: Port to be opened, 0-n.
     :return:
     """
+    device = _virtual_device(port, get_port_manager().in_ports()) if _virtual_devices else None
+    if device is not None:
+        return device.open_midiin()
     midiin, name = open_midiinput(port=port)
     return midiin
 
@@ -80,41 +106,20 @@ def send_sysex_file(filename, midiout, delay=50):
     :param delay: Pacing delay in milliseconds.
     :return:
     """
-    success = True
-    bn = basename(filename)
-
     with open(filename, 'rb') as sysex_file:
-        data = sysex_file.read()
-
-        if data[0] == SYSTEM_EXCLUSIVE:
-            sox = 0
+        if sysex_file.read(1) != bytes([SYSTEM_EXCLUSIVE]):
+            # The file does not start with a sysex message
+            return False
+        sysex_file.seek(0)
 
-            while sox >= 0:
-                sox = data.find(SYSTEM_EXCLUSIVE, sox)
+        for sysex_msg in iter_file_messages(sysex_file):
+            midiout.send_message(sysex_msg)
 
-                if sox >= 0:
-                    eox = data.find(END_OF_EXCLUSIVE, sox)
+            # This is pacing the send rate
+            if float(delay) > 0.0:
+                time.sleep(0.001 * float(delay))
 
-                    if eox >= 0:
-                        sysex_msg = data[sox:eox + 1]
-                        # Convert string data into list of integers
-                        if isinstance(sysex_msg, str):
-                            sysex_msg = [ord(c) for c in sysex_msg]
-
-                        midiout.send_message(sysex_msg)
-
-                        # This is pacing the send rate
-                        if float(delay) > 0.0:
-                            time.sleep(0.001 * float(delay))
-                    else:
-                        break
-
-                    sox = eox + 1
-        else:
-            # log.warning("File '%s' does not start with a sysex message.", bn)
-            success = False
-
-    return success
+    return True
 
 
 def receive_current_control_map(port, control_map_dir):
@@ -130,12 +135,14 @@ class SysexReceiver(object):
 
     fn_tmpl = "pcr-{:04}.syx"
 
-    def __init__(self, port, directory, debug=False, overwrite=True):
+    def __init__(self, port, directory, debug=False, overwrite=True, transfer=None):
         self._directory = directory
         self._debug = debug
         self._overwrite = overwrite
+        self._transfer = transfer
         self._fn_index = 1
         self.sysex_count = 0
+        self._parser = SysexStreamParser()
 
         self._midiin, name = open_midiinput(port)
         self._midiin.set_callback(self, data=None)
@@ -155,22 +162,24 @@ class SysexReceiver(object):
         """
         try:
             sysex, deltatime = event
-            if sysex[:1] != [SYSTEM_EXCLUSIVE]:
-                return
-
-            outfn = join(self._directory, SysexReceiver.fn_tmpl.format(self._fn_index))
-            self.next_filename_index()
-
-            if self._overwrite and exists(outfn):
-                os.remove(outfn)
-
-            sx_data = bytes(sysex)
-            with open(outfn, 'wb') as outfile:
-                outfile.write(sx_data)
-            self.sysex_count += 1
+            for frame in self._parser.feed(bytes(sysex)):
+                if not is_control_map_frame(frame):
+                    # Other sysex (e.g. an Identity Reply) is not numbered as a frame
+                    event_log.warning(self.__class__.__name__, "Ignored a {} byte sysex message that is not "
+                                      "a control map frame".format(len(frame)), self._transfer)
+                    continue
+                outfn = join(self._directory, SysexReceiver.fn_tmpl.format(self._fn_index))
+                self.next_filename_index()
+
+                if self._overwrite and exists(outfn):
+                    os.remove(outfn)
+
+                with open(outfn, 'wb') as outfile:
+                    outfile.write(frame)
+                self.sysex_count += 1
         except Exception as ex:
-            print(ex)
-            # pass
+            # Keep the receive path cheap, the event log does the reporting
+            event_log.error(self.__class__.__name__, ex, self._transfer)
 
     def next_filename_index(self):
         """
@@ -196,12 +205,14 @@ class SysexReceiverPolled():
 
     FN_TMPL = "pcr-{:04}.syx"
 
-    def __init__(self, port, directory, debug=False, overwrite=True):
+    def __init__(self, port, directory, debug=False, overwrite=True, transfer=None):
         self._directory = directory
         self._debug = debug
         self._overwrite = overwrite
+        self._transfer = transfer
         self._fn_index = 1
         self.sysex_count = 0
+        self._parser = SysexStreamParser()
 
         self._midiin, name = open_midiinput(port)
         self._midiin.ignore_types(sysex=False)
@@ -225,22 +236,24 @@ class SysexReceiverPolled():
         """
         try:
             sysex, deltatime = event
-            if sysex[:1] != [SYSTEM_EXCLUSIVE]:
-                return
-
-            outfn = join(self._directory, SysexReceiverPolled.FN_TMPL.format(self._fn_index))
-            self._next_filename_index()
-
-            if self._overwrite and exists(outfn):
-                os.remove(outfn)
-
-            sx_data = bytes(sysex)
-            with open(outfn, 'wb') as outfile:
-                outfile.write(sx_data)
-            self.sysex_count += 1
+            for frame in self._parser.feed(bytes(sysex)):
+                if not is_control_map_frame(frame):
+                    # Other sysex (e.g. an Identity Reply) is not numbered as a frame
+                    event_log.warning(self.__class__.__name__, "Ignored a {} byte sysex message that is not "
+                                      "a control map frame".format(len(frame)), self._transfer)
+                    continue
+                outfn = join(self._directory, SysexReceiverPolled.FN_TMPL.format(self._fn_index))
+                self._next_filename_index()
+
+                if self._overwrite and exists(outfn):
+                    os.remove(outfn)
+
+                with open(outfn, 'wb') as outfile:
+                    outfile.write(frame)
+                self.sysex_count += 1
         except Exception as ex:
-            print(ex)
-            # pass
+            # Keep the receive path cheap, the event log does the reporting
+            event_log.error(self.__class__.__name__, ex, self._transfer)
 
     def _next_filename_index(self):
         """
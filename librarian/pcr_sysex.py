@@ -0,0 +1,114 @@
+# coding: utf-8
+#
+# pcr_sysex - PCR control map sysex frame layout
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# References
+#   (1) https://www.2writers.com/eddie/TutSysEx.htm
+#       Format of a Roland sysex
+#
+# A control map is sent as 50 sysex frames of 141 bytes each and there
+# are 15 control maps. Received frames are saved one per file, named by
+# map and frame: pcr-0001.syx through pcr-0050.syx for the first map,
+# pcr-0101.syx through pcr-0150.syx for the second, and so on.
+#
+#   sx[0] = F0 = sysex start
+#   sx[1] = 41 = manufacturer ID = Roland
+#   sx[7:139] = control map data (including address)
+#   sx[139] = Roland checksum over sx[7:139]
+#   sx[140] = F7 = end of sysex
+#
+
+
+import os
+import re
+
+
+CONTROL_MAP_LEN = 141
+CHECKSUM_START = 7
+CHECKSUM_OFFSET = 139
+FRAMES_PER_MAP = 50
+MAP_COUNT = 15
+
+FILE_NAME_TEMPLATE = "pcr-{:04}.syx"
+_FILE_NAME_RE = re.compile(r"^pcr-(\d{4})\.syx$", re.IGNORECASE)
+# Model ID and DT1 command of a control map frame
+_FRAME_HEADER = bytes([0x00, 0x00, 0x1A, 0x12])
+
+
+def calc_check_sum(data):
+    """
+    Compute the Roland checksum of a control map frame
+    :param data: Frame bytes (bytes, bytearray, memoryview or list)
+    :return: The checksum value for sx[139]
+    """
+    return -sum(data[CHECKSUM_START:CHECKSUM_OFFSET]) & 0x7F
+
+
+def is_control_map_frame(data):
+    """
+    True if a sysex message is a PCR control map frame: a Roland data set
+    (DT1) message for model 00 00 1A of the control map length
+    :param data: Message bytes
+    """
+    return len(data) == CONTROL_MAP_LEN and data[1] == 0x41 and bytes(data[3:7]) == _FRAME_HEADER
+
+
+def validate_check_sum(data):
+    """
+    The sum of all data bytes AND the checksum byte should be 0.
+    :param data: Frame bytes
+    :return: True if the checksum is valid
+    """
+    return len(data) == CONTROL_MAP_LEN and \
+        sum(data[CHECKSUM_START:CHECKSUM_OFFSET + 1]) & 0x7F == 0
+
+
+def file_index(map_number, frame_number):
+    """
+    File number of a frame
+    :param map_number: Control map 1-15
+    :param frame_number: Frame within the map 1-50
+    :return: File number, e.g. 101 for map 2 frame 1
+    """
+    return (map_number - 1) * 100 + frame_number
+
+
+def map_frame_from_index(index):
+    """
+    Inverse of file_index()
+    :param index: File number
+    :return: (map_number, frame_number)
+    """
+    return index // 100 + 1, index % 100
+
+
+def frame_file_name(map_number, frame_number):
+    return FILE_NAME_TEMPLATE.format(file_index(map_number, frame_number))
+
+
+def map_frame_from_path(path):
+    """
+    Work out the map and frame from a control map file name
+    :param path: Path of a .syx file
+    :return: (map_number, frame_number) or None if the name is not pcr-NNNN.syx
+    """
+    m = _FILE_NAME_RE.match(os.path.basename(path))
+    if m is None:
+        return None
+    map_number, frame_number = map_frame_from_index(int(m.group(1)))
+    if not 1 <= frame_number <= FRAMES_PER_MAP:
+        return None
+    return map_number, frame_number
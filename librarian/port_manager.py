@@ -0,0 +1,157 @@
+# coding: utf-8
+#
+# port_manager - MIDI port enumeration and hot-plug watcher
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import threading
+import rtmidi
+from rtmidi.midiutil import get_api_from_environment
+from event_log import event_log
+
+
+class MidiPortManager():
+    """
+    Keeps one MidiIn and one MidiOut instance for enumerating ports
+    and optionally watches for ports coming and going.
+    Listeners are called with (in_ports, out_ports) whenever either
+    list changes. Listeners are called on the watcher thread.
+    """
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, api=None, poll_interval=POLL_INTERVAL):
+        """
+        Create a port manager
+        :param api: rtmidi API. Default comes from the environment.
+        :param poll_interval: Seconds between hot-plug checks
+        """
+        if api is None:
+            api = get_api_from_environment()
+        self._lock = threading.Lock()
+        self._midiin = rtmidi.MidiIn(api)
+        self._midiout = rtmidi.MidiOut(api)
+        self._poll_interval = poll_interval
+        self._in_ports = None
+        self._out_ports = None
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def watching(self):
+        return self._thread is not None
+
+    def in_ports(self):
+        """
+        Return the MIDI in port names. Cached while the watcher runs.
+        :return: List of port names
+        """
+        if not self.watching or self._in_ports is None:
+            self.refresh()
+        return list(self._in_ports)
+
+    def out_ports(self):
+        """
+        Return the MIDI out port names. Cached while the watcher runs.
+        :return: List of port names
+        """
+        if not self.watching or self._out_ports is None:
+            self.refresh()
+        return list(self._out_ports)
+
+    def refresh(self):
+        """
+        Re-read the port lists and notify listeners if they changed
+        :return: True if either list changed
+        """
+        with self._lock:
+            in_ports = self._midiin.get_ports()
+            out_ports = self._midiout.get_ports()
+            changed = in_ports != self._in_ports or out_ports != self._out_ports
+            self._in_ports = in_ports
+            self._out_ports = out_ports
+            listeners = list(self._listeners)
+
+        if changed:
+            for listener in listeners:
+                try:
+                    listener(list(in_ports), list(out_ports))
+                except Exception as ex:
+                    event_log.error("MidiPortManager", ex)
+        return changed
+
+    def subscribe(self, listener):
+        """
+        Add a port change listener. If the ports are already known the
+        listener is called right away with the current lists.
+        :param listener: Callable taking (in_ports, out_ports)
+        :return: None
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            known = self._in_ports is not None
+            in_ports = list(self._in_ports or [])
+            out_ports = list(self._out_ports or [])
+        if known:
+            listener(in_ports, out_ports)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def start(self):
+        """
+        Start watching for port changes
+        :return: None
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="midi_port_watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as ex:
+                event_log.error("MidiPortManager", ex)
+            if self._stop.wait(self._poll_interval):
+                break
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_port_manager(api=None):
+    """
+    Return the shared port manager for an rtmidi API
+    :param api: rtmidi API. Default comes from the environment.
+    :return: MidiPortManager instance
+    """
+    if api is None:
+        api = get_api_from_environment()
+    with _managers_lock:
+        if api not in _managers:
+            _managers[api] = MidiPortManager(api)
+        return _managers[api]
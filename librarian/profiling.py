@@ -0,0 +1,143 @@
+# coding: utf-8
+#
+# profiling - optional session profiling for the app and tools
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# Profiling is turned on with a --profile [PATH] option or the
+# PCR_PROFILE environment variable (1 or a .pstats path). Setting
+# PCR_PROFILER=sampling uses pyinstrument when it is installed.
+#
+
+
+import cProfile
+import importlib.util
+import io
+import os
+import pstats
+import time
+
+
+PROFILE_ENV = "PCR_PROFILE"
+PROFILER_ENV = "PCR_PROFILER"
+TOP_FUNCTIONS = 30
+
+# Builtins whose own time is the Tk event loop waiting for something to do
+_TK_LOOP_FUNCTIONS = ("<method 'mainloop' of '_tkinter.tkapp' objects>",
+                      "<method 'dooneevent' of '_tkinter.tkapp' objects>")
+# Tk calls made from these tkinter functions block in tkwait
+_TK_WAIT_CALLERS = ("wait_window", "wait_variable", "wait_visibility")
+_SLEEP_FUNCTIONS = ("<built-in method time.sleep>",)
+
+
+def resolve_profile_path(option, name):
+    """
+    Work out where profile output should go
+    :param option: Value of the --profile option. None if not given,
+    "" if given without a path.
+    :param name: Base name used for a default output file
+    :return: Path of the .pstats file or None if profiling is off
+    """
+    if option is None:
+        option = os.environ.get(PROFILE_ENV)
+        if option is None or option in ("", "0"):
+            return None
+        if option == "1":
+            option = ""
+    if not option:
+        option = "{}-{}.pstats".format(name, time.strftime("%Y%m%dT%H%M%S"))
+    return option
+
+
+def run_profiled(profile_path, func, *args, **kwargs):
+    """
+    Run a function, under a profiler if a profile path is given
+    :param profile_path: Path of the .pstats output or None
+    :param func: Function to be run
+    :return: Whatever func returns
+    """
+    if not profile_path:
+        return func(*args, **kwargs)
+
+    if os.environ.get(PROFILER_ENV) == "sampling" and importlib.util.find_spec("pyinstrument"):
+        return _run_sampled(profile_path, func, *args, **kwargs)
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(profile_path)
+        _write_summary(profile_path, pstats.Stats(profiler))
+
+
+def _run_sampled(profile_path, func, *args, **kwargs):
+    from pyinstrument import Profiler
+
+    profiler = Profiler()
+    profiler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        session = profiler.stop()
+        try:
+            from pyinstrument.renderers import PstatsRenderer
+            with open(profile_path, "wb") as fh:
+                fh.write(PstatsRenderer().render(session).encode("latin-1"))
+        except ImportError:
+            pass
+        with open(_summary_path(profile_path), "w") as fh:
+            fh.write(profiler.output_text(unicode=True))
+
+
+def _summary_path(profile_path):
+    return os.path.splitext(profile_path)[0] + ".txt"
+
+
+def time_breakdown(stats):
+    """
+    Split total run time into sleeping, Tk idle and everything else
+    :param stats: pstats.Stats instance
+    :return: (total, sleep, tk_idle) in seconds
+    """
+    sleep = 0.0
+    tk_idle = 0.0
+    for (filename, lineno, funcname), (cc, nc, tt, ct, callers) in stats.stats.items():
+        if funcname in _SLEEP_FUNCTIONS:
+            sleep += tt
+        elif funcname in _TK_LOOP_FUNCTIONS:
+            tk_idle += tt
+        elif funcname == "<method 'call' of '_tkinter.tkapp' objects>":
+            for caller, caller_stats in callers.items():
+                if caller[2] in _TK_WAIT_CALLERS:
+                    tk_idle += caller_stats[2]
+    return stats.total_tt, sleep, tk_idle
+
+
+def _write_summary(profile_path, stats):
+    total, sleep, tk_idle = time_breakdown(stats)
+    out = io.StringIO()
+    out.write("Profile: {}\n".format(profile_path))
+    out.write("Total time:   {:10.3f} s\n".format(total))
+    out.write("Sleeping:     {:10.3f} s\n".format(sleep))
+    out.write("Tk idle:      {:10.3f} s\n".format(tk_idle))
+    out.write("Actual work:  {:10.3f} s\n\n".format(max(total - sleep - tk_idle, 0.0)))
+
+    stats.stream = out
+    out.write("Top {} functions by own time\n".format(TOP_FUNCTIONS))
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+    out.write("Top {} functions by cumulative time\n".format(TOP_FUNCTIONS))
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+    with open(_summary_path(profile_path), "w") as fh:
+        fh.write(out.getvalue())
@@ -20,6 +20,9 @@
 from tkinter import *
 from modal_dlg import ModalDlg
 from sysex_receiver import SysexReceiverPolled
+from event_log import event_log
+from transfer_progress import TransferProgress, ProgressView
+import transfer_engine
 
 
 class ReceiveDlg(ModalDlg):
@@ -28,8 +31,8 @@ class ReceiveDlg(ModalDlg):
     """
     POLLING_INTERVAL = 100
     # There are 50 sysex messages for each control map and there are 15 control maps.
-    SINGLE = 50
-    ALL = 750
+    SINGLE = transfer_engine.SINGLE
+    ALL = transfer_engine.ALL
 
     def __init__(self, parent, title=None, port=0, dir=None, control_map=SINGLE):
         """
@@ -44,11 +47,15 @@ class ReceiveDlg(ModalDlg):
         self._port = port
         self._dir = dir
         self._control_map = control_map
+        self._progress = TransferProgress(control_map)
 
         super(ReceiveDlg, self).__init__(parent, title=title)
 
         # Hook up SysexReceiver
-        self._receiver = SysexReceiverPolled(self._port, self._dir)
+        self._transfer = event_log.begin_transfer("Receive from port {}".format(self._port))
+        self._receiver = SysexReceiverPolled(self._port, self._dir, transfer=self._transfer,
+                                             progress=self._progress)
+        self._progress_view.start()
 
         # Poll for number of sysex messages received
         self._after_id = self.after(self.POLLING_INTERVAL, func=self.midiin_poll)
@@ -69,6 +76,9 @@ class ReceiveDlg(ModalDlg):
             text = "Start all control maps bulk transfer at PCR"
         self._lbl_receive = Label(master, text=text, width=50)
         self._lbl_receive.pack()
+        # Redrawn at a fixed frame rate while receiving
+        self._progress_view = ProgressView(master, self._progress, length=400)
+        self._progress_view.pack()
 
     def buttonbox(self):
         """
@@ -89,14 +99,15 @@ class ReceiveDlg(ModalDlg):
 
         received = self._receiver.poll()
         if received == self._control_map:
+            self._progress.finish()
+            self._progress_view.redraw()
             self._lbl_receive.config(text="Receive complete")
             self.btn_ok.config(state=NORMAL)
             self.btn_ok.config(default=ACTIVE)
             self.btn_cancel.config(default=DISABLED)
             self._after_id = None
         else:
-            if received > 0:
-                self._lbl_receive.config(text="{} of {} sysex messages".format(received, self._control_map))
+            # Progress is drawn by the progress view.
             # Only schedule polling if there is something left to receive
             self._after_id = self.after(ReceiveDlg.POLLING_INTERVAL, func=self.midiin_poll)
 
@@ -108,6 +119,8 @@ class ReceiveDlg(ModalDlg):
         # Delete midiin instance
         if self._after_id is not None:
             self.after_cancel(self._after_id)
+        self._progress_view.stop()
         self._receiver.close()
         del self._receiver
+        event_log.end_transfer(self._transfer)
         super(ReceiveDlg, self).dlg_destroy()
\ No newline at end of file
@@ -20,14 +20,16 @@
 from tkinter import *
 import os
 from modal_dlg import ModalDlg
-from pcr_midi_util import open_midiout, send_sysex_file
+from pcr_midi_util import open_midiout
+import transfer_engine
+from transfer_progress import TransferProgress, ProgressView
 
 
 class SendDlg(ModalDlg):
     """
     Customized modal dialog box for receiving sysex messages
     """
-    PACING_DELAY = 50
+    PACING_DELAY = transfer_engine.FILE_DELAY
 
     def __init__(self, parent, title=None, port=0, files=[]):
         """
@@ -41,11 +43,7 @@ class SendDlg(ModalDlg):
         self._port = port
         self._files = files
         self._after_id = None
-
-        # Determine length of longest file name
-        self._file_name_length = 0
-        for f in self._files:
-            self._file_name_length = max(self._file_name_length, len(f))
+        self._progress = TransferProgress(len(files))
 
         super(SendDlg, self).__init__(parent, title=title)
 
@@ -64,8 +62,9 @@ class SendDlg(ModalDlg):
         # This label will morph into the status for sending files
         self._lbl_send = Label(master, text="Put PCR into bulk receive mode. Click Send when ready.")
         self._lbl_send.pack()
-        self._lbl_sending_file = Label(master=master, text="", width=self._file_name_length)
-        self._lbl_sending_file.pack()
+        # Redrawn at a fixed frame rate while sending
+        self._progress_view = ProgressView(master, self._progress, length=400, show_current=True)
+        self._progress_view.pack()
 
     def buttonbox(self):
         """
@@ -94,27 +93,31 @@ class SendDlg(ModalDlg):
         self._btn_ok.config(state=NORMAL)
         self._btn_ok.config(default=ACTIVE)
 
+        self._lbl_send.config(text="Sending {} control map sysex files".format(len(self._files)))
         self._midiout = open_midiout(self._port)
         self._file_index = 0
+        self._progress.start(len(self._files))
+        self._progress_view.start()
         self._send_with_pacing()
 
 
     def _send_with_pacing(self):
         """
-        Poll for updates to number of sysex messages received
+        Send the next file and schedule the one after it. The progress
+        view picks up the counters on its own schedule.
         :return:
         """
-        # Update status display
-        self._lbl_send.config(text="Sending {} of {} control map sysex files".format(self._file_index + 1, len(self._files)))
-        self._lbl_send.update()
-        self._lbl_sending_file.config(text=self._files[self._file_index], width=100)
-        self._lbl_sending_file.update()
-
+        self._after_id = None
         if self._file_index < len(self._files):
-            send_sysex_file(self._files[self._file_index], self._midiout)
+            transfer_engine.send_file(self._files[self._file_index], self._midiout, self._progress)
             self._file_index += 1
             if self._file_index < len(self._files):
                 self._after_id = self.after(SendDlg.PACING_DELAY, func=self._send_with_pacing)
+                return
+
+        self._progress.finish()
+        self._progress_view.redraw()
+        self._lbl_send.config(text="Send complete")
 
     def dlg_destroy(self):
         """
@@ -124,6 +127,7 @@ class SendDlg(ModalDlg):
         # Delete midiin instance
         if self._after_id is not None:
             self.after_cancel(self._after_id)
+        self._progress_view.stop()
         # self._receiver.close()
         # del self._receiver
         super(SendDlg, self).dlg_destroy()
\ No newline at end of file
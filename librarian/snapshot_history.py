@@ -0,0 +1,252 @@
+# coding: utf-8
+#
+# snapshot_history - versioned, delta compressed history of received banks
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# Each device has a directory in the history store:
+#
+#   history/<device>/index.json     list of snapshots
+#   history/<device>/000001.snap    keyframe (all frames)
+#   history/<device>/000002.snap    delta against snapshot 1
+#
+# A delta stores each frame XORed with the same frame of the previous
+# snapshot. Unchanged frames XOR to zeros, which zlib squeezes to next
+# to nothing. Every KEYFRAME_INTERVAL snapshots a full keyframe is
+# written, so rebuilding any version applies at most that many deltas.
+#
+# Snapshot file (zlib compressed):
+#   "PCRS" version(1) kind(K|D) count(u32)
+#   count * [name_len(u16) name op(F|X|R) data_len(u32) data]
+#
+
+import json
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from os.path import basename, isdir, join
+
+
+KEYFRAME_INTERVAL = 30
+
+_MAGIC = b"PCRS"
+_VERSION = 1
+_KEYFRAME = b"K"
+_DELTA = b"D"
+_FULL = b"F"
+_XOR = b"X"
+_REMOVED = b"R"
+_INDEX = "index.json"
+
+
+class HistoryError(Exception):
+    pass
+
+
+def device_key(name):
+    """
+    Turn a port or device name into a history directory name
+    :param name: Port or device name
+    :return: File system safe key
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "device"
+
+
+def read_bank(directory):
+    """
+    Read the .syx files of a bank directory
+    :param directory: Bank directory
+    :return: Dict of file name to frame bytes
+    """
+    frames = {}
+    for fn in os.listdir(directory):
+        if fn.lower().endswith(".syx"):
+            with open(join(directory, fn), "rb") as fh:
+                frames[fn] = fh.read()
+    return frames
+
+
+def _xor(a, b):
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(len(a), "big")
+
+
+def _encode(kind, entries):
+    parts = [_MAGIC, struct.pack(">Bc I", _VERSION, kind, len(entries))]
+    for name, op, data in entries:
+        encoded = name.encode("utf-8")
+        parts.append(struct.pack(">H", len(encoded)))
+        parts.append(encoded)
+        parts.append(struct.pack(">cI", op, len(data)))
+        parts.append(data)
+    return zlib.compress(b"".join(parts), 9)
+
+
+def _decode(blob):
+    data = zlib.decompress(blob)
+    if data[:4] != _MAGIC:
+        raise HistoryError("Not a snapshot file")
+    version, kind, count = struct.unpack_from(">Bc I", data, 4)
+    if version != _VERSION:
+        raise HistoryError("Unsupported snapshot version {}".format(version))
+    pos = 4 + struct.calcsize(">Bc I")
+    entries = []
+    for i in range(count):
+        (name_len,) = struct.unpack_from(">H", data, pos)
+        pos += 2
+        name = data[pos:pos + name_len].decode("utf-8")
+        pos += name_len
+        op, data_len = struct.unpack_from(">cI", data, pos)
+        pos += 5
+        entries.append((name, op, data[pos:pos + data_len]))
+        pos += data_len
+    return kind, entries
+
+
+class HistoryStore():
+    """
+    Snapshot history of the banks received from each device
+    """
+    def __init__(self, root, keyframe_interval=KEYFRAME_INTERVAL):
+        """
+        Open a history store
+        :param root: Store directory, created when needed
+        :param keyframe_interval: Snapshots between keyframes
+        """
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+        # Last rebuilt version per device, which is usually the base of the next delta
+        self._cache = {}
+
+    def devices(self):
+        if not isdir(self.root):
+            return []
+        return sorted([e.name for e in os.scandir(self.root) if e.is_dir()])
+
+    def snapshots(self, device):
+        """
+        Snapshots of a device, oldest first
+        :param device: Device key
+        :return: List of dicts with seq, created, label, keyframe, frames and size
+        """
+        path = join(self.root, device, _INDEX)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as fh:
+            return json.load(fh)
+
+    def add(self, device, frames, label=""):
+        """
+        Add a snapshot
+        :param device: Device key
+        :param frames: Dict of file name to frame bytes
+        :param label: Free text description
+        :return: Sequence number of the new snapshot
+        """
+        with self._lock:
+            index = self.snapshots(device)
+            seq = index[-1]["seq"] + 1 if index else 1
+            keyframe = not index or len(index) % self.keyframe_interval == 0
+            if keyframe:
+                entries = [(name, _FULL, frames[name]) for name in sorted(frames)]
+            else:
+                previous = self._get(device, index, index[-1]["seq"])
+                entries = []
+                for name in sorted(frames):
+                    old = previous.get(name)
+                    if old is not None and len(old) == len(frames[name]):
+                        entries.append((name, _XOR, _xor(old, frames[name])))
+                    else:
+                        entries.append((name, _FULL, frames[name]))
+                entries.extend([(name, _REMOVED, b"") for name in sorted(set(previous) - set(frames))])
+
+            blob = _encode(_KEYFRAME if keyframe else _DELTA, entries)
+            device_dir = join(self.root, device)
+            os.makedirs(device_dir, exist_ok=True)
+            with open(join(device_dir, "{:06}.snap".format(seq)), "wb") as fh:
+                fh.write(blob)
+            index.append({"seq": seq, "created": time.time(), "label": label, "keyframe": keyframe,
+                          "frames": len(frames), "size": len(blob)})
+            tmp = join(device_dir, _INDEX + ".tmp")
+            with open(tmp, "w") as fh:
+                json.dump(index, fh, indent=1)
+            os.replace(tmp, join(device_dir, _INDEX))
+            self._cache[device] = (seq, dict(frames))
+            return seq
+
+    def add_directory(self, device, directory, label=""):
+        return self.add(device, read_bank(directory), label)
+
+    def latest(self, device):
+        index = self.snapshots(device)
+        return index[-1]["seq"] if index else None
+
+    def get(self, device, seq=None):
+        """
+        Rebuild a snapshot from the nearest keyframe
+        :param device: Device key
+        :param seq: Sequence number, default is the latest
+        :return: Dict of file name to frame bytes
+        """
+        with self._lock:
+            index = self.snapshots(device)
+            if not index:
+                raise HistoryError("No history for '{}'".format(device))
+            return dict(self._get(device, index, seq or index[-1]["seq"]))
+
+    def _get(self, device, index, seq):
+        cached = self._cache.get(device)
+        if cached is not None and cached[0] == seq:
+            return cached[1]
+        seqs = [entry["seq"] for entry in index]
+        if seq not in seqs:
+            raise HistoryError("No snapshot {} for '{}'".format(seq, device))
+        pos = seqs.index(seq)
+        start = pos
+        while not index[start]["keyframe"]:
+            start -= 1
+
+        frames = {}
+        for entry in index[start:pos + 1]:
+            with open(join(self.root, device, "{:06}.snap".format(entry["seq"])), "rb") as fh:
+                kind, entries = _decode(fh.read())
+            if kind == _KEYFRAME:
+                frames = {}
+            for name, op, data in entries:
+                if op == _FULL:
+                    frames[name] = data
+                elif op == _XOR:
+                    frames[name] = _xor(frames[name], data)
+                else:
+                    frames.pop(name, None)
+        self._cache[device] = (seq, frames)
+        return frames
+
+    def export(self, device, seq, directory):
+        """
+        Write a snapshot out as a bank directory
+        :param device: Device key
+        :param seq: Sequence number, None for the latest
+        :param directory: Target directory
+        :return: Number of files written
+        """
+        frames = self.get(device, seq)
+        os.makedirs(directory, exist_ok=True)
+        for name, data in frames.items():
+            with open(join(directory, basename(name)), "wb") as fh:
+                fh.write(data)
+        return len(frames)
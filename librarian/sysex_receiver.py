@@ -19,8 +19,10 @@
 
 from os.path import exists, isdir, join
 import os
-from rtmidi.midiutil import open_midiinput
-from rtmidi.midiconstants import SYSTEM_EXCLUSIVE
+from pcr_midi_util import open_midiin
+from event_log import event_log
+from pcr_sysex import is_control_map_frame
+from sysex_stream import SysexStreamParser
 
 
 class SysexReceiverPolled():
@@ -28,14 +30,32 @@ class SysexReceiverPolled():
 
     FN_TMPL = "pcr-{:04}.syx"
 
-    def __init__(self, port, directory, debug=False, overwrite=True):
+    def __init__(self, port, directory, debug=False, overwrite=True, transfer=None, progress=None, on_frame=None,
+                 recorder=None):
+        """
+        Open a MIDI in port for receiving control map frames
+        :param port: MIDI in port number
+        :param directory: Directory for the frame files
+        :param on_frame: Optional callable (file_index, data). When given,
+        frames are handed to it instead of being written to files.
+        :param recorder: Optional capture_log.CaptureRecorder that records
+        every input event with its time
+        """
         self._directory = directory
+        self._on_frame = on_frame
+        self._recorder = recorder
         self._debug = debug
         self._overwrite = overwrite
+        self._transfer = transfer
+        self._progress = progress
         self._fn_index = 1
         self.sysex_count = 0
+        # Other sysex (e.g. an Identity Reply) is not numbered as a frame
+        self.ignored_count = 0
+        # Reassembles sysex delivered in pieces and drops realtime bytes
+        self._parser = SysexStreamParser()
 
-        self._midiin, name = open_midiinput(port)
+        self._midiin = open_midiin(port)
         self._midiin.ignore_types(sysex=False)
 
     @property
@@ -57,22 +77,34 @@ class SysexReceiverPolled():
         """
         try:
             sysex, deltatime = event
-            if sysex[:1] != [SYSTEM_EXCLUSIVE]:
-                return
+            if self._recorder is not None:
+                self._recorder.record(sysex, deltatime)
+            for frame in self._parser.feed(bytes(sysex)):
+                if is_control_map_frame(frame):
+                    self._save_frame(bytes(frame))
+                else:
+                    self.ignored_count += 1
+                    event_log.warning(self.__class__.__name__, "Ignored a {} byte sysex message that is not "
+                                      "a control map frame".format(len(frame)), self._transfer)
+        except Exception as ex:
+            # Keep the receive path cheap, the event log does the reporting
+            event_log.error(self.__class__.__name__, ex, self._transfer)
 
-            outfn = join(self._directory, SysexReceiverPolled.FN_TMPL.format(self._fn_index))
-            self._next_filename_index()
+    def _save_frame(self, sx_data):
+        index = self._fn_index
+        self._next_filename_index()
 
+        if self._on_frame is not None:
+            self._on_frame(index, sx_data)
+        else:
+            outfn = join(self._directory, SysexReceiverPolled.FN_TMPL.format(index))
             if self._overwrite and exists(outfn):
                 os.remove(outfn)
-
-            sx_data = bytes(sysex)
             with open(outfn, 'wb') as outfile:
                 outfile.write(sx_data)
-            self.sysex_count += 1
-        except Exception as ex:
-            print(ex)
-            # pass
+        self.sysex_count += 1
+        if self._progress is not None:
+            self._progress.advance(1, len(sx_data))
 
     def _next_filename_index(self):
         """
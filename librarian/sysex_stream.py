@@ -0,0 +1,170 @@
+# coding: utf-8
+#
+# sysex_stream - split a byte stream into sysex messages
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# The parser takes bytes in chunks of any size (file reads, mmaps, MIDI
+# input events) and returns the complete F0 ... F7 messages found so far.
+# A message split across chunks is kept until its F7 arrives.
+#
+#   - Bytes outside a message are skipped.
+#   - Realtime bytes (F8-FF) may appear inside a message and are dropped.
+#   - Any other status byte ends a message without its F7. The message is
+#     discarded; an F0 starts the next one.
+#
+# A message that lies whole within one chunk with nothing to drop is
+# returned as a memoryview of the chunk, without copying. Only the tail of
+# a chunk holding the start of a split message is copied, so a file of any
+# size streams in memory bounded by the chunk size and the longest message.
+#
+
+import re
+
+
+SYSTEM_EXCLUSIVE = 0xF0
+END_OF_EXCLUSIVE = 0xF7
+REALTIME = 0xF8
+
+# Longest message kept, longer ones are discarded
+MAX_MESSAGE_LENGTH = 1 << 20
+CHUNK_SIZE = 64 * 1024
+
+_START = re.compile(b"\xF0")
+_CLEAN_MESSAGE = re.compile(b"\xF0[\x00-\x7F]*\xF7")
+_STATUS = re.compile(b"[\x80-\xFF]")
+
+
+class SysexStreamParser():
+    """
+    Incremental sysex message splitter
+    """
+    def __init__(self, max_length=MAX_MESSAGE_LENGTH):
+        """
+        :param max_length: Longest message to keep
+        """
+        self._max_length = max_length
+        self._partial = None
+        self.skipped = 0
+        self.discarded = 0
+
+    @property
+    def pending(self):
+        """
+        True while a message has started but not ended
+        """
+        return self._partial is not None
+
+    def reset(self):
+        if self._partial is not None:
+            self.discarded += 1
+        self._partial = None
+
+    def feed(self, chunk):
+        """
+        Parse the next chunk of the stream
+        :param chunk: bytes, bytearray, mmap or anything else supporting the
+        buffer protocol. It must not change while the returned views are used.
+        :return: List of complete messages as memoryviews
+        """
+        messages = []
+        view = memoryview(chunk)
+        end = len(view)
+        pos = 0
+        if self._partial is not None:
+            pos = self._continue(chunk, view, 0, messages)
+        while pos < end:
+            match = _START.search(chunk, pos)
+            if match is None:
+                self.skipped += end - pos
+                break
+            start = match.start()
+            self.skipped += start - pos
+            match = _CLEAN_MESSAGE.match(chunk, start)
+            if match is not None:
+                pos = match.end()
+                if pos - start <= self._max_length:
+                    messages.append(view[start:pos])
+                else:
+                    self.discarded += 1
+                continue
+            self._partial = bytearray(b"\xF0")
+            pos = self._continue(chunk, view, start + 1, messages)
+        return messages
+
+    def _continue(self, chunk, view, pos, messages):
+        """
+        Add to the partial message until it ends or the chunk runs out
+        :return: Position after the bytes used
+        """
+        end = len(view)
+        while pos < end:
+            match = _STATUS.search(chunk, pos)
+            stop = match.start() if match is not None else end
+            self._partial += view[pos:stop]
+            if len(self._partial) >= self._max_length:
+                # No room left for the F7, the message is too long to keep.
+                # Drop it and look for the next message.
+                self._partial = None
+                self.discarded += 1
+                return stop
+            if match is None:
+                return end
+            status = view[stop]
+            if status >= REALTIME:
+                pos = stop + 1
+                continue
+            if status == END_OF_EXCLUSIVE:
+                self._partial.append(status)
+                messages.append(memoryview(self._partial))
+                self._partial = None
+                return stop + 1
+            # Another status byte cuts the message short
+            self._partial = None
+            self.discarded += 1
+            return stop
+        return end
+
+
+def iter_messages(data):
+    """
+    The sysex messages of one buffer
+    :param data: bytes, bytearray or mmap
+    :return: Generator of memoryviews
+    """
+    parser = SysexStreamParser()
+    for message in parser.feed(data):
+        yield message
+
+
+def iter_file_messages(fh, chunk_size=CHUNK_SIZE, parser=None):
+    """
+    Stream the sysex messages of a file
+    :param fh: File name or binary file object
+    :param chunk_size: Bytes read at a time
+    :param parser: Optional SysexStreamParser, e.g. to look at its counters
+    :return: Generator of memoryviews
+    """
+    if isinstance(fh, str):
+        with open(fh, "rb") as f:
+            for message in iter_file_messages(f, chunk_size, parser):
+                yield message
+        return
+    parser = parser or SysexStreamParser()
+    while True:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            break
+        for message in parser.feed(chunk):
+            yield message
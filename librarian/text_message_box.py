@@ -20,8 +20,6 @@ import os
 import tkinter
 from tkinter import Text, Scrollbar, Button, Frame, Label
 from tkinter import font as tkfont
-import PIL.Image
-import PIL.ImageTk
 
 class TextMessageBox(tkinter.Toplevel):
     """
@@ -69,6 +67,8 @@ class TextMessageBox(tkinter.Toplevel):
         # Logo image, if one is supplied
         self._image = None
         if image and os.path.exists(image):
+            # PIL is only needed for the image, so don't pay for loading it up front
+            import PIL.ImageTk
             self._image = PIL.ImageTk.PhotoImage(file=image)
 
         # For vertical we stack the text, close button and image is separate rows.
@@ -0,0 +1,230 @@
+# coding: utf-8
+#
+# transfer_engine - backup, restore, verify and diff of control map banks
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# This is the transfer logic shared by the GUI dialogs and the
+# command line interface. rtmidi is only loaded by the functions
+# that talk to MIDI ports.
+#
+
+
+import os
+import time
+from os.path import basename, join
+from pcr_sysex import CONTROL_MAP_LEN, FRAMES_PER_MAP, MAP_COUNT, validate_check_sum
+
+
+# Number of sysex frames in a single control map and in all control maps
+SINGLE = FRAMES_PER_MAP
+ALL = FRAMES_PER_MAP * MAP_COUNT
+
+# Pacing delay between sysex messages within a file (ms)
+MESSAGE_DELAY = 50
+# Pacing delay between files (ms)
+FILE_DELAY = 50
+# How often a receive polls the MIDI in port (seconds)
+POLL_INTERVAL = 0.05
+
+
+class TransferError(Exception):
+    pass
+
+
+class TransferTimeout(TransferError):
+    pass
+
+
+class TransferCancelled(TransferError):
+    pass
+
+
+def list_syx_files(directory):
+    """
+    Return the .syx files of a directory in send order
+    :param directory: Directory path
+    :return: Sorted list of file paths
+    """
+    return sorted([join(directory, fn) for fn in os.listdir(directory)
+                   if fn.lower().endswith('.syx')])
+
+
+def resolve_port(spec, names):
+    """
+    Find a MIDI port by number or by (part of) its name
+    :param spec: Port number (int or digits) or name substring
+    :param names: Port names as returned by get_midiin_ports/get_midiout_ports
+    :return: Port number
+    """
+    if isinstance(spec, int) or str(spec).isdigit():
+        port = int(spec)
+        if 0 <= port < len(names):
+            return port
+        raise TransferError("No MIDI port number {}".format(port))
+    for port, name in enumerate(names):
+        if str(spec).lower() in name.lower():
+            return port
+    raise TransferError("No MIDI port named '{}'".format(spec))
+
+
+def send_file(filename, midiout, progress=None, delay=MESSAGE_DELAY):
+    """
+    Send one .syx file and record it in the progress counters
+    :param filename: The .syx file
+    :param midiout: Open MIDI out port
+    :param progress: Optional TransferProgress
+    :param delay: Pacing delay between messages in ms
+    :return: True if the file contained sysex data
+    """
+    from pcr_midi_util import send_sysex_file
+
+    success = send_sysex_file(filename, midiout, delay)
+    if progress is not None:
+        progress.advance(1, os.path.getsize(filename), current=filename)
+    return success
+
+
+def send_files(files, port, progress=None, cancel=None, delay=MESSAGE_DELAY, file_delay=FILE_DELAY):
+    """
+    Send a list of .syx files to a MIDI out port
+    :param files: Files in send order
+    :param port: MIDI out port number
+    :param progress: Optional TransferProgress
+    :param cancel: Optional threading.Event that stops the transfer
+    :param delay: Pacing delay between messages in ms
+    :param file_delay: Pacing delay between files in ms
+    :return: Number of files sent
+    """
+    from pcr_midi_util import open_midiout
+
+    if progress is not None:
+        progress.start(len(files))
+    midiout = open_midiout(port)
+    try:
+        for i, filename in enumerate(files):
+            if cancel is not None and cancel.is_set():
+                raise TransferCancelled("Send canceled after {} files".format(i))
+            if not send_file(filename, midiout, progress, delay):
+                raise TransferError("File '{}' does not start with a sysex message".format(basename(filename)))
+            if file_delay > 0:
+                time.sleep(0.001 * file_delay)
+    finally:
+        midiout.close_port()
+        if progress is not None:
+            progress.finish()
+    return len(files)
+
+
+def clean_directory(directory):
+    """
+    Delete the .syx files of a directory ahead of a receive
+    :param directory: Directory path
+    :return: Number of files deleted
+    """
+    files = list_syx_files(directory)
+    for f in files:
+        os.remove(f)
+    return len(files)
+
+
+def receive_frames(port, directory, expected=ALL, wait=60.0, idle_timeout=5.0,
+                   progress=None, cancel=None, transfer=None, on_frame=None, recorder=None):
+    """
+    Receive control map frames into a directory, one file per frame
+    :param port: MIDI in port number
+    :param directory: Target directory
+    :param expected: Number of frames expected, SINGLE or ALL
+    :param wait: Seconds to wait for the first frame
+    :param idle_timeout: Seconds to wait for each following frame
+    :param progress: Optional TransferProgress
+    :param cancel: Optional threading.Event that stops the transfer
+    :param transfer: Optional event log transfer id
+    :param on_frame: Optional callable (file_index, data) that takes the
+    frames instead of writing them to the directory
+    :param recorder: Optional capture_log.CaptureRecorder for the input events
+    :return: Number of frames received
+    """
+    from sysex_receiver import SysexReceiverPolled
+
+    if progress is not None:
+        progress.start(expected)
+    receiver = SysexReceiverPolled(port, directory, transfer=transfer, progress=progress, on_frame=on_frame,
+                                   recorder=recorder)
+    try:
+        received = 0
+        last_frame = time.monotonic()
+        while received < expected:
+            if cancel is not None and cancel.is_set():
+                raise TransferCancelled("Receive canceled after {} of {} frames".format(received, expected))
+            count = receiver.poll()
+            now = time.monotonic()
+            if count != received:
+                received = count
+                last_frame = now
+            elif now - last_frame > (idle_timeout if received else wait):
+                raise TransferTimeout("Received {} of {} frames".format(received, expected))
+            else:
+                time.sleep(POLL_INTERVAL)
+    finally:
+        receiver.close()
+        if progress is not None:
+            progress.finish()
+    return received
+
+
+def verify_files(files):
+    """
+    Check that each file holds one well formed control map frame
+    :param files: Paths of .syx files
+    :return: List of (path, problem) for the files that failed
+    """
+    problems = []
+    for path in files:
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read(CONTROL_MAP_LEN + 1)
+        except OSError as ex:
+            problems.append((path, ex.strerror))
+            continue
+        if len(data) != CONTROL_MAP_LEN:
+            problems.append((path, "wrong length {}".format(len(data))))
+        elif data[0] != 0xF0 or data[-1] != 0xF7:
+            problems.append((path, "not a sysex message"))
+        elif not validate_check_sum(data):
+            problems.append((path, "checksum error"))
+    return problems
+
+
+def diff_directories(dir_a, dir_b):
+    """
+    Compare two banks frame by frame (by file name)
+    :param dir_a: First bank directory
+    :param dir_b: Second bank directory
+    :return: List of (name, status) where status is "changed",
+    "only in a" or "only in b". Empty if the banks are identical.
+    """
+    names_a = {basename(f) for f in list_syx_files(dir_a)}
+    names_b = {basename(f) for f in list_syx_files(dir_b)}
+    differences = []
+    for name in sorted(names_a | names_b):
+        if name not in names_b:
+            differences.append((name, "only in a"))
+        elif name not in names_a:
+            differences.append((name, "only in b"))
+        else:
+            with open(join(dir_a, name), 'rb') as fa, open(join(dir_b, name), 'rb') as fb:
+                if fa.read() != fb.read():
+                    differences.append((name, "changed"))
+    return differences
@@ -0,0 +1,174 @@
+# coding: utf-8
+#
+# transfer_progress - progress counters and a throttled progress view
+# Copyright © 2020 Dave Hocker (email: AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import threading
+import time
+from collections import namedtuple
+
+
+ProgressSnapshot = namedtuple("ProgressSnapshot",
+                              ["done", "total", "bytes", "elapsed", "bytes_per_sec", "eta", "current", "finished"])
+
+
+class TransferProgress():
+    """
+    Counters published by a transfer engine. Updating is cheap and
+    may happen on any thread. Views take snapshots when they redraw.
+    """
+    def __init__(self, total=0):
+        self._lock = threading.Lock()
+        self._total = total
+        self._done = 0
+        self._bytes = 0
+        self._current = ""
+        self._start = None
+        self._end = None
+
+    def start(self, total=None):
+        with self._lock:
+            if total is not None:
+                self._total = total
+            self._done = 0
+            self._bytes = 0
+            self._start = time.monotonic()
+            self._end = None
+
+    def advance(self, items=1, nbytes=0, current=None):
+        """
+        Record completed work
+        :param items: Number of items (frames or files) completed
+        :param nbytes: Number of bytes transferred
+        :param current: Name of the item being worked on
+        :return: None
+        """
+        with self._lock:
+            if self._start is None:
+                self._start = time.monotonic()
+            self._done += items
+            self._bytes += nbytes
+            if current is not None:
+                self._current = current
+
+    def finish(self):
+        with self._lock:
+            self._end = time.monotonic()
+
+    @property
+    def done(self):
+        return self._done
+
+    @property
+    def total(self):
+        return self._total
+
+    def snapshot(self):
+        """
+        Consistent view of the counters with rate and ETA
+        :return: ProgressSnapshot
+        """
+        with self._lock:
+            if self._start is None:
+                elapsed = 0.0
+            else:
+                elapsed = (self._end or time.monotonic()) - self._start
+            bytes_per_sec = self._bytes / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self._done and self._total > self._done and elapsed > 0:
+                eta = elapsed / self._done * (self._total - self._done)
+            return ProgressSnapshot(self._done, self._total, self._bytes, elapsed,
+                                    bytes_per_sec, eta, self._current, self._end is not None)
+
+
+def format_progress(snap):
+    """
+    One line description of a progress snapshot
+    :param snap: ProgressSnapshot
+    :return: str
+    """
+    text = "{} of {}".format(snap.done, snap.total)
+    if snap.bytes_per_sec:
+        text += ", {:.0f} bytes/s".format(snap.bytes_per_sec)
+    if snap.eta is not None:
+        text += ", {:.0f} s left".format(snap.eta)
+    return text
+
+
+class ProgressView():
+    """
+    Progress bar and text label redrawn from TransferProgress at a
+    fixed frame budget rather than on every counter change.
+    """
+    FRAME_MS = 100
+
+    def __init__(self, master, progress, length=300, show_current=False):
+        """
+        Create the progress widgets
+        :param master: Parent widget
+        :param progress: TransferProgress to be displayed
+        :param length: Length of the progress bar in pixels
+        :param show_current: Show the name of the current item
+        """
+        # Imported here so headless users of TransferProgress don't need Tk
+        from tkinter import Label
+        from tkinter.ttk import Progressbar
+
+        self._master = master
+        self._progress = progress
+        self._show_current = show_current
+        self._after_id = None
+        self.bar = Progressbar(master, length=length, mode="determinate", maximum=max(progress.total, 1))
+        self.label = Label(master, text="")
+        self.current_label = Label(master, text="") if show_current else None
+
+    def pack(self, **kwargs):
+        self.bar.pack(**kwargs)
+        self.label.pack(**kwargs)
+        if self.current_label:
+            self.current_label.pack(**kwargs)
+
+    def start(self):
+        """
+        Begin periodic redraws
+        :return: None
+        """
+        if self._after_id is None:
+            self._after_id = self._master.after(ProgressView.FRAME_MS, self._redraw)
+
+    def stop(self):
+        if self._after_id is not None:
+            self._master.after_cancel(self._after_id)
+            self._after_id = None
+
+    def redraw(self):
+        """
+        Draw the current counters once
+        :return: The snapshot that was drawn
+        """
+        snap = self._progress.snapshot()
+        self.bar.config(maximum=max(snap.total, 1), value=snap.done)
+        self.label.config(text=format_progress(snap))
+        if self.current_label:
+            self.current_label.config(text=snap.current)
+        return snap
+
+    def _redraw(self):
+        self._after_id = None
+        snap = self.redraw()
+        if not snap.finished:
+            self._after_id = self._master.after(ProgressView.FRAME_MS, self._redraw)
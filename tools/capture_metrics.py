@@ -0,0 +1,194 @@
+#
+# -*- coding: utf-8 -*-
+#
+# capture_metrics - Prometheus text-format metrics for long running captures
+# © 2020 Dave Hocker (AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# References
+#   (1) https://prometheus.io/docs/instrumenting/exposition_formats/
+#       Text based exposition format
+#   (2) https://github.com/prometheus/node_exporter#textfile-collector
+#
+"""
+Capture metrics that can be scraped over HTTP or written to a
+node_exporter textfile-collector file.
+"""
+
+import logging
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+log = logging.getLogger('capture_metrics')
+
+# Upper bounds (seconds) of the write latency histogram buckets
+WRITE_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class CaptureMetrics(object):
+    """
+    Thread safe counters describing a sysex capture session
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._checksum_failures = {}
+        self._bytes_written = {}
+        self._write_buckets = [0] * (len(WRITE_LATENCY_BUCKETS) + 1)
+        self._write_sum = 0.0
+        self._write_count = 0
+        self._queue_depth = 0
+
+    def frame_received(self, port):
+        with self._lock:
+            self._frames[port] = self._frames.get(port, 0) + 1
+
+    def checksum_failure(self, port):
+        with self._lock:
+            self._checksum_failures[port] = self._checksum_failures.get(port, 0) + 1
+
+    def bytes_written(self, port, count, seconds):
+        """
+        Record a completed file write
+        :param port: Name of the port the data came from
+        :param count: Number of bytes written
+        :param seconds: Time taken by the write
+        :return: None
+        """
+        with self._lock:
+            self._bytes_written[port] = self._bytes_written.get(port, 0) + count
+            self._write_buckets[bisect_left(WRITE_LATENCY_BUCKETS, seconds)] += 1
+            self._write_sum += seconds
+            self._write_count += 1
+
+    def set_queue_depth(self, depth):
+        with self._lock:
+            self._queue_depth = depth
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format
+        :return: The metrics as a str
+        """
+        with self._lock:
+            lines = []
+            self._render_counter(lines, "pcr_capture_frames_received_total",
+                                 "Sysex frames received", self._frames)
+            self._render_counter(lines, "pcr_capture_checksum_failures_total",
+                                 "Sysex frames with a bad checksum", self._checksum_failures)
+            self._render_counter(lines, "pcr_capture_bytes_written_total",
+                                 "Bytes written to sysex files", self._bytes_written)
+
+            name = "pcr_capture_write_seconds"
+            lines.append("# HELP {0} Time taken to write a sysex file".format(name))
+            lines.append("# TYPE {0} histogram".format(name))
+            cumulative = 0
+            for bound, count in zip(WRITE_LATENCY_BUCKETS, self._write_buckets):
+                cumulative += count
+                lines.append('{0}_bucket{{le="{1}"}} {2}'.format(name, bound, cumulative))
+            lines.append('{0}_bucket{{le="+Inf"}} {1}'.format(name, self._write_count))
+            lines.append("{0}_sum {1}".format(name, self._write_sum))
+            lines.append("{0}_count {1}".format(name, self._write_count))
+
+            name = "pcr_capture_queue_depth"
+            lines.append("# HELP {0} Received frames waiting to be written".format(name))
+            lines.append("# TYPE {0} gauge".format(name))
+            lines.append("{0} {1}".format(name, self._queue_depth))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_counter(lines, name, help_text, values):
+        lines.append("# HELP {0} {1}".format(name, help_text))
+        lines.append("# TYPE {0} counter".format(name))
+        for port, value in sorted(values.items()):
+            lines.append('{0}{{port="{1}"}} {2}'.format(name, _escape_label(port), value))
+
+
+class MetricsHTTPServer(object):
+    """
+    Serves /metrics from a background thread
+    """
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                log.debug(fmt, *args)
+
+        self._server = HTTPServer((host, port), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def server_port(self):
+        return self._server.server_port
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsTextfileWriter(object):
+    """
+    Periodically writes metrics to a textfile-collector file.
+    The file is written to a temp file and renamed so the collector
+    never sees a partial file.
+    """
+    def __init__(self, metrics, path, interval=15.0):
+        self._metrics = metrics
+        self._path = path
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        # Final values
+        self.write()
+
+    def write(self):
+        tmp_path = self._path + ".tmp"
+        try:
+            with open(tmp_path, "w") as fh:
+                fh.write(self._metrics.render())
+            os.replace(tmp_path, self._path)
+        except OSError as exc:
+            log.error("Unable to write metrics file %s: %s", self._path, exc)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.write()
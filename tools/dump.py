@@ -5,7 +5,13 @@
 #
 
 
+import argparse
 import os
+import sys
+
+# Shared helpers live with the librarian app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "librarian"))
+from profiling import resolve_profile_path, run_profiled
 
 
 # Directory containing files to be compared to base
@@ -137,5 +143,10 @@ def main_2():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dump a comparative analysis of sysex messages")
+    parser.add_argument('--profile', nargs='?', const="", metavar="PATH",
+                        help='profile the run and write PATH (.pstats) plus a .txt summary')
+    args = parser.parse_args()
+
     # main_1()
-    main_2()
+    run_profiled(resolve_profile_path(args.profile, "dump"), main_2)
@@ -0,0 +1,273 @@
+#
+# -*- coding: utf-8 -*-
+#
+# gen_manufacturer_tables - build the manufacturer/model lookup tables
+# Copyright © 2020 Dave Hocker (AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# manufacturers.csv and models.py are the sources. The generated
+# manufacturer_tables.py holds:
+#
+#   SINGLE      128 entries indexed by the single byte manufacturer ID
+#   EXTENDED    perfect hash table of the extended IDs (00 i1 i2)
+#   DISPLACE    per bucket displacements of the perfect hash
+#
+# An entry is (name, tag, models) where tag is the short name (the name
+# if there is none) and models maps a model ID to (name, tag). Extended
+# entries start with their key (i1 << 7) | i2 so a lookup can check it.
+#
+# The extended table is built by hash and displace: keys are spread over
+# buckets by one multiplicative hash, then each bucket gets the smallest
+# displacement that moves all of its keys to free slots with a second
+# hash. A lookup reads the bucket's displacement and then the slot.
+#
+# Run this after changing manufacturers.csv or models.py.
+#
+"""
+Generate manufacturer_tables.py from manufacturers.csv and models.py.
+"""
+
+import argparse
+import ast
+import csv
+import logging
+import os
+import sys
+from os.path import dirname, abspath, join
+
+
+log = logging.getLogger("gen_manufacturer_tables")
+
+TOOLS_DIR = dirname(abspath(__file__))
+
+# Multipliers of the two hashes (32 bit, odd)
+BUCKET_MULT = 0x9E3779B1
+SLOT_MULT = 0x85EBCA6B
+
+
+def _hash(key, mult, bits):
+    return ((key * mult) & 0xFFFFFFFF) >> (32 - bits)
+
+
+def read_manufacturers(csv_path):
+    """
+    Read manufacturers.csv
+    :param csv_path: CSV with "id";"name";"shortname" rows. The id is
+    0xNN or (0x00, 0xNN, 0xNN).
+    :return: Dict of ID (int or 3-tuple) to (name, tag)
+    """
+    manufacturers = {}
+    with open(csv_path, "r", encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh, delimiter=";"):
+            manufacturer_id = ast.literal_eval(row["id"].strip())
+            name = row["name"].strip()
+            manufacturers[manufacturer_id] = (name, (row.get("shortname") or "").strip() or name)
+    return manufacturers
+
+
+def read_models(models_path):
+    """
+    Read the models dict from models.py without importing it
+    :return: Dict of manufacturer ID to dict of model ID to (name, tag)
+    """
+    with open(models_path, "r", encoding="utf-8") as fh:
+        tree = ast.parse(fh.read(), models_path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "models" for t in node.targets):
+            models = ast.literal_eval(node.value)
+            break
+    else:
+        raise ValueError("{} has no models dict".format(models_path))
+    return {manufacturer_id: {model_id: (names[0], names[-1]) for model_id, names in manufacturer_models.items()}
+            for manufacturer_id, manufacturer_models in models.items()}
+
+
+def extended_key(manufacturer_id):
+    return (manufacturer_id[1] << 7) | manufacturer_id[2]
+
+
+def perfect_hash(keys, load=0.5):
+    """
+    Place keys in a table with no collisions
+    :param keys: Distinct ints
+    :param load: Largest fraction of the table to fill
+    :return: (slot bits, bucket bits, displacements, dict of key to slot)
+    """
+    slot_bits = max(1, (int(len(keys) / load) - 1).bit_length())
+    bucket_bits = max(1, slot_bits - 2)
+    while True:
+        buckets = [[] for _ in range(1 << bucket_bits)]
+        for key in keys:
+            buckets[_hash(key, BUCKET_MULT, bucket_bits)].append(key)
+        displace = [0] * len(buckets)
+        slots = {}
+        used = set()
+        # Biggest buckets first, while the table is still empty
+        for b in sorted(range(len(buckets)), key=lambda i: -len(buckets[i])):
+            if not buckets[b]:
+                continue
+            for d in range(1 << 16):
+                placed = [_hash(key ^ d, SLOT_MULT, slot_bits) for key in buckets[b]]
+                if len(set(placed)) == len(placed) and not used.intersection(placed):
+                    break
+            else:
+                break
+            displace[b] = d
+            used.update(placed)
+            slots.update(zip(buckets[b], placed))
+        if len(slots) == len(keys):
+            return slot_bits, bucket_bits, displace, slots
+        log.debug("No perfect hash with %d slot bits, trying a bigger table", slot_bits)
+        slot_bits += 1
+
+
+def _format_models(models):
+    if not models:
+        return "None"
+    return "{" + ", ".join(["0x{:02X}: {!r}".format(model_id, names) if isinstance(model_id, int)
+                            else "{!r}: {!r}".format(model_id, names)
+                            for model_id, names in sorted(models.items(), key=lambda m: str(m[0]))]) + "}"
+
+
+def generate(manufacturers, models):
+    """
+    Build the source of manufacturer_tables.py
+    :param manufacturers: Dict of ID to (name, tag)
+    :param models: Dict of manufacturer ID to dict of model ID to (name, tag)
+    :return: Module source
+    """
+    unknown = [m for m in models if m not in manufacturers and models[m]]
+    for manufacturer_id in unknown:
+        log.warning("models.py has models of %s which is not in manufacturers.csv", manufacturer_id)
+
+    single = [None] * 128
+    extended = {}
+    for manufacturer_id, (name, tag) in manufacturers.items():
+        entry = (name, tag, models.get(manufacturer_id))
+        if isinstance(manufacturer_id, int):
+            single[manufacturer_id] = entry
+        else:
+            extended[extended_key(manufacturer_id)] = entry
+
+    slot_bits, bucket_bits, displace, slots = perfect_hash(sorted(extended))
+    table = [None] * (1 << slot_bits)
+    for key, slot in slots.items():
+        table[slot] = (key,) + extended[key]
+
+    lines = [
+        "# -*- coding: utf-8 -*-",
+        "# Generated by gen_manufacturer_tables.py from manufacturers.csv and models.py.",
+        "# Do not edit, run gen_manufacturer_tables.py instead.",
+        '"""Manufacturer and model lookup tables."""',
+        "",
+        "SLOT_BITS = {}".format(slot_bits),
+        "BUCKET_BITS = {}".format(bucket_bits),
+        "BUCKET_MULT = 0x{:08X}".format(BUCKET_MULT),
+        "SLOT_MULT = 0x{:08X}".format(SLOT_MULT),
+        "",
+        "# (name, tag, models) by single byte manufacturer ID",
+        "SINGLE = (",
+    ]
+    for manufacturer_id, entry in enumerate(single):
+        if entry is None:
+            lines.append("    None,  # 0x{:02X}".format(manufacturer_id))
+        else:
+            lines.append("    ({!r}, {!r}, {}),  # 0x{:02X}".format(entry[0], entry[1], _format_models(entry[2]),
+                                                                manufacturer_id))
+    lines.extend([
+        ")",
+        "",
+        "# (key, name, tag, models) of extended manufacturer IDs by perfect hash slot",
+        "EXTENDED = (",
+    ])
+    for entry in table:
+        if entry is None:
+            lines.append("    None,")
+        else:
+            lines.append("    (0x{:04X}, {!r}, {!r}, {}),  # 00 {:02X} {:02X}".format(
+                entry[0], entry[1], entry[2], _format_models(entry[3]), entry[0] >> 7, entry[0] & 0x7F))
+    lines.extend([
+        ")",
+        "",
+        "DISPLACE = (",
+    ])
+    for i in range(0, len(displace), 16):
+        lines.append("    " + " ".join(["{},".format(d) for d in displace[i:i + 16]]))
+    lines.extend([
+        ")",
+        "",
+        "",
+        "def lookup_extended(i1, i2):",
+        '    """',
+        "    Entry of an extended manufacturer ID 00 i1 i2",
+        "    :return: (name, tag, models) or None",
+        '    """',
+        "    key = (i1 << 7) | i2",
+        "    d = DISPLACE[((key * BUCKET_MULT) & 0xFFFFFFFF) >> (32 - BUCKET_BITS)]",
+        "    entry = EXTENDED[(((key ^ d) * SLOT_MULT) & 0xFFFFFFFF) >> (32 - SLOT_BITS)]",
+        "    if entry is not None and entry[0] == key:",
+        "        return entry[1:]",
+        "    return None",
+        "",
+        "",
+        "def lookup(manufacturer_id):",
+        '    """',
+        "    Entry of a manufacturer ID",
+        "    :param manufacturer_id: Single byte ID or (0, i1, i2)",
+        "    :return: (name, tag, models) or None",
+        '    """',
+        "    if isinstance(manufacturer_id, int):",
+        "        return SINGLE[manufacturer_id] if 0 <= manufacturer_id < 128 else None",
+        "    return lookup_extended(manufacturer_id[1], manufacturer_id[2])",
+        "",
+        "",
+        "def lookup_message(data):",
+        '    """',
+        "    Entry of the manufacturer of a sysex message",
+        "    :param data: Message starting with F0",
+        "    :return: (name, tag, models) or None",
+        '    """',
+        "    if data[1]:",
+        "        return SINGLE[data[1]]",
+        "    return lookup_extended(data[2], data[3])",
+        "",
+    ])
+    return "\n".join(lines)
+
+
+def main(args=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--csv', default=join(TOOLS_DIR, "manufacturers.csv"),
+                    help='manufacturer CSV. Default: %(default)s')
+    ap.add_argument('--models', default=join(TOOLS_DIR, "models.py"),
+                    help='models module. Default: %(default)s')
+    ap.add_argument('-o', '--output', default=join(TOOLS_DIR, "manufacturer_tables.py"),
+                    help='generated module. Default: %(default)s')
+    ap.add_argument('-v', '--verbose', action="store_true", help='verbose logging output (debug)')
+    args = ap.parse_args(args)
+    logging.basicConfig(format="%(name)s: %(levelname)s - %(message)s",
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+
+    manufacturers = read_manufacturers(args.csv)
+    source = generate(manufacturers, read_models(args.models))
+    tmp = args.output + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(source)
+    os.replace(tmp, args.output)
+    log.info("Wrote %s with %d manufacturers", args.output, len(manufacturers))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,703 @@
+# -*- coding: utf-8 -*-
+# Generated by gen_manufacturer_tables.py from manufacturers.csv and models.py.
+# Do not edit, run gen_manufacturer_tables.py instead.
+"""Manufacturer and model lookup tables."""
+
+SLOT_BITS = 9
+BUCKET_BITS = 7
+BUCKET_MULT = 0x9E3779B1
+SLOT_MULT = 0x85EBCA6B
+
+# (name, tag, models) by single byte manufacturer ID
+SINGLE = (
+    None,  # 0x00
+    ('Sequential Circuits', 'Sequential Circuits', None),  # 0x01
+    None,  # 0x02
+    None,  # 0x03
+    ('Moog', 'Moog', None),  # 0x04
+    None,  # 0x05
+    ('Lexicon', 'Lexicon', None),  # 0x06
+    ('Kurzweil', 'Kurzweil', None),  # 0x07
+    None,  # 0x08
+    None,  # 0x09
+    None,  # 0x0A
+    None,  # 0x0B
+    None,  # 0x0C
+    None,  # 0x0D
+    None,  # 0x0E
+    ('Ensoniq', 'Ensoniq', None),  # 0x0F
+    ('Oberheim', 'Oberheim', None),  # 0x10
+    ('Apple', 'Apple', None),  # 0x11
+    None,  # 0x12
+    None,  # 0x13
+    None,  # 0x14
+    None,  # 0x15
+    None,  # 0x16
+    None,  # 0x17
+    ('Emu', 'Emu', None),  # 0x18
+    None,  # 0x19
+    ('ART', 'ART', None),  # 0x1A
+    None,  # 0x1B
+    None,  # 0x1C
+    None,  # 0x1D
+    None,  # 0x1E
+    None,  # 0x1F
+    None,  # 0x20
+    None,  # 0x21
+    ('Synthaxe', 'Synthaxe', None),  # 0x22
+    None,  # 0x23
+    ('Hohner', 'Hohner', None),  # 0x24
+    None,  # 0x25
+    None,  # 0x26
+    None,  # 0x27
+    None,  # 0x28
+    ('PPG', 'PPG', None),  # 0x29
+    None,  # 0x2A
+    ('SSL', 'SSL', None),  # 0x2B
+    None,  # 0x2C
+    None,  # 0x2D
+    None,  # 0x2E
+    ('Elka / General Music', 'GEM', None),  # 0x2F
+    ('Dynacord', 'Dynacord', None),  # 0x30
+    None,  # 0x31
+    None,  # 0x32
+    ('Clavia (Nord)', 'Clavia', None),  # 0x33
+    None,  # 0x34
+    None,  # 0x35
+    ('Cheetah', 'Cheetah', None),  # 0x36
+    None,  # 0x37
+    None,  # 0x38
+    None,  # 0x39
+    None,  # 0x3A
+    None,  # 0x3B
+    None,  # 0x3C
+    None,  # 0x3D
+    ('Waldorf Electronics Gmbh', 'Waldorf', {0x0E: ('microWAVE II/XT(k)', 'microwave2')}),  # 0x3E
+    None,  # 0x3F
+    ('Kawai Musical Instruments MFG. CO. Ltd', 'Kawai', None),  # 0x40
+    ('Roland Corporation', 'Roland', None),  # 0x41
+    ('Korg Inc.', 'Korg', None),  # 0x42
+    ('Yamaha Corporation', 'Yamaha', None),  # 0x43
+    ('Casio Computer Co. Ltd', 'Casio', None),  # 0x44
+    None,  # 0x45
+    ('Kamiya Studio Co. Ltd', 'Kamiya', None),  # 0x46
+    ('Akai Electric Co. Ltd.', 'Akai', None),  # 0x47
+    ('Victor Company of Japan, Ltd.', 'JVC', None),  # 0x48
+    None,  # 0x49
+    None,  # 0x4A
+    ('Fujitsu Limited', 'Fujitsu', None),  # 0x4B
+    ('Sony Corporation', 'Sony', None),  # 0x4C
+    None,  # 0x4D
+    ('Teac Corporation', 'Teac', None),  # 0x4E
+    None,  # 0x4F
+    ('Matsushita Electric Industrial Co. , Ltd', 'M-Audio', None),  # 0x50
+    ('Fostex Corporation', 'Fostex', None),  # 0x51
+    ('Zoom Corporation', 'Zoom', None),  # 0x52
+    None,  # 0x53
+    ('Matsushita Communication Industrial Co., Ltd.', 'Matsushita', None),  # 0x54
+    ('Suzuki Musical Instruments MFG. Co., Ltd.', 'Suzuki', None),  # 0x55
+    ('Fuji Sound Corporation Ltd.', 'Fuji', None),  # 0x56
+    ('Acoustic Technical Laboratory, Inc.', 'ATL', None),  # 0x57
+    None,  # 0x58
+    ('Faith, Inc.', 'Faith', None),  # 0x59
+    ('Internet Corporation', 'Internet Corporation', None),  # 0x5A
+    None,  # 0x5B
+    ('Seekers Co. Ltd.', 'Seekers', None),  # 0x5C
+    None,  # 0x5D
+    None,  # 0x5E
+    ('SD Card Association', 'SD Card Association', None),  # 0x5F
+    None,  # 0x60
+    None,  # 0x61
+    None,  # 0x62
+    None,  # 0x63
+    None,  # 0x64
+    None,  # 0x65
+    None,  # 0x66
+    None,  # 0x67
+    None,  # 0x68
+    None,  # 0x69
+    None,  # 0x6A
+    None,  # 0x6B
+    None,  # 0x6C
+    None,  # 0x6D
+    None,  # 0x6E
+    None,  # 0x6F
+    None,  # 0x70
+    None,  # 0x71
+    None,  # 0x72
+    None,  # 0x73
+    None,  # 0x74
+    None,  # 0x75
+    None,  # 0x76
+    None,  # 0x77
+    None,  # 0x78
+    None,  # 0x79
+    None,  # 0x7A
+    None,  # 0x7B
+    None,  # 0x7C
+    ('Non-commercial', 'Non-commercial', None),  # 0x7D
+    ('Universal Non-Realtime', 'Universal Non-Realtime', None),  # 0x7E
+    ('Universal Realtime', 'Universal Realtime', None),  # 0x7F
+)
+
+# (key, name, tag, models) of extended manufacturer IDs by perfect hash slot
+EXTENDED = (
+    (0x1039, 'IRCAM', 'IRCAM', None),  # 00 20 39
+    (0x1062, 'Infection Music', 'Infection Music', None),  # 00 20 62
+    None,
+    (0x0082, 'Crystal Semiconductor', 'Crystal', None),  # 00 01 02
+    None,
+    (0x00C3, 'Voyager Sound Inc.', 'Voyager Sound Inc.', None),  # 00 01 43
+    None,
+    None,
+    None,
+    (0x104D, 'Vermona', 'Vermona', None),  # 00 20 4D
+    (0x108E, 'Surfin Kangaroo Studio', 'Surfin Kangaroo Studio', None),  # 00 21 0E
+    None,
+    (0x00AE, 'SeaSound LLC', 'SeaSound LLC', None),  # 00 01 2E
+    None,
+    (0x00EF, 'Custom Audio Electronics', 'Custom Audio Electronics', None),  # 00 01 6F
+    None,
+    (0x103A, 'Propellerhead Software', 'Propellerhead Software', None),  # 00 20 3A
+    None,
+    (0x1079, 'Hanpin Electron Co Ltd', 'Hanpin Electron Co Ltd', None),  # 00 20 79
+    (0x0099, 'Walker Technical', 'Walker Technical', None),  # 00 01 19
+    None,
+    (0x00C8, 'Mercurial Communications', 'Mercurial Communications', None),  # 00 01 48
+    (0x2003, 'D&M Holdings Inc.', 'D&M Holdings Inc.', None),  # 00 40 03
+    (0x0016, 'Opcode', 'Opcode', None),  # 00 00 16
+    None,
+    (0x1064, 'genoQs Machines GmbH', 'genoQs Machines GmbH', None),  # 00 20 64
+    None,
+    (0x0084, 'Silicon Graphics', 'SGI', None),  # 00 01 04
+    (0x00C5, 'Aviom Inc.', 'Aviom', None),  # 00 01 45
+    None,
+    None,
+    None,
+    (0x104F, 'Wave Idea', 'Wave Idea', None),  # 00 20 4F
+    None,
+    (0x1090, 'ROLI Ltd', 'ROLI Ltd', None),  # 00 21 10
+    None,
+    (0x00B0, 'Aurisis Research', 'Aurisis Research', None),  # 00 01 30
+    (0x00F1, 'Mega Control Systems', 'Mega Control Systems', None),  # 00 01 71
+    None,
+    None,
+    (0x103F, 'Amsaro GmbH', 'Amsaro GmbH', None),  # 00 20 3F
+    (0x107D, 'Misa Digital Technologies Ltd', 'Misa Digital Technologies Ltd', None),  # 00 20 7D
+    None,
+    (0x009B, 'InVision Interactive', 'InVision Interactive', None),  # 00 01 1B
+    None,
+    (0x00DC, 'Custom Solutions Software', 'Custom Solutions Software', None),  # 00 01 5C
+    None,
+    None,
+    None,
+    (0x1066, 'Waves Audio Ltd', 'Waves Audio Ltd', None),  # 00 20 66
+    (0x0086, 'PreSonus', 'PreSonus', None),  # 00 01 06
+    None,
+    (0x00C7, 'Notation Software', 'Notation Software', None),  # 00 01 47
+    None,
+    None,
+    None,
+    (0x1051, "Lion's Tracs", "Lion's Tracs", None),  # 00 20 51
+    None,
+    None,
+    (0x00B2, 'FM7 Inc', 'FM7 Inc', None),  # 00 01 32
+    None,
+    (0x00F3, 'iConnectivity', 'iConnectivity', None),  # 00 01 73
+    None,
+    (0x103C, 'Elektron ESI AB', 'Elektron ESI AB', None),  # 00 20 3C
+    None,
+    (0x1078, 'Nixer Ltd', 'Nixer Ltd', None),  # 00 20 78
+    None,
+    (0x009D, 'Nemesys Music Technology', 'Nemesys Music Technology', None),  # 00 01 1D
+    (0x00CA, 'Logic Sequencing Devices', 'Logic Sequencing Devices', None),  # 00 01 4A
+    None,
+    None,
+    (0x1027, 'Acorn Computer', 'Acorn Computer', None),  # 00 20 27
+    (0x1068, 'Da Fact', 'Da Fact', None),  # 00 20 68
+    None,
+    (0x0088, 'Topaz Enterprises', 'Topaz', None),  # 00 01 08
+    None,
+    (0x00C9, 'Wave Arts', 'Wave Arts', None),  # 00 01 49
+    None,
+    None,
+    None,
+    (0x1053, 'Focal-JMlab', 'Focal-JMlab', None),  # 00 20 53
+    None,
+    None,
+    (0x00B4, 'Hyperactive Audio Systems', 'Hyperactive Audio Systems', None),  # 00 01 34
+    None,
+    (0x00F5, 'NetLogic Microsystems', 'NetLogic Microsystems', None),  # 00 01 75
+    None,
+    (0x103E, 'MAM (Music and More)', 'MAM', None),  # 00 20 3E
+    None,
+    (0x106B, 'Arturia', 'Arturia', None),  # 00 20 6B
+    (0x009F, 'Syndyne Corporation', 'Syndyne Corporation', None),  # 00 01 1F
+    None,
+    (0x00E0, 'Stanton (Gibson)', 'Stanton (Gibson)', None),  # 00 01 60
+    None,
+    (0x1029, 'Focusrite/Novation', 'Novation', None),  # 00 20 29
+    None,
+    (0x106A, 'Spectral Audio', 'Spectral Audio', None),  # 00 20 6A
+    None,
+    (0x008A, 'Microsoft', 'Microsoft', None),  # 00 01 0A
+    (0x00CB, 'Axess Electronics', 'Axess', None),  # 00 01 4B
+    None,
+    None,
+    None,
+    (0x1055, 'Faith Technologies (Digiplug)', 'Faith Technologies (Digiplug)', None),  # 00 20 55
+    None,
+    (0x0076, 'Electro-Voice', 'Electro-Voice', None),  # 00 00 76
+    None,
+    (0x00B3, 'Swivel Systems', 'Swivel Systems', None),  # 00 01 33
+    None,
+    (0x00F7, 'Nektar Technology Inc', 'Nektar Technology Inc', None),  # 00 01 77
+    None,
+    (0x1040, 'CDS Advanced Technology BV', 'CDS Advanced Technology BV', None),  # 00 20 40
+    (0x1081, 'Kyodday/Tokai', 'Kyodday/Tokai', None),  # 00 21 01
+    None,
+    (0x00A1, 'Cakewalk Music Software', 'Cakewalk', None),  # 00 01 21
+    None,
+    (0x00E2, 'First Act / 745 Media', 'First Act / 745 Media', None),  # 00 01 62
+    None,
+    (0x102B, 'Medeli Electronics Co.', 'Medeli Electronics Co.', None),  # 00 20 2B
+    None,
+    (0x106C, 'Vixid', 'Vixid', None),  # 00 20 6C
+    (0x008C, 'Line 6 (Fast Forward)', 'Line 6', None),  # 00 01 0C
+    None,
+    (0x00CF, 'Samson Technologies', 'Samson Technologies', None),  # 00 01 4F
+    None,
+    (0x107F, 'Serato Inc LP', 'Serato Inc LP', None),  # 00 20 7F
+    None,
+    (0x1057, 'Manikin Electronic', 'Manikin', None),  # 00 20 57
+    None,
+    (0x0075, 'e-Tek Labs (Forte Tech)', 'e-Tek Labs', None),  # 00 00 75
+    (0x00B8, 'TC-Helicon Vocal Technologies', 'TC-Helicon Vocal Technologies', None),  # 00 01 38
+    None,
+    (0x00F9, 'DJTechTools.com', 'DJTechTools.com', None),  # 00 01 79
+    None,
+    (0x1042, 'DSP Arts', 'DSP Arts', None),  # 00 20 42
+    None,
+    (0x1083, 'PreSonus Software Ltd', 'PreSonus', None),  # 00 21 03
+    None,
+    (0x00AB, 'Vari-Lite Inc.', 'Vari-Lite Inc.', None),  # 00 01 2B
+    None,
+    (0x00E4, 'Panadigm Innovations Ltd', 'Panadigm Innovations Ltd', None),  # 00 01 64
+    None,
+    (0x102D, 'Blue Chip Music Technology', 'Blue Chip Music Technology', None),  # 00 20 2D
+    (0x106E, 'Ya Horng Electronic Co LTD', 'Ya Horng Electronic Co LTD', None),  # 00 20 6E
+    None,
+    (0x008E, 'Van Koevering Company', 'Van Koevering Company', None),  # 00 01 0E
+    None,
+    (0x00D5, 'Damage Control Engineering LLC', 'Damage Control Engineering LLC', None),  # 00 01 55
+    None,
+    None,
+    None,
+    (0x1059, 'Phonic Corp', 'Phonic Corp', None),  # 00 20 59
+    (0x0079, 'Westrex', 'Westrex', None),  # 00 00 79
+    None,
+    None,
+    None,
+    (0x00FA, 'Rezonance Labs', 'Rezonance Labs', None),  # 00 01 7A
+    None,
+    (0x1044, 'Stamer Musikanlagen GmbH', 'Stamer Musikanlagen GmbH', None),  # 00 20 44
+    None,
+    (0x1085, 'Fairlight Instruments Pty Ltd', 'Fairlight', None),  # 00 21 05
+    (0x00A3, 'National Semiconductor', 'National Semiconductor', None),  # 00 01 23
+    None,
+    (0x00E6, 'Auvital Music Corp', 'Auvital Music Corp', None),  # 00 01 66
+    None,
+    (0x000E, 'Alesis', 'Alesis', None),  # 00 00 0E
+    None,
+    (0x107A, '"MIDI-hardware" R.Sowa', '"MIDI-hardware" R.Sowa', None),  # 00 20 7A
+    None,
+    (0x0090, 'S & S Research', 'S & S Research', None),  # 00 01 10
+    None,
+    (0x00D1, 'Blackberry (RIM)', 'Blackberry', None),  # 00 01 51
+    None,
+    None,
+    (0x105B, 'Silansys Technologies', 'Silansys Technologies', None),  # 00 20 5B
+    None,
+    (0x007B, 'ESS Technology', 'ESS', None),  # 00 00 7B
+    None,
+    (0x00BC, 'Apogee Digital', 'Apogee', None),  # 00 01 3C
+    None,
+    (0x00FD, 'Media Overkill', 'Media Overkill', None),  # 00 01 7D
+    None,
+    None,
+    (0x1087, 'VacoLoco', 'VacoLoco', None),  # 00 21 07
+    None,
+    (0x00A7, 'Angel Software', 'Angel Software', None),  # 00 01 27
+    None,
+    (0x00E8, 'Chris Grigg Designs', 'Chris Grigg Designs', None),  # 00 01 68
+    None,
+    (0x1031, 'EMAGIC', 'EMAGIC', None),  # 00 20 31
+    None,
+    (0x1073, 'M3i Technologies GmbH', 'M3i Technologies GmbH', None),  # 00 20 73
+    (0x0092, 'Chromatic Research', 'Chromatic Research', None),  # 00 01 12
+    None,
+    (0x00BA, 'Sonic Network Inc', 'Sonic Network Inc', None),  # 00 01 3A
+    None,
+    None,
+    None,
+    (0x105D, 'Cinetix Medien und Interface GmbH', 'Cinetix Medien und Interface GmbH', None),  # 00 20 5D
+    None,
+    (0x007D, 'Brooktree Corp', 'Brooktree Corp', None),  # 00 00 7D
+    None,
+    (0x00BE, 'Microtools Inc.', 'Microtools Inc.', None),  # 00 01 3E
+    (0x00D7, 'Brooks & Forsman Designs LLC / DrumLite', 'Brooks & Forsman Designs LLC / DrumLite', None),  # 00 01 57
+    None,
+    (0x1048, 'Noteheads AB', 'Noteheads AB', None),  # 00 20 48
+    None,
+    (0x1089, 'Native Instruments', 'NI', None),  # 00 21 09
+    None,
+    (0x00A9, 'Lyrrus dba G-VOX', 'Lyrrus dba G-VOX', None),  # 00 01 29
+    None,
+    (0x00EA, 'Mixware', 'Mixware', None),  # 00 01 6A
+    None,
+    (0x1033, 'Access Music Electronics', 'Access', None),  # 00 20 33
+    (0x1074, 'Gemalto (from Xiring)', 'Gemalto (from Xiring)', None),  # 00 20 74
+    None,
+    (0x0094, 'IDRC', 'IDRC', None),  # 00 01 14
+    None,
+    (0x00D6, 'Yost Engineering, Inc.', 'Yost Engineering, Inc.', None),  # 00 01 56
+    None,
+    None,
+    None,
+    (0x105F, 'Sequentix Music Systems', 'Sequentix Music Systems', None),  # 00 20 5F
+    (0x007A, 'Nvidia', 'Nvidia', None),  # 00 00 7A
+    None,
+    (0x00C0, 'Frontier Design Group, LLC', 'Frontier Design Group, LLC', None),  # 00 01 40
+    None,
+    None,
+    None,
+    (0x104A, 'Skrydstrup R&D', 'Skrydstrup R&D', None),  # 00 20 4A
+    None,
+    (0x108B, 'MFB', 'MFB', None),  # 00 21 0B
+    None,
+    (0x00A5, 'Virtual DSP Corporation', 'Virtual DSP Corporation', None),  # 00 01 25
+    (0x00EC, 'Source Audio LLC', 'Source Audio LLC', None),  # 00 01 6C
+    None,
+    (0x1035, 'Hanmesoft', 'Hanmesoft', None),  # 00 20 35
+    None,
+    (0x1076, 'Teenage Engineering', 'Teenage Engineering', None),  # 00 20 76
+    None,
+    (0x0096, 'TorComp Research Inc.', 'TorComp Research Inc.', None),  # 00 01 16
+    None,
+    (0x00DE, 'Centrance', 'Centrance', None),  # 00 01 5E
+    None,
+    (0x1038, 'IBK MIDI', 'IBK MIDI', None),  # 00 20 38
+    (0x1061, 'Be4 Ltd', 'Be4 Ltd', None),  # 00 20 61
+    None,
+    None,
+    None,
+    (0x00C2, 'Starr Labs', 'Starr Labs', None),  # 00 01 42
+    None,
+    None,
+    None,
+    (0x104C, 'NewWave Labs (MadWaves)', 'NewWave Labs (MadWaves)', None),  # 00 20 4C
+    (0x0074, 'Ta Horng Musical Instrument', 'Ta Horng Musical Instrument', None),  # 00 00 74
+    (0x108D, 'Ploytec GmbH', 'Ploytec', None),  # 00 21 0D
+    (0x00AD, 'Aureal Semiconductor Inc.', 'Aureal Semiconductor Inc.', None),  # 00 01 2D
+    None,
+    (0x00EE, 'Fishman Transducers', 'Fishman Transducers', None),  # 00 01 6E
+    None,
+    (0x1037, 'Proel SpA', 'Proel SpA', None),  # 00 20 37
+    None,
+    (0x1070, 'OTO MACHINES', 'OTO MACHINES', None),  # 00 20 70
+    None,
+    (0x0098, 'Sound Sculpture', 'Sound Sculpture', None),  # 00 01 18
+    (0x00D9, 'Garritan Corp', 'Garritan', None),  # 00 01 59
+    (0x2000, 'Crimson Technology Inc.', 'Crimson Technology Inc.', None),  # 00 40 00
+    (0x1036, 'Terratec Electronic GmbH', 'Terratec', None),  # 00 20 36
+    None,
+    (0x1063, 'Central Music Co. (CME)', 'CME', None),  # 00 20 63
+    None,
+    (0x0083, 'Conexant (Rockwell)', 'Conexant', None),  # 00 01 03
+    None,
+    (0x00C4, 'Manifold Labs', 'Manifold Labs', None),  # 00 01 44
+    None,
+    None,
+    (0x104E, 'Nokia', 'Nokia', None),  # 00 20 4E
+    None,
+    (0x108F, 'Philips Electronics HK Ltd', 'Philips', None),  # 00 21 0F
+    None,
+    (0x00AF, 'U.S. Robotics', 'U.S. Robotics', None),  # 00 01 2F
+    None,
+    (0x00F0, 'American Audio/DJ', 'American Audio/DJ', None),  # 00 01 70
+    None,
+    (0x103B, 'Red Sound Systems Ltd', 'Red Sound Systems Ltd', None),  # 00 20 3B
+    None,
+    (0x107B, 'Beyond Music Industrial Ltd', 'Beyond Music Industrial Ltd', None),  # 00 20 7B
+    (0x009A, 'Digital Harmony (PAVO)', 'Digital Harmony (PAVO)', None),  # 00 01 1A
+    None,
+    (0x00DB, 'RJM Music Technology', 'RJM Music Technology', None),  # 00 01 5B
+    None,
+    (0x102E, 'BEE OH Corp', 'BEE OH Corp', None),  # 00 20 2E
+    None,
+    (0x1065, 'Medialon', 'Medialon', None),  # 00 20 65
+    None,
+    (0x0085, 'M-Audio (Midiman)', 'M-Audio', None),  # 00 01 05
+    (0x00C6, 'Mixmeister Technology', 'Mixmeister Technology', None),  # 00 01 46
+    None,
+    None,
+    None,
+    (0x1050, 'Hartmann GmbH', 'Hartmann', None),  # 00 20 50
+    None,
+    None,
+    None,
+    (0x00B1, 'Nearfield Research', 'Nearfield Research', None),  # 00 01 31
+    (0x00F2, 'Kilpatrick Audio', 'Kilpatrick Audio', None),  # 00 01 72
+    None,
+    (0x001A, 'Allen & Heath Brenell', 'Allen & Heath', None),  # 00 00 1A
+    None,
+    (0x107C, 'Kiss Box B.V.', 'Kiss Box B.V.', None),  # 00 20 7C
+    None,
+    (0x009C, 'T-Square Design', 'T-Square Design', None),  # 00 01 1C
+    None,
+    (0x00DD, 'Sonarcana LLC', 'Sonarcana LLC', None),  # 00 01 5D
+    None,
+    (0x1034, 'Synoptic', 'Synoptic', None),  # 00 20 34
+    None,
+    (0x1067, 'Jerash Labs', 'Jerash Labs', None),  # 00 20 67
+    (0x0081, 'AuraSound', 'AuraSound', None),  # 00 01 01
+    None,
+    (0x00CD, 'Open Labs', 'Open Labs', None),  # 00 01 4D
+    None,
+    None,
+    None,
+    (0x1052, 'Analogue Systems', 'Analogue Systems', None),  # 00 20 52
+    None,
+    None,
+    (0x00B5, 'MidiLite (Castle Studios Productions)', 'MidiLite', None),  # 00 01 35
+    None,
+    (0x00F4, 'Fractal Audio', 'Fractal Audio', None),  # 00 01 74
+    None,
+    (0x103D, 'Sintefex Audio', 'Sintefex Audio', None),  # 00 20 3D
+    None,
+    (0x107E, 'AI Musics Technology Inc', 'AI Musics Technology Inc', None),  # 00 20 7E
+    None,
+    (0x009E, 'DBX Professional (Harman Intl)', 'DBX', None),  # 00 01 1E
+    (0x00DA, 'Plogue Art et Technologie, Inc', 'Plogue Art et Technologie, Inc', None),  # 00 01 5A
+    None,
+    (0x0007, 'Digital Music Corporation', 'Digital Music Corporation', None),  # 00 00 07
+    None,
+    (0x1069, 'Elby Designs', 'Elby Designs', None),  # 00 20 69
+    None,
+    (0x0089, 'Cast Lighting', 'Cast Lighting', None),  # 00 01 09
+    None,
+    (0x00DF, 'Kesumo LLC', 'Kesumo LLC', None),  # 00 01 5F
+    None,
+    None,
+    None,
+    (0x1054, 'Ringway Electronics (Chang-Zhou) Co Ltd', 'Ringway Electronics (Chang-Zhou) Co Ltd', None),  # 00 20 54
+    (0x007E, 'Otari Corp', 'Otari Corp', None),  # 00 00 7E
+    None,
+    (0x00B6, 'Radikal Technologies', 'Radikal Technologies', None),  # 00 01 36
+    None,
+    (0x00F6, 'Music Computing', 'Music Computing', None),  # 00 01 76
+    None,
+    (0x001C, '360 Systems', '360 Systems', None),  # 00 00 1C
+    None,
+    (0x1080, 'Limex Music Handles GmbH', 'Limex Music Handles GmbH', None),  # 00 21 00
+    (0x00A0, 'Bitheadz', 'Bitheadz', None),  # 00 01 20
+    None,
+    (0x00E1, 'Livid Instruments', 'Livid Instruments', None),  # 00 01 61
+    None,
+    (0x102A, 'Samkyung Mechatronics', 'Samkyung Mechatronics', None),  # 00 20 2A
+    None,
+    (0x1043, 'Phil Rees Music Tech', 'Phil Rees Music Tech', None),  # 00 20 43
+    None,
+    (0x008B, 'Sonic Foundry', 'Sonic Foundry', None),  # 00 01 0B
+    (0x00CE, 'Guillemot R&D Inc', 'Guillemot R&D Inc', None),  # 00 01 4E
+    None,
+    None,
+    None,
+    (0x1056, 'Showworks', 'Showworks', None),  # 00 20 56
+    None,
+    (0x0077, 'Midisoft Corporation', 'Midisoft', None),  # 00 00 77
+    None,
+    (0x00B7, 'Roger Linn Design', 'LINN', None),  # 00 01 37
+    (0x00F8, 'Zenph Sound Innovations', 'Zenph Sound Innovations', None),  # 00 01 78
+    None,
+    (0x0020, 'Axxes', 'Axxes', None),  # 00 00 20
+    (0x1041, 'Touched By Sound GmbH', 'Touched By Sound GmbH', None),  # 00 20 41
+    (0x1082, 'Mutable Instruments', 'Mutable Instruments', {0x02: ('Shruthi-1', 'shruthi-1')}),  # 00 21 02
+    None,
+    (0x00A2, 'Analog Devices', 'Analog Devices', None),  # 00 01 22
+    None,
+    (0x00E3, 'Pygraphics, Inc.', 'Pygraphics, Inc.', None),  # 00 01 63
+    None,
+    (0x102C, 'Charlie Lab SRL', 'Charlie Lab SRL', None),  # 00 20 2C
+    None,
+    (0x106D, 'C-Thru Music', 'C-Thru Music', None),  # 00 20 6D
+    (0x008D, 'Beatnik Inc', 'Beatnik', None),  # 00 01 0D
+    None,
+    (0x00CC, 'Muse Research', 'Muse Research', None),  # 00 01 4C
+    None,
+    None,
+    None,
+    (0x1058, '1 Come Tech', '1 Come Tech', None),  # 00 20 58
+    None,
+    (0x0078, 'QSound Labs', 'QSound Labs', None),  # 00 00 78
+    (0x00B9, 'Event Electronics', 'Event Electronics', None),  # 00 01 39
+    None,
+    (0x00FB, 'Decibel Eleven', 'Decibel Eleven', None),  # 00 01 7B
+    None,
+    (0x1046, 'C-Mexx Software', 'C-Mexx', None),  # 00 20 46
+    None,
+    (0x1084, 'Xiring', 'Xiring', None),  # 00 21 04
+    None,
+    (0x00A4, 'Boom Theory / Adinolfi Alternative Percussion', 'Boom Theory / Adinolfi Alternative Percussion', None),  # 00 01 24
+    (0x00E5, 'Avedis Zildjian Co', 'Avedis Zildjian Co', None),  # 00 01 65
+    None,
+    None,
+    (0x102F, 'LG Semicon America', 'LG Semicon America', None),  # 00 20 2F
+    (0x106F, 'SM Pro Audio', 'SM Pro Audio', None),  # 00 20 6F
+    None,
+    (0x008F, 'Altech Systems', 'Altech Systems', None),  # 00 01 0F
+    None,
+    (0x00D0, 'Electronic Theatre Controls', 'Electronic Theatre Controls', None),  # 00 01 50
+    None,
+    None,
+    None,
+    (0x105A, 'Dolby Australia (Lake)', 'Dolby Australia (Lake)', None),  # 00 20 5A
+    None,
+    None,
+    (0x00BB, 'Realtime Music Solutions', 'Realtime Music Solutions', None),  # 00 01 3B
+    None,
+    (0x00FC, 'CNMAT', 'CNMAT', None),  # 00 01 7C
+    None,
+    (0x1045, 'Musical Muntaner S.A. dba Soundart', 'Musical Muntaner S.A. dba Soundart', None),  # 00 20 45
+    None,
+    (0x1086, 'Musicom Lab', 'Musicom Lab', None),  # 00 21 06
+    (0x00A6, 'Antares Systems', 'Antares Systems', None),  # 00 01 26
+    None,
+    (0x00E7, 'Inspired Instruments Inc', 'Inspired Instruments Inc', None),  # 00 01 67
+    None,
+    (0x1030, 'TESI', 'TESI', None),  # 00 20 30
+    None,
+    (0x1072, 'Blackstar Amplification Ltd', 'Blackstar', None),  # 00 20 72
+    None,
+    (0x0091, 'VLSI Technology', 'VLSI Technology', None),  # 00 01 11
+    (0x00D2, 'Mobileer', 'Mobileer', None),  # 00 01 52
+    None,
+    None,
+    None,
+    (0x105C, 'Winbond Electronics', 'Winbond Electronics', None),  # 00 20 5C
+    None,
+    (0x007C, 'Media Trix Peripherals', 'Media Trix Peripherals', None),  # 00 00 7C
+    None,
+    (0x00BD, 'Classical Organs, Inc.', 'Classical Organs, Inc.', None),  # 00 01 3D
+    (0x00FE, 'Confusionists LLC', 'Confusionists LLC', None),  # 00 01 7E
+    None,
+    None,
+    (0x1047, 'Klavis Technologies', 'Klavis Technologies', None),  # 00 20 47
+    (0x1088, 'RWA (Hong Kong) Limited', 'RWA (Hong Kong) Limited', None),  # 00 21 08
+    None,
+    (0x00A8, 'St Louis Music', 'St Louis Music', None),  # 00 01 28
+    None,
+    (0x00E9, 'Slate Digital LLC', 'Slate Digital LLC', None),  # 00 01 69
+    None,
+    (0x1032, 'Behringer GmbH', 'Behringer', None),  # 00 20 32
+    None,
+    (0x1071, 'ELZAB S.A., G LAB', 'ELZAB S.A., G LAB', None),  # 00 20 71
+    (0x0093, 'Sapphire', 'Sapphire', None),  # 00 01 13
+    None,
+    (0x00D4, 'Lynx Studio Technology Inc.', 'Lynx Studio Technology Inc.', None),  # 00 01 54
+    None,
+    None,
+    None,
+    (0x105E, 'A&G Soluzioni Digitali', 'A&G Soluzioni Digitali', None),  # 00 20 5E
+    None,
+    (0x007F, 'Key Electronics, Inc.', 'Key Electronics, Inc.', None),  # 00 00 7F
+    (0x00BF, 'Numark Industries', 'Numark', None),  # 00 01 3F
+    None,
+    None,
+    None,
+    (0x1049, 'Algorithmix', 'Algorithmix', None),  # 00 20 49
+    None,
+    (0x108A, 'Naonext', 'Naonext', None),  # 00 21 0A
+    None,
+    (0x00AA, 'Ashley Audio Inc.', 'Ashley Audio Inc.', None),  # 00 01 2A
+    (0x00EB, 'Social Entropy', 'Social Entropy', None),  # 00 01 6B
+    None,
+    None,
+    (0x001B, 'Peavey Electronics', 'Peavey', None),  # 00 00 1B
+    (0x1075, 'Prostage SL', 'Prostage SL', None),  # 00 20 75
+    None,
+    (0x0095, 'Justonic Tuning', 'Justonic Tuning', None),  # 00 01 15
+    None,
+    (0x00D3, 'Synthogy', 'Synthogy', None),  # 00 01 53
+    None,
+    None,
+    None,
+    (0x1060, 'Oram Pro Audio', 'Oram Pro Audio', None),  # 00 20 60
+    (0x0080, 'Shure Incorporated', 'Shure', None),  # 00 01 00
+    None,
+    (0x00C1, 'Recordare LLC', 'Recordare LLC', None),  # 00 01 41
+    None,
+    None,
+    None,
+    (0x104B, 'Professional Audio Company', 'Professional Audio Company', None),  # 00 20 4B
+    None,
+    (0x108C, 'Teknel Research', 'Teknel Research', None),  # 00 21 0C
+    (0x00AC, 'Summit Audio Inc.', 'Summit Audio Inc.', None),  # 00 01 2C
+    None,
+    (0x00ED, 'Ernie Ball / Music Man', 'Music Man', None),  # 00 01 6D
+    None,
+    (0x0015, 'KAT', 'KAT', None),  # 00 00 15
+    None,
+    (0x1077, 'Tobias Erichsen Consulting', 'Tobias Erichsen Consulting', None),  # 00 20 77
+    None,
+    (0x0097, 'Newtek Inc.', 'Newtek Inc.', None),  # 00 01 17
+    (0x00D8, 'Infinite Response', 'Infinite Response', None),  # 00 01 58
+    (0x2001, 'Softbank Mobile Corp', 'Softbank Mobile Corp', None),  # 00 40 01
+    None,
+)
+
+DISPLACE = (
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 24, 2, 0, 0, 0, 0, 0,
+    1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 9, 0, 0, 0, 0, 0,
+    0, 3, 0, 0, 0, 0, 0, 2, 2, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 5, 0, 0, 0, 0, 0, 0, 0, 0, 0, 3, 1, 0,
+    0, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 20, 18, 0, 0,
+    5, 0, 26, 0, 0, 0, 0, 8, 24, 5, 0, 0, 6, 5, 6, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 21, 0, 20, 0, 0, 6, 10,
+    40, 0, 10, 0, 0, 0, 3, 2, 0, 0, 105, 0, 14, 0, 0, 0,
+)
+
+
+def lookup_extended(i1, i2):
+    """
+    Entry of an extended manufacturer ID 00 i1 i2
+    :return: (name, tag, models) or None
+    """
+    key = (i1 << 7) | i2
+    d = DISPLACE[((key * BUCKET_MULT) & 0xFFFFFFFF) >> (32 - BUCKET_BITS)]
+    entry = EXTENDED[(((key ^ d) * SLOT_MULT) & 0xFFFFFFFF) >> (32 - SLOT_BITS)]
+    if entry is not None and entry[0] == key:
+        return entry[1:]
+    return None
+
+
+def lookup(manufacturer_id):
+    """
+    Entry of a manufacturer ID
+    :param manufacturer_id: Single byte ID or (0, i1, i2)
+    :return: (name, tag, models) or None
+    """
+    if isinstance(manufacturer_id, int):
+        return SINGLE[manufacturer_id] if 0 <= manufacturer_id < 128 else None
+    return lookup_extended(manufacturer_id[1], manufacturer_id[2])
+
+
+def lookup_message(data):
+    """
+    Entry of the manufacturer of a sysex message
+    :param data: Message starting with F0
+    :return: (name, tag, models) or None
+    """
+    if data[1]:
+        return SINGLE[data[1]]
+    return lookup_extended(data[2], data[3])
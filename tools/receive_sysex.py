@@ -23,8 +23,9 @@ An upload of all control maps will consist of 750 sysex messages.
 import argparse
 import logging
 import os
-import re
+import queue
 import sys
+import threading
 import time
 
 from datetime import datetime
@@ -33,19 +34,43 @@ from os.path import exists, join
 from rtmidi.midiconstants import END_OF_EXCLUSIVE, SYSTEM_EXCLUSIVE
 from rtmidi.midiutil import open_midiinput
 
-from manufacturers import manufacturers
-from models import models
+# Shared helpers live with the librarian app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "librarian"))
+from profiling import resolve_profile_path, run_profiled
+
+from capture_metrics import CaptureMetrics, MetricsHTTPServer, MetricsTextfileWriter
+from sysex_classifiers import default_registry, load_plugin
 
 
 log = logging.getLogger('upload_sysex')
 
+# Generated by gen_manufacturer_tables.py, imported on first use
+_tables = None
+
+
+def _manufacturer_tables():
+    global _tables
+    if _tables is None:
+        import manufacturer_tables
+        _tables = manufacturer_tables
+    return _tables
+
+
+def _lookup_manufacturer(data):
+    """
+    Manufacturer entry of a sysex message
+    :return: (name, tag, models) or None
+    """
+    return _manufacturer_tables().lookup_message(data)
+
 
-def _sanitize_name(s, replace='/?*&\\'):
-    s = s.strip()
-    s = re.sub(r'\s+', '_', s)
-    for c in replace:
-        s = s.replace(c, '_')
-    return s.lower()
+def _model_names(entry, model):
+    """
+    (name, tag) of a model of a manufacturer entry, or None
+    """
+    if entry is None or not entry[2]:
+        return None
+    return entry[2].get(model)
 
 
 class SysexMessage(object):
@@ -88,6 +113,7 @@ class SysexMessage(object):
             raise ValueError("Message wrong length: exp {0} act {1}".format(cls._CONTROL_MAP_LEN, len(data)), data)
 
         self._data = data
+        self._entry = False
 
         if data[1] == 0:
             self.manufacturer_id = (data[1], data[2], data[3])
@@ -139,34 +165,32 @@ class SysexMessage(object):
     def check_sum(self):
         return self._data[139]
 
+    @property
+    def _manufacturer_entry(self):
+        # (name, tag, models) looked up once per message
+        if self._entry is False:
+            self._entry = _lookup_manufacturer(self._data)
+        return self._entry
+
     @property
     def manufacturer(self):
-        mname = manufacturers.get(self.manufacturer_id)
-        if mname:
-            return mname[0]
+        entry = self._manufacturer_entry
+        return entry[0] if entry else None
 
     @property
     def manufacturer_tag(self):
-        mname = manufacturers.get(self.manufacturer_id, [])
-        if len(mname) >= 2:
-            return mname[1]
-        elif mname:
-            return mname[0]
+        entry = self._manufacturer_entry
+        return entry[1] if entry else None
 
     @property
     def model(self):
-        model_name = models.get(self.manufacturer_id, {}).get(self.model_id)
+        model_name = _model_names(self._manufacturer_entry, self.model_id)
         return model_name[0] if model_name else "0x%02X" % self.model_id
 
     @property
     def model_tag(self):
-        model_name = models.get(self.manufacturer_id, {}).get(self.model_id, [])
-        if len(model_name) >= 2:
-            return model_name[1]
-        elif model_name:
-            return model_name[1]
-        else:
-            "0x%02X" % self.model_id
+        model_name = _model_names(self._manufacturer_entry, self.model_id)
+        return model_name[1] if model_name else "0x%02X" % self.model_id
 
     def __repr__(self):
         return "".join(["%02X " % b for b in self._data])
@@ -181,13 +205,13 @@ class SysexMessage(object):
 class SysexSaver(object):
     """MIDI input callback handler object."""
 
-    fn_tmpl = "pcr-{:04}.syx"
-    fn_index = 1
-
-    def __init__(self, portname, directory, debug=False):
+    def __init__(self, portname, directory, debug=False, metrics=None, registry=None):
         self.portname = portname
         self.directory = directory
         self.debug = debug
+        self.metrics = metrics
+        # Names and routes messages by (manufacturer, model, command)
+        self.registry = registry or default_registry(_tags)
 
     def __call__(self, event, data=None):
         try:
@@ -198,58 +222,24 @@ class SysexSaver(object):
             dt = datetime.now()
             log.debug("[%s: %s] Received sysex msg of %i bytes." % (
                 self.portname, dt.strftime('%x %X'), len(message)))
-            sysex = SysexMessage.fromdata(message)
-
-            # XXX: This should be implemented in a subclass
-            #      loaded via a plugin infrastructure
-            data = dict(timestamp=dt.strftime('%Y%m%dT%H%M%S.%f'))
-            data['manufacturer'] = _sanitize_name(
-                sysex.manufacturer_tag or 'unknown')
-            data['device'] = _sanitize_name(sysex.model_tag or 'unknown')
-
-            if sysex.manufacturer_id == 62 and sysex.model_id == 0x0E:
-                if sysex[4] == 0x10:
-                    # sound dump
-                    name = "".join(chr(c) for c in sysex[247:263]).rstrip('_')
-                elif sysex[4] == 0x11:
-                    # multi dump
-                    name = "".join(chr(c) for c in sysex[23:38]).rstrip('_')
-                elif sysex[4] == 0x12:
-                    # wave dump
-                    if sysex[5] > 1:
-                        name = "userwave_%04i"
-                    else:
-                        name = "romwave_%03i"
-                    name = name % ((sysex[5] << 7) | sysex[6])
-                elif sysex[4] == 0x13:
-                    # wave table dump
-                    if sysex[6] >= 96:
-                        name = "userwavetable_%03i" % (sysex[6] + 1)
-                    else:
-                        name = "romwavetable_%03i" % (sysex[6] + 1)
-                else:
-                    name = "%02X" % sysex[4]
-
-                data['name'] = _sanitize_name(name)
-
-            outfn = join(self.directory, SysexSaver.fn_tmpl.format(SysexSaver.fn_index))
-            SysexSaver.next_filename_index()
-
-            if exists(outfn):
-                log.error("Output file already exists, will not overwrite.")
-            else:
-                data = sysex.as_bytes()
-                with open(outfn, 'wb') as outfile:
-                    outfile.write(data)
-                    log.info("Sysex message of %i bytes written to '%s'.",
-                             len(data), outfn)
-
-                    # This is here because the first sysex for control map 1
-                    # has a checksum error. The sysex appears to be empty.
-                    if not sysex.validate_check_sum():
-                        log.error("Checksum error: exp %d act %d", sysex.check_sum, sysex.calc_check_sum())
-                    if sysex.calc_check_sum() != sysex.check_sum:
-                        log.error("Checksum calc error: exp %d act %d", sysex.check_sum, sysex.calc_check_sum())
+            if self.metrics:
+                self.metrics.frame_received(self.portname)
+            classification = self.registry.classify(message)
+
+            if os.path.dirname(classification.path):
+                os.makedirs(os.path.dirname(join(self.directory, classification.path)), exist_ok=True)
+            outfn = self._unique_path(join(self.directory, classification.path))
+            data = bytes(message)
+            write_start = time.perf_counter()
+            with open(outfn, 'xb') as outfile:
+                outfile.write(data)
+            if self.metrics:
+                self.metrics.bytes_written(self.portname, len(data), time.perf_counter() - write_start)
+            log.info("Sysex message of %i bytes written to '%s' (%s %s %s).", len(data), outfn,
+                     classification.manufacturer, classification.device, classification.name)
+
+            if classification.device == "pcr":
+                self._check_control_map(message)
         except Exception as exc:
             msg = "Error handling MIDI message: %s" % exc.args[0]
             if self.debug:
@@ -259,15 +249,79 @@ class SysexSaver(object):
             else:
                 log.error(msg)
 
-    @classmethod
-    def next_filename_index(cls):
+    @staticmethod
+    def _unique_path(path):
         """
-        Generate the next sequential sysex filename index
-        :return: Nothing.
+        Never overwrite: names repeat (two sounds called "Init", a second
+        dump into the same directory), so a counter is added to the name
+        of a file that exists
+        :param path: Preferred path
+        :return: A path that does not exist yet
         """
-        cls.fn_index += 1
-        if cls.fn_index % 100 > 50:
-            cls.fn_index = ((cls.fn_index // 100) * 100) + 101
+        stem, ext = os.path.splitext(path)
+        counter = 1
+        while exists(path):
+            counter += 1
+            path = "{}-{}{}".format(stem, counter, ext)
+        return path
+
+    def _check_control_map(self, message):
+        sysex = SysexMessage.fromdata(message)
+        # This is here because the first sysex for control map 1
+        # has a checksum error. The sysex appears to be empty.
+        if not sysex.validate_check_sum():
+            log.error("Checksum error: exp %d act %d", sysex.check_sum, sysex.calc_check_sum())
+            if self.metrics:
+                self.metrics.checksum_failure(self.portname)
+        if sysex.calc_check_sum() != sysex.check_sum:
+            log.error("Checksum calc error: exp %d act %d", sysex.check_sum, sysex.calc_check_sum())
+
+
+def _tags(manufacturer, model):
+    """
+    Manufacturer and model short names for the default classifier
+    :return: (manufacturer tag, model tag), either may be None
+    """
+    entry = _manufacturer_tables().lookup(manufacturer)
+    model_name = _model_names(entry, model)
+    return entry[1] if entry else None, model_name[1] if model_name else None
+
+
+class SysexWriteQueue(object):
+    """
+    MIDI input callback that hands messages to a writer thread.
+    The MIDI callback returns immediately and a slow disk shows up
+    as a growing queue depth instead of dropped or late messages.
+    """
+    def __init__(self, handler, metrics=None):
+        self._handler = handler
+        self._metrics = metrics
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, event, data=None):
+        self._queue.put(event)
+        if self._metrics:
+            self._metrics.set_queue_depth(self._queue.qsize())
+
+    def close(self):
+        """
+        Write everything still queued and stop the writer thread
+        :return: None
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                break
+            self._handler(event)
+            if self._metrics:
+                self._metrics.set_queue_depth(self._queue.qsize())
+
 
 def main(args=None):
     """Save revceived sysex message to directory given on command line."""
@@ -279,12 +333,27 @@ def main(args=None):
          help='MIDI output port number (default: ask)')
     padd('-v', '--verbose', action="store_true",
          help='verbose output')
+    padd('--metrics-port', type=int, metavar="PORT",
+         help='serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    padd('--metrics-file', metavar="PATH",
+         help='periodically write Prometheus metrics to a textfile-collector file')
+    padd('--metrics-interval', type=float, default=15.0, metavar="SECS",
+         help='textfile metrics write interval (default: %(default)s seconds)')
+    padd('--classifier', action="append", default=[], metavar="MODULE",
+         help='load a sysex classifier plugin module (may be repeated)')
+    padd('--profile', nargs='?', const="", metavar="PATH",
+         help='profile the run and write PATH (.pstats) plus a .txt summary')
 
     args = parser.parse_args(args)
 
     logging.basicConfig(format="%(name)s: %(levelname)s - %(message)s",
                         level=logging.DEBUG if args.verbose else logging.INFO)
 
+    return run_profiled(resolve_profile_path(args.profile, "receive_sysex"), _receive, args)
+
+
+def _receive(args):
+    """Receive sysex messages as selected by the parsed command line."""
     try:
         midiin, port = open_midiinput(args.port)
     except IOError as exc:
@@ -293,10 +362,33 @@ def main(args=None):
     except (EOFError, KeyboardInterrupt):
         return 0
 
-    ss = SysexSaver(port, args.outdir, args.verbose)
+    metrics = None
+    metrics_server = None
+    metrics_writer = None
+    if args.metrics_port is not None or args.metrics_file:
+        metrics = CaptureMetrics()
+        if args.metrics_port is not None:
+            try:
+                metrics_server = MetricsHTTPServer(metrics, args.metrics_port)
+            except OSError as exc:
+                log.error("Unable to serve metrics on port %d: %s", args.metrics_port, exc)
+                midiin.close_port()
+                return 1
+            metrics_server.start()
+            log.info("Serving metrics on http://127.0.0.1:%d/metrics", metrics_server.server_port)
+        if args.metrics_file:
+            metrics_writer = MetricsTextfileWriter(metrics, args.metrics_file, args.metrics_interval)
+            metrics_writer.start()
+            log.info("Writing metrics to %s", args.metrics_file)
+
+    registry = default_registry(_tags)
+    for module_name in args.classifier:
+        load_plugin(registry, module_name)
+    ss = SysexSaver(port, args.outdir, args.verbose, metrics=metrics, registry=registry)
+    write_queue = SysexWriteQueue(ss, metrics=metrics)
 
     log.debug("Attaching MIDI input callback handler.")
-    midiin.set_callback(ss)
+    midiin.set_callback(write_queue)
     log.debug("Enabling reception of sysex messages.")
     midiin.ignore_types(sysex=False)
 
@@ -312,6 +404,11 @@ def main(args=None):
         log.debug("Exit.")
         midiin.close_port()
         del midiin
+        write_queue.close()
+        if metrics_server:
+            metrics_server.stop()
+        if metrics_writer:
+            metrics_writer.stop()
 
 
 if __name__ == '__main__':
@@ -16,6 +16,8 @@
 #       python3 send_sysex.py -h
 #   List available output ports
 #       python3 send_sysex.py {-l | --list-ports}
+#   Watch for MIDI ports being plugged in or out
+#       python3 send_sysex.py {-w | --watch-ports}
 #   Send control map sysex files
 #       python3 send_sysex.py {-p | --port} port {-i | --input} directory [{-d | --delay} delayms] [{-v | --verbose}]
 #
@@ -43,7 +45,12 @@ from os.path import basename, exists, isdir, join
 
 import rtmidi
 from rtmidi.midiutil import list_output_ports, open_midioutput
-from rtmidi.midiconstants import END_OF_EXCLUSIVE, SYSTEM_EXCLUSIVE
+
+# Shared helpers live with the librarian app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "librarian"))
+from profiling import resolve_profile_path, run_profiled
+from port_manager import get_port_manager
+import pcr_midi_util
 
 
 log = logging.getLogger("sendsysex")
@@ -53,42 +60,40 @@ def send_sysex_file(filename, midiout, portname, delay=50):
     """Send contents of sysex file to given MIDI output.
 
     Reads file given by filename and sends all consecutive sysex messages found
-    in it to given midiout after prompt.
+    in it to given midiout. Uses the same sender as the librarian app.
 
     """
-    bn = basename(filename)
-
-    with open(filename, 'rb') as sysex_file:
-        data = sysex_file.read()
-
-        if data[0] == SYSTEM_EXCLUSIVE:
-            sox = 0
-            i = 0
-
-            while sox >= 0:
-                sox = data.find(SYSTEM_EXCLUSIVE, sox)
+    log.info("Sending '%s' to %s...", basename(filename), portname)
+    if not pcr_midi_util.send_sysex_file(filename, midiout, delay):
+        log.warning("File '%s' does not start with a sysex message.", basename(filename))
 
-                if sox >= 0:
-                    eox = data.find(END_OF_EXCLUSIVE, sox)
 
-                    if eox >= 0:
-                        sysex_msg = data[sox:eox + 1]
-                        # Python 2: convert data into list of integers
-                        if isinstance(sysex_msg, str):
-                            sysex_msg = [ord(c) for c in sysex_msg]
+def watch_ports():
+    """Print the MIDI port lists every time they change until interrupted."""
+    def on_change(in_ports, out_ports):
+        log.info("MIDI ports changed")
+        for portno, name in enumerate(in_ports):
+            log.info("  In  [%i] %s", portno, name)
+        for portno, name in enumerate(out_ports):
+            log.info("  Out [%i] %s", portno, name)
 
-                        log.info("Sending '%s' message #%03i...", bn, i)
-                        midiout.send_message(sysex_msg)
-                        # This is pacing the send rate
-                        time.sleep(0.001 * delay)
-
-                        i += 1
-                    else:
-                        break
+    try:
+        port_manager = get_port_manager()
+    except rtmidi.RtMidiError as exc:
+        log.error(exc)
+        return 1
 
-                    sox = eox + 1
-        else:
-            log.warning("File '%s' does not start with a sysex message.", bn)
+    port_manager.subscribe(on_change)
+    port_manager.start()
+    log.info("Watching MIDI ports. Press CTRL-C to exit.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print('')
+    finally:
+        port_manager.stop()
+    return 0
 
 
 def main(args=None):
@@ -105,17 +110,26 @@ def main(args=None):
          help='directory containing .syx files to be sent')
     ap.add_argument('-l', '--list-ports', action="store_true",
          help='list available MIDI output ports')
+    ap.add_argument('-w', '--watch-ports', action="store_true",
+         help='list MIDI ports whenever they change (hot-plug) until CTRL-C')
     ap.add_argument('-p', '--port', dest='port',
          help='MIDI output port number (default: open virtual port)')
     ap.add_argument('-d', '--delay', default="50", metavar="MS", type=int,
          help='delay between sending each Sysex message in milliseconds. Use for pacing. '
          'Default: %(default)s ms')
     ap.add_argument('-v', '--verbose', action="store_true", help='verbose logging output (debug)')
+    ap.add_argument('--profile', nargs='?', const="", metavar="PATH",
+         help='profile the run and write PATH (.pstats) plus a .txt summary')
 
     args = ap.parse_args(args)
     logging.basicConfig(format="%(name)s: %(levelname)s - %(message)s",
                         level=logging.DEBUG if args.verbose else logging.INFO)
 
+    return run_profiled(resolve_profile_path(args.profile, "send_sysex"), _send_files, args)
+
+
+def _send_files(args):
+    """Send the files selected by the parsed command line."""
     if args.list_ports:
         try:
             list_output_ports()
@@ -125,6 +139,9 @@ def main(args=None):
 
         return 0
 
+    if args.watch_ports:
+        return watch_ports()
+
     files = []
     files.extend(sorted([join(args.input_dir, fn) for fn in os.listdir(args.input_dir)
                          if fn.lower().endswith('.syx')]))
@@ -0,0 +1,241 @@
+#
+# -*- coding: utf-8 -*-
+#
+# sysex_classifiers - name and route received sysex messages by device
+# Copyright © 2020 Dave Hocker (AtHomeX10@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the LICENSE file for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program (the LICENSE file).  If not, see <http://www.gnu.org/licenses/>.
+#
+# Classifiers are registered for a (manufacturer, model, command) key.
+# Where the model and command bytes sit depends on the manufacturer:
+#
+#   Roland      F0 41 dev m1 m2 m3 cmd ...     model = bytes 3-5, command = byte 6
+#   others      F0 id model dev cmd ...        model = byte 2, command = byte 4
+#   extended    F0 00 i1 i2 ...                manufacturer = bytes 1-3, no model/command
+#
+# A classifier registered for all commands of a model is entered once
+# per command value, so classifying a message takes a single dict
+# lookup. Messages without a classifier are handled by the default one.
+#
+# More classifiers can be loaded from plugin modules, see load_plugin().
+#
+"""
+Registry of sysex message classifiers.
+"""
+
+import importlib
+import re
+from collections import namedtuple
+from datetime import datetime
+from os.path import join
+
+
+# Manufacturer IDs
+ROLAND = 0x41
+WALDORF = 0x3E
+
+# Where the model and command bytes are, by manufacturer.
+# (model start, model end, command index)
+HeaderLayout = namedtuple("HeaderLayout", ["model_start", "model_end", "command"])
+ROLAND_LAYOUT = HeaderLayout(3, 6, 6)
+DEFAULT_LAYOUT = HeaderLayout(2, 3, 4)
+
+layouts = {
+    ROLAND: ROLAND_LAYOUT,
+}
+
+# What a classifier decides about a message
+Classification = namedtuple("Classification", ["manufacturer", "device", "name", "path"])
+
+
+def sanitize_name(s, replace='/?*&\\:"<>|'):
+    """
+    Make a name usable as a file name on every platform
+    :return: The name, may be empty
+    """
+    s = s.strip()
+    s = re.sub(r'\s+', '_', s)
+    s = re.sub(r'[\x00-\x1f\x7f-\xff]', '_', s)
+    for c in replace:
+        s = s.replace(c, '_')
+    # Windows drops trailing dots and spaces
+    return s.rstrip('.').lower()
+
+
+def header_key(message):
+    """
+    Work out the registry key of a message
+    :param message: Sysex message (list or bytes) starting with F0
+    :return: (manufacturer, model, command). The manufacturer is an int or
+    a 3-tuple for extended IDs, the model an int or a tuple, the command
+    an int or None.
+    """
+    if message[1] == 0:
+        return (message[1], message[2], message[3]), None, None
+    layout = layouts.get(message[1], DEFAULT_LAYOUT)
+    if len(message) <= layout.command:
+        return message[1], None, None
+    if layout.model_end - layout.model_start == 1:
+        model = message[layout.model_start]
+    else:
+        model = tuple(message[layout.model_start:layout.model_end])
+    return message[1], model, message[layout.command]
+
+
+class DefaultClassifier(object):
+    """
+    Names a message after its manufacturer, model and time of arrival
+    """
+    def __init__(self, names=None):
+        """
+        :param names: Optional callable (manufacturer, model) returning
+        (manufacturer tag, model tag) for messages without a plugin
+        """
+        self._names = names
+
+    def tags(self, manufacturer, model):
+        if self._names is not None:
+            return self._names(manufacturer, model)
+        return None, None
+
+    def __call__(self, message, key):
+        manufacturer, model, command = key
+        manufacturer_tag, model_tag = self.tags(manufacturer, model)
+        manufacturer_tag = sanitize_name(manufacturer_tag or "unknown")
+        if model_tag is None:
+            model_tag = "unknown" if model is None else "_".join(["%02x" % b for b in
+                                                                   (model if isinstance(model, tuple) else (model,))])
+        device = sanitize_name(model_tag)
+        name = datetime.now().strftime('%Y%m%dT%H%M%S.%f')
+        return Classification(manufacturer_tag, device, name, join(manufacturer_tag, device, name + ".syx"))
+
+
+class WaldorfMicrowaveClassifier(object):
+    """
+    Waldorf microWAVE II/XT dumps, named after the sound, multi or wave
+    """
+    def __call__(self, sysex, key):
+        command = sysex[4]
+        if command == 0x10:
+            # sound dump
+            name = "".join(chr(c) for c in sysex[247:263]).rstrip('_')
+        elif command == 0x11:
+            # multi dump
+            name = "".join(chr(c) for c in sysex[23:38]).rstrip('_')
+        elif command == 0x12:
+            # wave dump
+            if sysex[5] > 1:
+                name = "userwave_%04i"
+            else:
+                name = "romwave_%03i"
+            name = name % ((sysex[5] << 7) | sysex[6])
+        elif command == 0x13:
+            # wave table dump
+            if sysex[6] >= 96:
+                name = "userwavetable_%03i" % (sysex[6] + 1)
+            else:
+                name = "romwavetable_%03i" % (sysex[6] + 1)
+        else:
+            name = "%02X" % command
+        # A sound or multi named with blanks only gets the command name
+        name = sanitize_name(name) or "%02X" % command
+        return Classification("waldorf", "microwave2", name, join("waldorf", "microwave2", name + ".syx"))
+
+
+class RolandPCRClassifier(object):
+    """
+    Control map frames of a Roland/Edirol PCR keyboard. Frames arrive in
+    order, 50 per control map, and are numbered by map and frame:
+    pcr-0001.syx through pcr-0050.syx for map 1, pcr-0101.syx for map 2
+    frame 1 and so on.
+    """
+    FN_TMPL = "pcr-{:04}.syx"
+    FRAMES_PER_MAP = 50
+
+    def __init__(self):
+        self.fn_index = 1
+
+    def __call__(self, sysex, key):
+        index = self.fn_index
+        self.next_filename_index()
+        map_number, frame_number = index // 100 + 1, index % 100
+        name = "map{:02}_frame{:02}".format(map_number, frame_number)
+        return Classification("roland", "pcr", name, self.FN_TMPL.format(index))
+
+    def next_filename_index(self):
+        """
+        Generate the next sequential sysex filename index
+        :return: Nothing.
+        """
+        self.fn_index += 1
+        if self.fn_index % 100 > self.FRAMES_PER_MAP:
+            self.fn_index = ((self.fn_index // 100) * 100) + 101
+
+
+class ClassifierRegistry(object):
+    """
+    Classifiers by (manufacturer, model, command)
+    """
+    def __init__(self, default=None):
+        self._classifiers = {}
+        self.default = default or DefaultClassifier()
+
+    def register(self, manufacturer, model, classifier, commands=None):
+        """
+        Register a classifier
+        :param manufacturer: Manufacturer ID, an int or a 3-tuple
+        :param model: Model ID as placed by the manufacturer's header layout
+        :param classifier: Callable (message, key) returning a Classification
+        :param commands: Command bytes to register for, None for all of them.
+        Classifiers for extended manufacturer IDs use model None and commands [None].
+        :return: None
+        """
+        if commands is None:
+            commands = range(128)
+        for command in commands:
+            self._classifiers[(manufacturer, model, command)] = classifier
+
+    def classify(self, message):
+        """
+        Classify a sysex message
+        :param message: Sysex message starting with F0
+        :return: Classification
+        """
+        key = header_key(message)
+        return self._classifiers.get(key, self.default)(message, key)
+
+
+def default_registry(names=None):
+    """
+    A registry with the built-in classifiers
+    :param names: Optional (manufacturer, model) -> (manufacturer tag, model tag) lookup
+    for the default classifier
+    :return: ClassifierRegistry
+    """
+    registry = ClassifierRegistry(DefaultClassifier(names))
+    registry.register(WALDORF, 0x0E, WaldorfMicrowaveClassifier())
+    # Data set (DT1) messages of the PCR-300/500/800
+    registry.register(ROLAND, (0x00, 0x00, 0x1A), RolandPCRClassifier(), commands=[0x12])
+    return registry
+
+
+def load_plugin(registry, module_name):
+    """
+    Load a classifier plugin. The module must have a
+    register(registry) function that registers its classifiers.
+    :param registry: ClassifierRegistry
+    :param module_name: Importable module name
+    :return: None
+    """
+    module = importlib.import_module(module_name)
+    module.register(registry)